@@ -0,0 +1,405 @@
+import argparse  # Importing argparse for the export / comparison commands
+import json  # Importing json for class names and the comparison report
+import os  # Importing os for cache paths and backend selection
+import time  # Importing time for latency measurement
+from abc import ABC, abstractmethod  # Importing ABC so every exported backend has to implement forward()
+from contextlib import nullcontext  # Importing nullcontext for backends that don't need torch
+from concurrent.futures import ThreadPoolExecutor  # Importing the worker pool for frame decoding
+
+import cv2  # Importing OpenCV for letterbox resizing
+import numpy as np  # Importing numpy for pre/postprocessing
+
+from model_loader import DEFAULT_CACHE_DIR, DEFAULT_MODEL, load_model
+from scene import box_iou, to_numpy
+
+BACKENDS = ("torch", "torchscript", "onnx", "onnx-int8", "onnx-int8-static")
+DEFAULT_BACKEND = os.environ.get("AI_NAV_BACKEND", "torch")
+
+
+# Same shape as the YOLOv5 Results object as far as the pipeline is concerned:
+# xyxy[i] is an (n, 6) array of xmin, ymin, xmax, ymax, confidence, class for image i
+class Detections:
+    def __init__(self, xyxy, names):
+        self.xyxy = xyxy
+        self.names = names
+
+    def __len__(self):
+        return len(self.xyxy)
+
+
+# Accept what AutoShape accepts: a PIL image, an RGB HWC array, or a list of those
+def to_rgb_list(imgs):
+    if not isinstance(imgs, (list, tuple)):
+        imgs = [imgs]
+    frames = []
+    for img in imgs:
+        if not isinstance(img, np.ndarray):
+            img = np.asarray(img.convert("RGB"))
+        frames.append(img)
+    return frames
+
+
+# Resize keeping the aspect ratio and pad to a square of img_size (returns image, scale, padding)
+def letterbox(img, img_size=640, color=114):
+    height, width = img.shape[:2]
+    scale = min(img_size / height, img_size / width)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+    pad_x, pad_y = (img_size - new_width) / 2, (img_size - new_height) / 2
+
+    if (new_width, new_height) != (width, height):
+        img = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(color, color, color))
+    return img, scale, (left, top)
+
+
+# Letterbox a list of RGB frames into one float32 NCHW batch
+def preprocess(frames, img_size=640):
+    batch = np.empty((len(frames), 3, img_size, img_size), dtype=np.float32)
+    transforms = []
+    for index, frame in enumerate(frames):
+        # A BGR frame passed as a channel-reversed view (frame[..., ::-1]) is letterboxed as BGR
+        # and flipped while it is copied into the batch, instead of copying the full frame first
+        flipped = frame.ndim == 3 and frame.strides[-1] < 0
+        padded, scale, pad = letterbox(frame[..., ::-1] if flipped else frame, img_size)
+        batch[index] = (padded[..., ::-1] if flipped else padded).transpose(2, 0, 1)
+        transforms.append((scale, pad, frame.shape[:2]))
+    batch /= 255.0
+    return batch, transforms
+
+
+# Greedy non-maximum suppression, returns indices of the boxes to keep
+def nms(boxes, scores, iou_threshold):
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        width = np.clip(np.minimum(boxes[best, 2], boxes[rest, 2]) - np.maximum(boxes[best, 0], boxes[rest, 0]), 0, None)
+        height = np.clip(np.minimum(boxes[best, 3], boxes[rest, 3]) - np.maximum(boxes[best, 1], boxes[rest, 1]), 0, None)
+        inter = width * height
+        iou = inter / (areas[best] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+# Turn raw YOLOv5 head output (n, 5 + classes) for one image into (m, 6) detections in image pixels
+def postprocess(pred, transform, conf_threshold=0.25, iou_threshold=0.45, max_det=1000):
+    scale, (pad_x, pad_y), (height, width) = transform
+
+    pred = pred[pred[:, 4] > conf_threshold]
+    if not len(pred):
+        return np.zeros((0, 6), dtype=np.float32)
+
+    class_scores = pred[:, 5:] * pred[:, 4:5]
+    class_ids = class_scores.argmax(1)
+    confidence = class_scores[np.arange(len(pred)), class_ids]
+    mask = confidence > conf_threshold
+    pred, class_ids, confidence = pred[mask], class_ids[mask], confidence[mask]
+
+    boxes = np.empty((len(pred), 4), dtype=np.float32)
+    boxes[:, 0] = pred[:, 0] - pred[:, 2] / 2
+    boxes[:, 1] = pred[:, 1] - pred[:, 3] / 2
+    boxes[:, 2] = pred[:, 0] + pred[:, 2] / 2
+    boxes[:, 3] = pred[:, 1] + pred[:, 3] / 2
+
+    # Offset boxes by class so one NMS pass never suppresses across classes
+    keep = nms(boxes + class_ids[:, None] * 4096.0, confidence, iou_threshold)[:max_det]
+    boxes, class_ids, confidence = boxes[keep], class_ids[keep], confidence[keep]
+
+    # Undo the letterbox
+    boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad_x) / scale, 0, width)
+    boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad_y) / scale, 0, height)
+
+    return np.concatenate([boxes, confidence[:, None], class_ids[:, None]], axis=1).astype(np.float32)
+
+
+# Shared call-site behaviour for the exported backends: model(img) -> Detections
+class ExportedDetector(ABC):
+    def __init__(self, names, img_size=640, conf_threshold=0.25, iou_threshold=0.45):
+        self.names = names
+        self.img_size = img_size
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+
+    # Raw (N, anchors, 5 + classes) predictions for a preprocessed NCHW float32 batch
+    @abstractmethod
+    def forward(self, batch):
+        pass
+
+    # `size` is accepted for AutoShape compatibility; exported graphs always run at img_size
+    def __call__(self, imgs, size=None):
+        batch, transforms = preprocess(to_rgb_list(imgs), self.img_size)
+        return self.infer(batch, transforms)
+
+    # Letterbox one frame into a (1, 3, img_size, img_size) batch and its transform. Safe to call
+    # from worker threads, so preprocessing can overlap with inference on the previous batch.
+    def prepare(self, img):
+        batch, transforms = preprocess(to_rgb_list(img), self.img_size)
+        return batch, transforms[0]
+
+    # Detections for a batch that was already preprocessed (see prepare())
+    def infer(self, batch, transforms):
+        pred = self.forward(batch)
+        xyxy = [
+            postprocess(pred[index], transform, self.conf_threshold, self.iou_threshold)
+            for index, transform in enumerate(transforms)
+        ]
+        return Detections(xyxy, self.names)
+
+
+class OnnxDetector(ExportedDetector):
+    def __init__(self, path, names, img_size=640, threads=None, **kwargs):
+        import onnxruntime as ort
+
+        super().__init__(names, img_size, **kwargs)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = threads or default_threads()
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def forward(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class TorchScriptDetector(ExportedDetector):
+    def __init__(self, path, names, img_size=640, threads=None, **kwargs):
+        import torch
+
+        super().__init__(names, img_size, **kwargs)
+        torch.set_num_threads(threads or default_threads())
+        self.module = torch.jit.optimize_for_inference(torch.jit.load(path, map_location="cpu").eval())
+
+    def forward(self, batch):
+        import torch
+
+        with torch.inference_mode():
+            output = self.module(torch.from_numpy(batch))
+        if isinstance(output, (list, tuple)):
+            output = output[0]
+        return output.numpy()
+
+
+# Physical cores are usually the sweet spot for CPU inference; hyper-threads rarely help
+def default_threads():
+    try:
+        import psutil
+        return psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    except ImportError:
+        return max(1, (os.cpu_count() or 2) // 2)
+
+
+# No-grad context for inference; torch (and through the hub code, pandas) is only imported
+# for the eager torch backend, so exported backends start and run without it
+def inference_context(backend=None, threads=None):
+    if (backend or DEFAULT_BACKEND) != "torch":
+        return nullcontext()
+    import torch
+
+    if threads:
+        torch.set_num_threads(threads)
+    return torch.inference_mode()
+
+
+# The plain nn.Module inside the hub AutoShape wrapper, switched to export mode
+def export_module(model):
+    module = model.model
+    module = getattr(module, "model", module)  # DetectMultiBackend -> DetectionModel
+    module = module.float().eval()
+    for layer in module.modules():
+        if hasattr(layer, "anchors") and hasattr(layer, "export"):
+            layer.export = True  # Detect head returns only the concatenated predictions
+    return module
+
+
+def export_onnx(model, path, img_size=640, opset=12):
+    import torch
+
+    dummy = torch.zeros(1, 3, img_size, img_size)
+    torch.onnx.export(
+        export_module(model), dummy, path, opset_version=opset,
+        input_names=["images"], output_names=["output0"],
+        dynamic_axes={"images": {0: "batch"}, "output0": {0: "batch"}},
+    )
+    return path
+
+
+def export_torchscript(model, path, img_size=640):
+    import torch
+
+    dummy = torch.zeros(1, 3, img_size, img_size)
+    with torch.inference_mode():
+        traced = torch.jit.trace(export_module(model), dummy, strict=False)
+    traced.save(path)
+    return path
+
+
+def quantize_dynamic(src, dst):
+    from onnxruntime.quantization import QuantType, quantize_dynamic as ort_quantize_dynamic
+
+    ort_quantize_dynamic(src, dst, weight_type=QuantType.QUInt8)
+    return dst
+
+
+# Static INT8 quantization calibrated on a handful of representative frames
+def quantize_static(src, dst, calibration_frames, img_size=640):
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static as ort_quantize_static,
+    )
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self.batches = iter(preprocess([frame], img_size)[0] for frame in calibration_frames)
+
+        def get_next(self):
+            batch = next(self.batches, None)
+            return None if batch is None else {"images": batch}
+
+    ort_quantize_static(
+        src, dst, FrameReader(), quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True,
+    )
+    return dst
+
+
+def artifact_path(name, backend, img_size, cache_dir=None):
+    extension = "torchscript" if backend == "torchscript" else "onnx"
+    suffix = "" if backend in ("torchscript", "onnx") else "-" + backend.split("-", 1)[1]
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"{name}-{img_size}{suffix}.{extension}")
+
+
+def names_path(name, cache_dir=None):
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"{name}.names.json")
+
+
+# Export (once) and load the detector for `backend`. Every backend is called as model(img)
+# and returns an object with .xyxy and .names, so the rest of the pipeline doesn't change.
+def load_detector(name=DEFAULT_MODEL, cache_dir=None, allow_download=False, backend=None,
+                  img_size=640, threads=None, calibration_frames=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    if backend == "torch":
+        return load_model(name, cache_dir, allow_download=allow_download)
+
+    path = artifact_path(name, backend, img_size, cache_dir)
+    if not os.path.isfile(path) or not os.path.isfile(names_path(name, cache_dir)):
+        model = load_model(name, cache_dir, allow_download=allow_download)
+        names = model.names if isinstance(model.names, list) else [model.names[i] for i in sorted(model.names)]
+        with open(names_path(name, cache_dir), "w") as f:
+            json.dump(names, f)
+
+        if backend == "torchscript":
+            export_torchscript(model, path, img_size)
+        else:
+            fp32_path = artifact_path(name, "onnx", img_size, cache_dir)
+            if not os.path.isfile(fp32_path):
+                export_onnx(model, fp32_path, img_size)
+            if backend == "onnx-int8":
+                quantize_dynamic(fp32_path, path)
+            elif backend == "onnx-int8-static":
+                if not calibration_frames:
+                    raise ValueError("onnx-int8-static needs calibration_frames for the first export")
+                quantize_static(fp32_path, path, calibration_frames, img_size)
+
+    with open(names_path(name, cache_dir)) as f:
+        names = json.load(f)
+
+    if backend == "torchscript":
+        return TorchScriptDetector(path, names, img_size, threads)
+    return OnnxDetector(path, names, img_size, threads)
+
+
+# Count detections that agree with the reference (same class, IoU >= threshold)
+def match_detections(reference, candidate, iou_threshold=0.5):
+    if not len(reference) or not len(candidate):
+        return 0
+    iou = box_iou(reference, candidate)
+    iou[reference[:, None, 5] != candidate[None, :, 5]] = 0
+    matched = 0
+    used = set()
+    for row in iou:
+        for col in np.argsort(row)[::-1]:
+            if row[col] < iou_threshold:
+                break
+            if col not in used:
+                used.add(col)
+                matched += 1
+                break
+    return matched
+
+
+# Latency of every backend plus agreement with eager PyTorch (used as ground truth)
+def compare_backends(frames, backends, name=DEFAULT_MODEL, cache_dir=None, img_size=640, threads=None, warmup=2):
+    report = {}
+    reference = None
+    for backend in ("torch",) + tuple(b for b in backends if b != "torch"):
+        detector = load_detector(name, cache_dir, allow_download=True, backend=backend, img_size=img_size,
+                                 threads=threads, calibration_frames=frames[:32])
+        for frame in frames[:warmup]:
+            detector(frame, size=img_size)
+
+        latencies, outputs = [], []
+        for frame in frames:
+            started = time.perf_counter()
+            result = detector(frame, size=img_size)
+            latencies.append(time.perf_counter() - started)
+            outputs.append(to_numpy(result.xyxy[0]))
+
+        if reference is None:
+            reference = outputs
+        matched = sum(match_detections(r, o) for r, o in zip(reference, outputs))
+        expected = sum(len(r) for r in reference)
+        produced = sum(len(o) for o in outputs)
+        latencies = np.asarray(latencies) * 1000.0
+
+        report[backend] = {
+            "mean_ms": float(latencies.mean()),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "recall_vs_torch": matched / expected if expected else 1.0,
+            "precision_vs_torch": matched / produced if produced else 1.0,
+        }
+    return report
+
+
+def main():
+    from batch_infer import iter_frames
+
+    parser = argparse.ArgumentParser(description="Export CPU detector backends and compare accuracy vs latency")
+    parser.add_argument("source", help="image directory or video used for calibration and comparison")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--img-size", type=int, default=640)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--limit", type=int, default=100, help="maximum frames to evaluate")
+    parser.add_argument("--report", default=None, help="write the comparison as JSON to this file")
+    args = parser.parse_args()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        frames = []
+        for _, frame in iter_frames(args.source, pool, prefetch=8):
+            frames.append(frame)
+            if len(frames) >= args.limit:
+                break
+
+    report = compare_backends(frames, args.backends, args.model, img_size=args.img_size, threads=args.threads)
+
+    print(f"{'backend':<18}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'recall':>10}{'precision':>11}")
+    for backend, row in report.items():
+        print(f"{backend:<18}{row['mean_ms']:>10.1f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+              f"{row['recall_vs_torch']:>10.3f}{row['precision_vs_torch']:>11.3f}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"model": args.model, "img_size": args.img_size, "frames": len(frames), "backends": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import argparse  # Importing argparse for the command-line interface
+import os  # Importing os for walking image directories
+import queue  # Importing queue to hand decoded video frames to the inference loop
+import threading  # Importing threading for the video decoder thread
+import time  # Importing time for throughput measurement
+from collections import deque  # Importing deque for the bounded prefetch window
+from concurrent.futures import ThreadPoolExecutor  # Importing the worker pool for decode/preprocess
+
+import cv2  # Importing OpenCV for image and video decoding
+import numpy as np  # Importing numpy for the columnar output
+
+from camera import IMAGE_EXTENSIONS
+from backends import BACKENDS, DEFAULT_BACKEND, inference_context, load_detector
+from scene import SCENE_DTYPE, analyze_detections, describe_scene, name_table
+
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
+
+
+# Decode an image from disk and convert it to the RGB layout the model expects
+def load_image(path):
+    frame = cv2.imread(path)
+    if frame is None:
+        return None
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def list_images(directory):
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+# Yield (name, rgb_frame) for every image, decoding up to `prefetch` images ahead on the pool
+def iter_image_frames(paths, pool, prefetch):
+    pending = deque()
+    paths = iter(paths)
+    for path in paths:
+        pending.append((path, pool.submit(load_image, path)))
+        if len(pending) >= prefetch:
+            break
+    while pending:
+        path, future = pending.popleft()
+        next_path = next(paths, None)
+        if next_path is not None:
+            pending.append((next_path, pool.submit(load_image, next_path)))
+        frame = future.result()
+        if frame is None:
+            print(f"Warning: could not read {path}, skipping.")
+            continue
+        yield os.path.relpath(path), frame
+
+
+# Yield (name, rgb_frame) for every frame of a video, decoded on a background thread
+def iter_video_frames(path, prefetch, stride=1):
+    frames = queue.Queue(maxsize=prefetch)
+    done = object()
+
+    def decode():
+        cap = cv2.VideoCapture(path)
+        index = 0
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if index % stride == 0:
+                    frames.put((f"{os.path.basename(path)}#{index}", cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+                index += 1
+        finally:
+            cap.release()
+            frames.put(done)
+
+    threading.Thread(target=decode, name="video-decode", daemon=True).start()
+    while True:
+        item = frames.get()
+        if item is done:
+            return
+        yield item
+
+
+def iter_frames(source, pool, prefetch, stride=1):
+    if os.path.isdir(source):
+        return iter_image_frames(list_images(source), pool, prefetch)
+    extension = os.path.splitext(source)[1].lower()
+    if extension in VIDEO_EXTENSIONS:
+        return iter_video_frames(source, prefetch, stride)
+    if extension in IMAGE_EXTENSIONS:
+        return iter_image_frames([source], pool, prefetch)
+    raise ValueError(f"Unsupported input {source!r}: expected an image directory, image or video file")
+
+
+# Yield (name, frame, prepare(frame)) in order, running prepare on the pool up to `prefetch` frames ahead
+def iter_prepared(frames, pool, prefetch, prepare):
+    pending = deque()
+    for name, frame in frames:
+        pending.append((name, frame, pool.submit(prepare, frame)))
+        if len(pending) >= prefetch:
+            name, frame, future = pending.popleft()
+            yield name, frame, future.result()
+    while pending:
+        name, frame, future = pending.popleft()
+        yield name, frame, future.result()
+
+
+# Group consecutive frames into fixed-size batches
+def iter_batches(frames, batch_size):
+    batch = []
+    for item in frames:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Run the model over every frame from `source` and return the per-frame and per-detection columns.
+# With an exported backend, letterboxing and normalization also run on the pool, so the main
+# thread only runs the forward pass; the torch hub model preprocesses inside model(...).
+def run_batches(model, source, batch_size=16, workers=4, img_size=640, stride=1, with_distance=True):
+    frame_names, descriptions, detection_counts = [], [], []
+    scenes = []
+    frames_done = 0
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        frames = iter_frames(source, pool, prefetch=batch_size * 2, stride=stride)
+        prepare = getattr(model, "prepare", None)
+        if prepare is not None:
+            frames = iter_prepared(frames, pool, batch_size * 2, prepare)
+        for batch in iter_batches(frames, batch_size):
+            # One forward pass for the whole batch; the pool keeps preparing the next one meanwhile
+            if prepare is not None:
+                results = model.infer(np.concatenate([tensor for _, _, (tensor, _) in batch]),
+                                      [transform for _, _, (_, transform) in batch])
+            else:
+                results = model([item[1] for item in batch], size=img_size)
+
+            for index, (name, image, *_) in enumerate(batch):
+                img_height, img_width = image.shape[:2]
+                scene = analyze_detections(results.xyxy[index], img_width, img_height)
+                frame_names.append(name)
+                descriptions.append(" ".join(describe_scene(scene, results.names, with_distance=with_distance)))
+                detection_counts.append(len(scene))
+                scenes.append(scene)
+
+            frames_done += len(batch)
+            elapsed = time.perf_counter() - started
+            print(f"{frames_done} frames, {frames_done / elapsed:.1f} frames/s")
+
+    elapsed = time.perf_counter() - started
+    detections = np.concatenate(scenes) if scenes else np.empty(0, dtype=SCENE_DTYPE)
+    columns = {
+        "frame_name": np.asarray(frame_names, dtype=str),
+        "description": np.asarray(descriptions, dtype=str),
+        "detection_count": np.asarray(detection_counts, dtype=np.int32),
+        "detection_frame": np.repeat(np.arange(len(frame_names), dtype=np.int32), detection_counts),
+    }
+    for field in SCENE_DTYPE.names:
+        columns[field] = detections[field]
+    return columns, frames_done, elapsed
+
+
+# Store every column as its own array in a compressed .npz archive
+def write_columns(path, columns, names):
+    np.savez_compressed(path, class_names=name_table(names).astype(str), **columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched scene descriptions over image directories or video files")
+    parser.add_argument("source", help="image directory, image file or video file")
+    parser.add_argument("-o", "--output", default="descriptions.npz", help="columnar output file (.npz)")
+    parser.add_argument("-b", "--batch-size", type=int, default=16)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 4, help="decode workers, which also letterbox frames for exported backends")
+    parser.add_argument("--threads", type=int, default=None, help="inference intra-op threads")
+    parser.add_argument("--img-size", type=int, default=640, help="inference resolution")
+    parser.add_argument("--stride", type=int, default=1, help="only analyze every Nth video frame")
+    parser.add_argument("--model", default="yolov5s", help="YOLOv5 variant")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=BACKENDS, help="inference backend")
+    args = parser.parse_args()
+
+    # Load the YOLOv5 model from the local cache with the requested backend
+    model = load_detector(args.model, allow_download=True, backend=args.backend,
+                          img_size=args.img_size, threads=args.threads)
+
+    with inference_context(args.backend, args.threads):
+        columns, frames_done, elapsed = run_batches(
+            model, args.source, args.batch_size, args.workers, args.img_size, args.stride
+        )
+
+    write_columns(args.output, columns, model.names)
+    print(f"Processed {frames_done} frames in {elapsed:.1f}s ({frames_done / max(elapsed, 1e-9):.1f} frames/s) "
+          f"with batch size {args.batch_size}; wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
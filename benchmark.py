@@ -0,0 +1,285 @@
+import argparse  # Importing argparse for the command-line interface
+import json  # Importing json for the machine-readable results
+import os  # Importing os for fixture paths
+import subprocess  # Importing subprocess to time imports in a fresh interpreter
+import sys  # Importing sys for the platform-specific RSS units
+import tempfile  # Importing tempfile for the synthesized speech
+import time  # Importing time for the stage timings
+from concurrent.futures import ThreadPoolExecutor  # Importing the pool used to decode the frames
+
+import numpy as np  # Importing numpy for the percentiles
+
+from backends import BACKENDS, DEFAULT_BACKEND, inference_context, load_detector
+from batch_infer import iter_frames
+from intents import LocalAnswerer
+from listener import DEFAULT_RECOGNIZER, RECOGNIZERS, recognize
+from mock_watsonx import MockWatsonxServer
+from prompts import EXAMPLES, build_prompt
+from scene import analyze_detections, describe_scene
+from speech import iter_sentences
+from watsonx_client import WatsonxClient
+
+# Stages in pipeline order, for the report
+STAGES = ("stt", "detect", "describe", "fast_path", "prompt", "first_sentence", "generate", "tts", "end_to_end")
+
+
+# Collects per-stage durations and summarizes them as percentiles
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def summary(self):
+        summary = {}
+        for stage in sorted(self.samples, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+            values = np.asarray(self.samples[stage]) * 1000.0
+            summary[stage] = {
+                "count": len(values),
+                "mean_ms": float(values.mean()),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+                "p99_ms": float(np.percentile(values, 99)),
+                "max_ms": float(values.max()),
+            }
+        return summary
+
+
+# Peak resident set size of this process in MB, or None where it can't be read
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 2 ** 20
+        except (ImportError, AttributeError):
+            return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == "darwin" else rss / 1024  # Bytes on macOS, KB on Linux
+
+
+# Modules whose cold import time is reported; they are on the path of every command
+IMPORT_MODULES = ("scene", "streaming", "backends", "tracker", "intents", "prompts", "speech", "watsonx_client")
+
+
+# Milliseconds to import each module in a fresh interpreter (the first run warms the disk cache)
+def import_times(modules=IMPORT_MODULES, repeat=3):
+    times = {}
+    for module in modules:
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        runs = []
+        for _ in range(repeat + 1):
+            output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)))
+            if output.returncode != 0:
+                break
+            runs.append(float(output.stdout.strip().splitlines()[-1]) * 1000.0)
+        times[module] = min(runs[1:]) if len(runs) > 1 else None
+    return times
+
+
+# Commands to replay: WAV recordings from a directory, lines of a text file, or the example questions
+def load_commands(path=None):
+    if path is None:
+        return [("text", question) for _, question, _ in EXAMPLES]
+    if os.path.isdir(path):
+        return [("wav", os.path.join(path, name)) for name in sorted(os.listdir(path)) if name.lower().endswith(".wav")]
+    with open(path) as f:
+        return [("text", line.strip()) for line in f if line.strip()]
+
+
+def load_frames(source, limit):
+    frames = []
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for _, frame in iter_frames(source, pool, prefetch=8):
+            frames.append(frame)
+            if len(frames) >= limit:
+                break
+    if not frames:
+        raise ValueError(f"No frames found in {source!r}")
+    return frames
+
+
+def transcribe(path, backend):
+    import speech_recognition as sr  # Only needed when WAV commands are replayed
+
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(path) as source:
+        audio = recognizer.record(source)
+    return recognize(recognizer, audio, backend)
+
+
+# Render the first sentence of the reply to a file, which is when it could start playing
+def synthesize(engine, text, path):
+    engine.save_to_file(text, path)
+    engine.runAndWait()
+
+
+# Replay frames and commands through detection -> description -> prompt -> generation -> TTS.
+# Each iteration pairs the next frame with the next command; end_to_end runs from the start of
+# the iteration until the first sentence of the reply has been synthesized.
+def run_benchmark(model, frames, commands, client, engine=None, iterations=50, warmup=3, img_size=640,
+                  recognizer_backend=DEFAULT_RECOGNIZER):
+    timer = StageTimer()
+    answerer = LocalAnswerer()
+    speech_path = os.path.join(tempfile.mkdtemp(prefix="ai_nav_bench_"), "reply.wav")
+
+    for frame in frames[:warmup]:
+        model(frame, size=img_size)
+
+    started = time.perf_counter()
+    for iteration in range(iterations):
+        frame = frames[iteration % len(frames)]
+        kind, command = commands[iteration % len(commands)]
+        t0 = time.perf_counter()
+
+        if kind == "wav":
+            command = transcribe(command, recognizer_backend)
+            timer.add("stt", time.perf_counter() - t0)
+
+        t = time.perf_counter()
+        results = model(frame, size=img_size)
+        timer.add("detect", time.perf_counter() - t)
+
+        t = time.perf_counter()
+        img_height, img_width = frame.shape[:2]
+        scene = analyze_detections(results.xyxy[0], img_width, img_height)
+        description = " ".join(describe_scene(scene, results.names, with_distance=False))
+        timer.add("describe", time.perf_counter() - t)
+
+        t = time.perf_counter()
+        intent = answerer.route(command)
+        if intent is not None:
+            # Text reading is timed by text_reader itself; here it stands in with the description
+            reply = description if intent.kind in ("describe", "read") else answerer.answer(intent, scene, results.names)
+            sentences = iter([reply or "Nothing detected."])
+            timer.add("fast_path", time.perf_counter() - t)
+        else:
+            prompt, _ = build_prompt(scene, results.names, command, max_tokens=1024)
+            timer.add("prompt", time.perf_counter() - t)
+            sentences = iter_sentences(client.generate_stream(prompt, parameters={"repetition_penalty": 1}))
+
+        t = time.perf_counter()
+        for index, sentence in enumerate(sentences):
+            if index:
+                continue  # Drain the rest of the stream; only the first sentence gates speech
+            if intent is None:
+                timer.add("first_sentence", time.perf_counter() - t)
+            if engine is not None:
+                t_tts = time.perf_counter()
+                synthesize(engine, sentence, speech_path)
+                timer.add("tts", time.perf_counter() - t_tts)
+            timer.add("end_to_end", time.perf_counter() - t0)
+        if intent is None:
+            timer.add("generate", time.perf_counter() - t)
+
+    elapsed = time.perf_counter() - started
+    detect_seconds = sum(timer.samples["detect"])
+    return {
+        "iterations": iterations,
+        "frames": len(frames),
+        "commands": len(commands),
+        "stages": timer.summary(),
+        "detection_fps": len(timer.samples["detect"]) / detect_seconds if detect_seconds else 0.0,
+        "iterations_per_s": iterations / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "fast_path": answerer.stats(),
+    }
+
+
+def print_report(report, baseline=None):
+    base_stages = baseline["stages"] if baseline else {}
+    print(f"{'stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}" +
+          (f"{'p50 vs base':>13}{'p95 vs base':>13}" if baseline else ""))
+    for stage, row in report["stages"].items():
+        line = f"{stage:<16}{row['count']:>7}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+        if stage in base_stages:
+            for key in ("p50_ms", "p95_ms"):
+                base = base_stages[stage][key]
+                line += f"{100.0 * (row[key] - base) / base:>12.1f}%" if base else f"{'-':>13}"
+        print(line)
+
+    rss = report["peak_rss_mb"]
+    print(f"detection {report['detection_fps']:.1f} frames/s, {report['iterations_per_s']:.2f} iterations/s, "
+          f"peak RSS {'n/a' if rss is None else f'{rss:.0f} MB'}, fast path {report['fast_path']['coverage']:.0%}")
+    if baseline:
+        print(f"baseline: detection {baseline['detection_fps']:.1f} frames/s, "
+              f"{baseline['iterations_per_s']:.2f} iterations/s, peak RSS {baseline['peak_rss_mb']} MB")
+
+    base_imports = baseline.get("import_ms", {}) if baseline else {}
+    for module, ms in report.get("import_ms", {}).items():
+        line = f"import {module:<16}" + ("failed" if ms is None else f"{ms:>8.1f} ms")
+        if base_imports.get(module) is not None:
+            line += f" (baseline {base_imports[module]:.1f} ms)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark over recorded frames and commands")
+    parser.add_argument("frames", help="image directory, image or video file to replay")
+    parser.add_argument("--commands", default=None,
+                        help="directory of WAV commands or text file with one question per line "
+                             "(default: the few-shot example questions)")
+    parser.add_argument("-n", "--iterations", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=100, help="maximum frames to load")
+    parser.add_argument("--model", default="yolov5s")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=BACKENDS)
+    parser.add_argument("--img-size", type=int, default=640)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--recognizer", default=DEFAULT_RECOGNIZER, choices=RECOGNIZERS)
+    parser.add_argument("--first-token-latency", type=float, default=0.3, help="mock LLM seconds to first token")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="mock LLM seconds between tokens")
+    parser.add_argument("--live", action="store_true", help="use the real watsonx endpoint instead of the mock")
+    parser.add_argument("--no-tts", action="store_true", help="skip speech synthesis")
+    parser.add_argument("--no-imports", action="store_true", help="skip the cold import timings")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="write the results as JSON")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.limit)
+    commands = load_commands(args.commands)
+    model = load_detector(args.model, allow_download=True, backend=args.backend, img_size=args.img_size,
+                          threads=args.threads, calibration_frames=frames[:32])
+
+    engine = None
+    if not args.no_tts:
+        import pyttsx3
+        engine = pyttsx3.init()
+
+    server = None
+    if args.live:
+        client = WatsonxClient()
+    else:
+        server = MockWatsonxServer(first_token_latency=args.first_token_latency,
+                                   token_latency=args.token_latency).start()
+        client = WatsonxClient(api_key="mock", url=server.url, iam_url=server.iam_url)
+
+    try:
+        with inference_context(args.backend, args.threads):
+            report = run_benchmark(model, frames, commands, client, engine, args.iterations,
+                                   img_size=args.img_size, recognizer_backend=args.recognizer)
+    finally:
+        client.close()
+        if server is not None:
+            server.stop()
+
+    if not args.no_imports:
+        report["import_ms"] = import_times()
+    report["config"] = vars(args)
+    report["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import os  # Importing os to tell image files apart from video files and devices
+import threading  # Importing threading for the background capture loop
+import time  # Importing time to pace file playback
+
+import cv2  # Importing OpenCV for camera and video access
+import numpy as np  # Importing numpy for the preallocated frame ring buffer
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+
+# Keeps a camera (or a video / image file) open and always holds the newest frames in memory
+class CameraStream:
+    def __init__(self, source=0, buffer_size=4, warmup_frames=5, loop=True, fps=None):
+        # Device indices may arrive as strings (e.g. from the command line)
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        if buffer_size < 2:
+            raise ValueError("buffer_size must be at least 2")
+
+        self.source = source
+        self.buffer_size = buffer_size
+        self.warmup_frames = warmup_frames  # Frames to discard while auto-exposure settles
+        self.loop = loop  # Restart video files when they reach the end
+        self.fps = fps  # Playback rate for video files (None = as fast as they decode)
+
+        self._cap = None
+        self._ring = None
+        self._latest = -1  # Ring slot holding the newest frame
+        self._seq = 0  # Number of frames published so far
+        self._frame_ready = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def is_file(self):
+        return isinstance(self.source, str)
+
+    @property
+    def is_image(self):
+        return self.is_file and os.path.splitext(self.source)[1].lower() in IMAGE_EXTENSIONS
+
+    @property
+    def frame_count(self):
+        return self._seq
+
+    # True once capture ended, e.g. at the end of a video file that is not looped
+    @property
+    def stopped(self):
+        return self._stopped.is_set()
+
+    # Open the source, allocate the ring buffer and start the capture thread
+    def start(self):
+        if self._thread is not None or self._ring is not None:
+            return self
+
+        if self.is_image:
+            frame = cv2.imread(self.source)
+            if frame is None:
+                raise IOError(f"Could not read image {self.source}")
+            self._ring = np.empty((self.buffer_size,) + frame.shape, dtype=frame.dtype)
+            self._publish(0, frame)
+            return self
+
+        self._cap = cv2.VideoCapture(self.source)
+        if not self._cap.isOpened():
+            raise IOError(f"Could not open video source {self.source!r}")
+
+        # Let the camera settle before anything is handed to the detector
+        frame = None
+        for _ in range(1 if self.is_file else max(1, self.warmup_frames)):
+            ret, frame = self._cap.read()
+            if not ret:
+                self._cap.release()
+                raise IOError(f"Could not read frame from {self.source!r}")
+
+        self._ring = np.empty((self.buffer_size,) + frame.shape, dtype=frame.dtype)
+        self._publish(0, frame)
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def _publish(self, slot, frame=None):
+        if frame is not None:
+            self._ring[slot] = frame
+        with self._frame_ready:
+            self._latest = slot
+            self._seq += 1
+            self._frame_ready.notify_all()
+
+    def _run(self):
+        interval = 1.0 / self.fps if self.is_file and self.fps else 0.0
+        slot = self._latest
+        while not self._stopped.is_set():
+            started = time.perf_counter()
+            slot = (slot + 1) % self.buffer_size
+
+            # Decode straight into the ring slot so no new array is allocated per frame
+            dst = self._ring[slot]
+            ret, frame = self._cap.read(dst)
+            if not ret:
+                if self.is_file and self.loop:
+                    self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                break
+
+            # Fall back to a copy if the backend ignored the destination buffer
+            self._publish(slot, None if frame is dst else frame)
+
+            if interval:
+                time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+        self._stopped.set()
+        with self._frame_ready:
+            self._frame_ready.notify_all()
+
+    # Return (sequence number, frame) for the newest frame; the frame is BGR like cv2 returns it
+    def read_latest(self, copy=True):
+        with self._frame_ready:
+            if self._latest < 0:
+                return 0, None
+            seq, frame = self._seq, self._ring[self._latest]
+            if copy:
+                frame = frame.copy()
+        return seq, frame
+
+    # Block until a frame newer than after_seq is available (or the timeout expires)
+    def wait_for_frame(self, after_seq=0, timeout=None, copy=True):
+        with self._frame_ready:
+            self._frame_ready.wait_for(
+                lambda: self._seq > after_seq or self._stopped.is_set() or self.is_image,
+                timeout=timeout,
+            )
+        return self.read_latest(copy=copy)
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,326 @@
+import argparse  # Importing argparse for the evaluation command
+import json  # Importing json for the evaluation report
+import os  # Importing os for the model selection
+import threading  # Importing threading for the stats lock
+import time  # Importing time for per-tier latency
+from collections import deque  # Importing deque for the bounded latency samples
+
+import numpy as np  # Importing numpy for box arithmetic
+
+import metrics  # Stage timers, off unless enabled
+from backends import Detections, match_detections, to_rgb_list
+from scene import name_table, to_numpy
+
+# Nano model on every frame, a larger one only when the small one is unsure
+DEFAULT_SMALL_MODEL = os.environ.get("AI_NAV_SMALL_MODEL", "yolov5n")
+DEFAULT_LARGE_MODEL = os.environ.get("AI_NAV_LARGE_MODEL", "yolov5m")
+
+
+# When to ask the large model. A detection between the detector's own threshold and
+# min_confidence is "uncertain" and gets a second look on a crop around it; a question about
+# a class the small model hasn't seen with target_confidence runs the large model on the
+# whole frame. Background escalations are capped at max_rate per second; question-driven
+# ones are not, since the user is waiting for them.
+class EscalationPolicy:
+    def __init__(self, min_confidence=0.5, target_confidence=0.6, max_rate=1.0, padding=0.2,
+                 min_crop=128, max_crop_area=0.5, escalate_targets=True):
+        self.min_confidence = min_confidence
+        self.target_confidence = target_confidence
+        self.max_rate = max_rate  # Background escalations per second, 0 to only escalate for questions
+        self.padding = padding  # Fraction of the box size added around each uncertain box
+        self.min_crop = min_crop  # Smallest crop side in pixels, so the large model gets some context
+        self.max_crop_area = max_crop_area  # Larger crops run on the whole frame instead
+        self.escalate_targets = escalate_targets
+
+    def uncertain(self, detections):
+        return detections[:, 4] < self.min_confidence
+
+    # Target class ids the small model did not find with enough confidence
+    def missing_targets(self, detections, target_ids):
+        if not self.escalate_targets or not target_ids:
+            return []
+        confident = set(detections[detections[:, 4] >= self.target_confidence, 5].astype(int).tolist())
+        return [class_id for class_id in target_ids if class_id not in confident]
+
+    # Padded union of the boxes as (x0, y0, x1, y1), or None if it covers too much of the frame
+    def crop(self, boxes, img_width, img_height):
+        x0, y0 = boxes[:, 0].min(), boxes[:, 1].min()
+        x1, y1 = boxes[:, 2].max(), boxes[:, 3].max()
+        pad_x = max(self.padding * (x1 - x0), (self.min_crop - (x1 - x0)) / 2, 0)
+        pad_y = max(self.padding * (y1 - y0), (self.min_crop - (y1 - y0)) / 2, 0)
+        x0, x1 = int(max(0, x0 - pad_x)), int(min(img_width, np.ceil(x1 + pad_x)))
+        y0, y1 = int(max(0, y0 - pad_y)), int(min(img_height, np.ceil(y1 + pad_y)))
+        if (x1 - x0) * (y1 - y0) > self.max_crop_area * img_width * img_height:
+            return None
+        return x0, y0, x1, y1
+
+
+# Latency samples and counts for one model of the cascade
+class TierStats:
+    def __init__(self, samples=1000):
+        self.calls = 0
+        self.seconds = 0.0
+        self.latencies = deque(maxlen=samples)
+
+    def add(self, seconds):
+        self.calls += 1
+        self.seconds += seconds
+        self.latencies.append(seconds)
+
+    def summary(self):
+        latencies = np.asarray(self.latencies) * 1000.0
+        return {
+            "calls": self.calls,
+            "avg_ms": 1000.0 * self.seconds / self.calls if self.calls else 0.0,
+            "p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+        }
+
+
+# Called like any detector: model(img) -> object with .xyxy and .names. Runs `small` on every
+# image and escalates to `large` according to the policy. The large model can be passed as a
+# zero-argument loader instead; it is then loaded on a background thread (preload(), or the
+# first escalation), and until it is ready the small model's detections are returned as they are.
+class CascadeDetector:
+    def __init__(self, small, large=None, load_large=None, policy=None, small_size=640, large_size=640):
+        if large is None and load_large is None:
+            raise ValueError("CascadeDetector needs a large model or a loader for one")
+        self.small = small
+        self.names = small.names
+        self.policy = policy or EscalationPolicy()
+        self.small_size = small_size
+        self.large_size = large_size
+        self.last_tier = None  # "small" or "large" for the most recent image
+        self._large = large
+        self._load_large = load_large
+        self._table = name_table(self.names)
+        self._last_background = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._preloading = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.tiers = {"small": TierStats(), "large": TierStats()}
+        self.reasons = {"uncertain": 0, "target": 0}
+        self.crops = 0
+        self.full_frames = 0
+        self.rate_limited = 0
+        self.confirmed = 0  # Small-model boxes in escalated regions the large model agreed with
+        self.rechecked = 0  # Small-model boxes in escalated regions
+        self.added = 0  # Large-model boxes the small model had missed
+        self.not_ready = 0  # Escalations skipped while the large model was still loading
+
+    @property
+    def large(self):
+        with self._load_lock:
+            if self._large is None:
+                self._large = self._load_large()
+        return self._large
+
+    @property
+    def large_ready(self):
+        return self._large is not None
+
+    # Start loading the large model in the background (once), so no escalation has to wait for it
+    def preload(self):
+        with self._lock:
+            if self._preloading or self.large_ready:
+                return self
+            self._preloading = True
+        threading.Thread(target=self._preload, name="cascade-preload", daemon=True).start()
+        return self
+
+    def _preload(self):
+        try:
+            with metrics.span("load_large_model"):
+                self.large
+        except Exception as e:  # Not retried: the cascade keeps working with the small model only
+            print(f"Error: could not load the large model: {e}")
+
+    def __call__(self, imgs, size=None, targets=None):
+        frames = to_rgb_list(imgs)
+        return Detections([self._detect(frame, targets) for frame in frames], self.names)
+
+    # One image, escalating for a question about `targets` (class names) if the small model is unsure
+    def detect(self, img, targets=None):
+        return self(img, targets=targets)
+
+    def _target_ids(self, targets):
+        if not targets:
+            return []
+        return [int(class_id) for class_id in np.flatnonzero(np.isin(self._table, list(targets)))]
+
+    def _run(self, tier, model, img, size):
+        started = time.perf_counter()
+        detections = to_numpy(model(img, size=size).xyxy[0])
+        seconds = time.perf_counter() - started
+        with self._lock:
+            self.tiers[tier].add(seconds)
+        metrics.observe(f"detect_{tier}", seconds)
+        return detections
+
+    def _detect(self, frame, targets=None):
+        detections = self._run("small", self.small, frame, self.small_size)
+        img_height, img_width = frame.shape[:2]
+
+        region = None
+        if self.policy.missing_targets(detections, self._target_ids(targets)):
+            reason = "target"
+        else:
+            uncertain = self.policy.uncertain(detections)
+            if not uncertain.any():
+                self.last_tier = "small"
+                return detections
+            now = time.perf_counter()
+            if not self.policy.max_rate or now - self._last_background < 1.0 / self.policy.max_rate:
+                with self._lock:
+                    self.rate_limited += 1
+                self.last_tier = "small"
+                return detections
+            self._last_background = now
+            reason = "uncertain"
+            region = self.policy.crop(detections[uncertain], img_width, img_height)
+
+        if not self.large_ready:
+            self.preload()
+            with self._lock:
+                self.not_ready += 1
+            self.last_tier = "small"
+            return detections
+
+        x0, y0, x1, y1 = region or (0, 0, img_width, img_height)
+        refined = self._run("large", self.large, frame[y0:y1, x0:x1], self.large_size)
+        refined[:, [0, 2]] += x0
+        refined[:, [1, 3]] += y0
+
+        # The large model's answer replaces the small one's inside the region
+        centers = (detections[:, :2] + detections[:, 2:4]) / 2
+        inside = ((centers[:, 0] >= x0) & (centers[:, 0] < x1) & (centers[:, 1] >= y0) & (centers[:, 1] < y1))
+        confirmed = match_detections(detections[inside], refined)
+        with self._lock:
+            self.reasons[reason] += 1
+            if region is None:
+                self.full_frames += 1
+            else:
+                self.crops += 1
+            self.rechecked += int(inside.sum())
+            self.confirmed += confirmed
+            self.added += len(refined) - confirmed
+        metrics.count(f"cascade_{reason}")
+        self.last_tier = "large"
+        return np.concatenate([detections[~inside], refined]).astype(np.float32)
+
+    def stats(self):
+        with self._lock:
+            small_calls = self.tiers["small"].calls
+            escalations = self.crops + self.full_frames
+            return {
+                "small": self.tiers["small"].summary(),
+                "large": self.tiers["large"].summary(),
+                "escalation_rate": escalations / small_calls if small_calls else 0.0,
+                "reasons": dict(self.reasons),
+                "crops": self.crops,
+                "full_frames": self.full_frames,
+                "rate_limited": self.rate_limited,
+                "large_not_ready": self.not_ready,
+                # How often the large model agreed with the small one where it took a second look
+                "small_precision_vs_large": self.confirmed / self.rechecked if self.rechecked else 1.0,
+                "large_added": self.added,
+            }
+
+
+# Detector loader with the same signature as load_detector, for BackgroundModelLoader: the small
+# model is loaded now and the large one on the first escalation
+def load_cascade(name=DEFAULT_SMALL_MODEL, cache_dir=None, allow_download=False, backend=None,
+                 large_name=DEFAULT_LARGE_MODEL, policy=None, img_size=640):
+    from backends import load_detector
+
+    small = load_detector(name, cache_dir, allow_download=allow_download, backend=backend, img_size=img_size)
+
+    def load_large():
+        return load_detector(large_name, cache_dir, allow_download=allow_download, backend=backend, img_size=img_size)
+
+    return CascadeDetector(small, load_large=load_large, policy=policy, small_size=img_size, large_size=img_size)
+
+
+# Latency and accuracy of each tier against the large model run on every full frame
+def evaluate(frames, cascade, targets=None):
+    reference, small_only, cascaded = [], [], []
+    cascade.reset_stats()
+    for frame in frames:
+        reference.append(cascade._run("large", cascade.large, frame, cascade.large_size))
+        small_only.append(cascade._run("small", cascade.small, frame, cascade.small_size))
+    reference_stats = cascade.tiers["large"].summary()
+    small_stats = cascade.tiers["small"].summary()
+    cascade.reset_stats()
+
+    latencies = []
+    for frame in frames:
+        cascade._last_background = 0.0  # Evaluate the policy on every frame, not the rate limit
+        started = time.perf_counter()
+        cascaded.append(to_numpy(cascade(frame, targets=targets).xyxy[0]))
+        latencies.append(time.perf_counter() - started)
+
+    def accuracy(outputs):
+        matched = sum(match_detections(r, o) for r, o in zip(reference, outputs))
+        expected = sum(len(r) for r in reference)
+        produced = sum(len(o) for o in outputs)
+        return {"recall_vs_large": matched / expected if expected else 1.0,
+                "precision_vs_large": matched / produced if produced else 1.0}
+
+    latencies = np.asarray(latencies) * 1000.0
+    return {
+        "large": dict(reference_stats, recall_vs_large=1.0, precision_vs_large=1.0),
+        "small": dict(small_stats, **accuracy(small_only)),
+        "cascade": dict({"avg_ms": float(latencies.mean()), "p95_ms": float(np.percentile(latencies, 95))},
+                        **accuracy(cascaded), **cascade.stats()),
+    }
+
+
+def main():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from backends import BACKENDS, DEFAULT_BACKEND, inference_context
+    from batch_infer import iter_frames
+
+    parser = argparse.ArgumentParser(description="Evaluate a small/large detector cascade per tier")
+    parser.add_argument("source", help="image directory or video to evaluate on")
+    parser.add_argument("--small", default=DEFAULT_SMALL_MODEL)
+    parser.add_argument("--large", default=DEFAULT_LARGE_MODEL)
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=BACKENDS)
+    parser.add_argument("--img-size", type=int, default=640)
+    parser.add_argument("--limit", type=int, default=100, help="maximum frames to evaluate")
+    parser.add_argument("--min-confidence", type=float, default=0.5)
+    parser.add_argument("--target-confidence", type=float, default=0.6)
+    parser.add_argument("--max-crop-area", type=float, default=0.5)
+    parser.add_argument("--targets", nargs="*", default=None, help="class names a question asks about")
+    parser.add_argument("--report", default=None, help="write the evaluation as JSON to this file")
+    args = parser.parse_args()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        frames = []
+        for _, frame in iter_frames(args.source, pool, prefetch=8):
+            frames.append(frame)
+            if len(frames) >= args.limit:
+                break
+
+    policy = EscalationPolicy(min_confidence=args.min_confidence, target_confidence=args.target_confidence,
+                              max_crop_area=args.max_crop_area)
+    cascade = load_cascade(args.small, allow_download=True, backend=args.backend, large_name=args.large,
+                           policy=policy, img_size=args.img_size)
+    with inference_context(args.backend):
+        report = evaluate(frames, cascade, args.targets)
+
+    print(f"{'tier':<10}{'avg ms':>10}{'p95 ms':>10}{'recall':>10}{'precision':>11}")
+    for tier, row in report.items():
+        print(f"{tier:<10}{row['avg_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+              f"{row['recall_vs_large']:>10.3f}{row['precision_vs_large']:>11.3f}")
+    print(f"escalation rate {report['cascade']['escalation_rate']:.0%}, reasons {report['cascade']['reasons']}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"small": args.small, "large": args.large, "frames": len(frames), "tiers": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
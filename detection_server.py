@@ -0,0 +1,365 @@
+import argparse  # Importing argparse for the serve / load commands
+import json  # Importing json for the responses
+import queue  # Importing queue to collect requests for the batcher
+import threading  # Importing threading for the batcher and load-generator threads
+import time  # Importing time for batching windows and latency measurement
+from concurrent.futures import Future, ThreadPoolExecutor  # Importing Future to hand results back to requests
+
+import cv2  # Importing OpenCV to decode and encode JPEG frames
+import numpy as np  # Importing numpy for frame buffers and percentiles
+
+import metrics  # Stage timers, off unless enabled
+from backends import BACKENDS, DEFAULT_BACKEND, inference_context, load_detector
+from scene import ZONES, analyze_detections, describe_scene, name_table
+
+
+# One frame waiting for the batcher
+class DetectionRequest:
+    def __init__(self, frame):
+        self.frame = frame  # RGB array
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+# Collects requests that arrive within max_wait of the first one (up to max_batch) and runs them
+# through the shared model as one forward pass. A larger batch raises throughput under load; a
+# shorter wait lowers latency when only a few clients are active.
+class MicroBatcher:
+    def __init__(self, model, max_batch=8, max_wait=0.01, img_size=640, backend=None):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait  # Seconds the first request of a batch may wait for company
+        self.img_size = img_size
+        self.backend = backend
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.queue_waits = []
+        self.inference_seconds = []
+        self.batch_sizes = []
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    # Queue a frame; the returned Future resolves to (scene, batch_size, queue_wait, inference_seconds)
+    def submit(self, frame):
+        request = DetectionRequest(frame)
+        self._queue.put(request)
+        return request.future
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = first.enqueued + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # Finish this batch, then stop
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        with inference_context(self.backend):
+            while True:
+                batch = self._collect()
+                if batch is None:
+                    return
+                self._process(batch)
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        try:
+            with metrics.span("detect_batch", size=len(batch)):
+                results = self.model([request.frame for request in batch], size=self.img_size)
+        except Exception as e:  # Every request of the failed batch gets the error
+            self.errors += 1
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        inference = time.perf_counter() - started
+
+        self.requests += len(batch)
+        self.batches += 1
+        self.batch_sizes.append(len(batch))
+        self.inference_seconds.append(inference)
+        for index, request in enumerate(batch):
+            wait = started - request.enqueued
+            self.queue_waits.append(wait)
+            try:
+                img_height, img_width = request.frame.shape[:2]
+                scene = analyze_detections(results.xyxy[index], img_width, img_height)
+            except Exception as e:  # Only this request fails; the batcher keeps serving
+                self.errors += 1
+                request.future.set_exception(e)
+                continue
+            request.future.set_result((scene, len(batch), wait, inference))
+        for samples in (self.batch_sizes, self.inference_seconds, self.queue_waits):
+            del samples[:-1000]
+
+    def stats(self):
+        waits = np.asarray(self.queue_waits) * 1000.0
+        inference = np.asarray(self.inference_seconds) * 1000.0
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "errors": self.errors,
+            "queued": self._queue.qsize(),
+            "avg_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            "queue_wait_p50_ms": float(np.percentile(waits, 50)) if len(waits) else 0.0,
+            "queue_wait_p95_ms": float(np.percentile(waits, 95)) if len(waits) else 0.0,
+            "inference_avg_ms": float(inference.mean()) if len(inference) else 0.0,
+        }
+
+
+# JSON body for one client: the structured scene plus the usual sentences
+def scene_payload(scene, names, img_width, img_height):
+    table = name_table(names)
+    return {
+        "img_width": img_width,
+        "img_height": img_height,
+        "objects": [
+            {
+                "name": table[class_id],
+                "class_id": class_id,
+                "zone": ZONES[zone],
+                "distance": round(distance, 2),
+                "confidence": round(confidence, 3),
+                "box": [round(value, 1) for value in box],
+            }
+            for class_id, zone, distance, confidence, *box in zip(
+                scene["class_id"].tolist(), scene["zone"].tolist(), scene["distance"].tolist(),
+                scene["confidence"].tolist(), scene["xmin"].tolist(), scene["ymin"].tolist(),
+                scene["xmax"].tolist(), scene["ymax"].tolist(),
+            )
+        ],
+        "description": describe_scene(scene, names),
+    }
+
+
+# HTTP front end: POST /detect with a JPEG/PNG body returns the scene as JSON; GET /stats and
+# /health report on the batcher. Frames are decoded on the connection threads, in parallel.
+class DetectionServer:
+    def __init__(self, batcher, host="127.0.0.1", port=8090, timeout=30.0):
+        from http.server import ThreadingHTTPServer
+
+        self.batcher = batcher
+        self.timeout = timeout
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        from http.server import BaseHTTPRequestHandler
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, so clients reuse their connection
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/stats":
+                    self._send_json(server.batcher.stats())
+                elif path == "/health":
+                    self._send_json({"status": "ok"})
+                else:
+                    self._send_json({"error": f"unknown path {path}"}, status=404)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.split("?", 1)[0] != "/detect":
+                    self._send_json({"error": f"unknown path {self.path}"}, status=404)
+                    return
+
+                started = time.perf_counter()
+                frame = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    self._send_json({"error": "body is not a decodable image"}, status=400)
+                    return
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+                try:
+                    scene, batch_size, wait, inference = server.batcher.submit(frame).result(server.timeout)
+                except Exception as e:
+                    self._send_json({"error": str(e)}, status=500)
+                    return
+
+                payload = scene_payload(scene, server.batcher.model.names, frame.shape[1], frame.shape[0])
+                payload.update({
+                    "client": self.headers.get("X-Client-Id"),
+                    "batch_size": batch_size,
+                    "queue_ms": round(wait * 1000.0, 2),
+                    "inference_ms": round(inference * 1000.0, 2),
+                    "latency_ms": round((time.perf_counter() - started) * 1000.0, 2),
+                })
+                self._send_json(payload)
+
+        return Handler
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="detection-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+
+def encode_jpeg(rgb_frame, quality=80):
+    ok, data = cv2.imencode(".jpg", cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("could not encode frame")
+    return data.tobytes()
+
+
+# Simulate `clients` devices, each posting frames back to back (or at `fps`) for `duration` seconds
+def run_load(url, frames, clients=4, duration=10.0, fps=None, timeout=30.0):
+    import requests
+
+    latencies, batch_sizes, errors = [], [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(index):
+        session = requests.Session()
+        sent = 0
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                response = session.post(url.rstrip("/") + "/detect", data=frames[(index + sent) % len(frames)],
+                                        headers={"Content-Type": "image/jpeg", "X-Client-Id": f"client-{index}"},
+                                        timeout=timeout)
+                response.raise_for_status()
+                batch_size = response.json()["batch_size"]
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    batch_sizes.append(batch_size)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+            sent += 1
+            if fps:
+                pause = 1.0 / fps - (time.perf_counter() - started)
+                if pause > 0:
+                    time.sleep(pause)
+        session.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - started
+
+    values = np.asarray(latencies) * 1000.0
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_fps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_p50_ms": float(np.percentile(values, 50)) if len(values) else 0.0,
+        "latency_p95_ms": float(np.percentile(values, 95)) if len(values) else 0.0,
+        "latency_p99_ms": float(np.percentile(values, 99)) if len(values) else 0.0,
+        "avg_batch_size": float(np.mean(batch_sizes)) if batch_sizes else 0.0,
+    }
+
+
+def load_jpeg_frames(source, limit=32, size=(640, 480)):
+    if source is None:
+        # Synthetic frames: enough to exercise batching, though nothing will be detected
+        rng = np.random.default_rng(0)
+        return [encode_jpeg(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)) for _ in range(limit)]
+
+    from batch_infer import iter_frames
+
+    frames = []
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for _, frame in iter_frames(source, pool, prefetch=8):
+            frames.append(encode_jpeg(frame))
+            if len(frames) >= limit:
+                break
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared detection server with dynamic micro-batching")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="load the model once and serve detections over HTTP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8090)
+    serve.add_argument("--model", default="yolov5s")
+    serve.add_argument("--backend", default=DEFAULT_BACKEND, choices=BACKENDS)
+    serve.add_argument("--img-size", type=int, default=640)
+    serve.add_argument("--threads", type=int, default=None)
+    serve.add_argument("--max-batch", type=int, default=8, help="largest batch per forward pass")
+    serve.add_argument("--max-wait-ms", type=float, default=10.0, help="how long a request may wait for a batch")
+
+    load = commands.add_parser("load", help="load generator: concurrent clients posting frames")
+    load.add_argument("url", help="server URL, e.g. http://127.0.0.1:8090")
+    load.add_argument("--frames", default=None, help="image directory or video (default: synthetic frames)")
+    load.add_argument("-c", "--clients", type=int, default=4)
+    load.add_argument("-d", "--duration", type=float, default=10.0, help="seconds")
+    load.add_argument("--fps", type=float, default=None, help="frames per second per client (default: flat out)")
+    args = parser.parse_args()
+
+    if args.command == "load":
+        report = run_load(args.url, load_jpeg_frames(args.frames), args.clients, args.duration, args.fps)
+        print(json.dumps(report, indent=2))
+        return
+
+    model = load_detector(args.model, allow_download=True, backend=args.backend, img_size=args.img_size,
+                          threads=args.threads)
+    batcher = MicroBatcher(model, args.max_batch, args.max_wait_ms / 1000.0, args.img_size, args.backend).start()
+    server = DetectionServer(batcher, args.host, args.port)
+    print(f"Serving {args.model} ({args.backend}) on {server.url}: max batch {args.max_batch}, "
+          f"max wait {args.max_wait_ms:.0f} ms")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        batcher.stop()
+        print(f"Batcher: {batcher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import threading  # Importing threading for the stats lock
+import time  # Importing time for deadlines and cooldowns
+from collections import deque  # Importing deque for the log of missed deadlines
+
+import numpy as np  # Importing numpy to filter the scene array
+
+import metrics  # Stage timers, off unless enabled
+from scene import ZONES, name_table
+from speech import HAZARD
+
+
+# An object the user is about to walk into: reason is "close" or "approaching"
+class Hazard:
+    __slots__ = ("key", "class_id", "zone", "distance", "speed", "reason")
+
+    def __init__(self, key, class_id, zone, distance, speed, reason):
+        self.key = key  # Track id, or ("class", class_id) without a tracker
+        self.class_id = class_id
+        self.zone = zone
+        self.distance = distance
+        self.speed = speed  # m/s, negative when closing
+        self.reason = reason
+
+    def __repr__(self):
+        return f"Hazard({self.reason}, class={self.class_id}, distance={self.distance:.1f})"
+
+
+# Checks every streamed frame for objects in the walking path and says a short warning with
+# HAZARD priority, which preempts any description or answer and bypasses the LLM entirely.
+# Each warning has a deadline budget measured from the moment its frame was picked up; a
+# warning that starts later than that is logged as a missed deadline, and one still queued after
+# stale_after seconds is dropped instead of being spoken late.
+class HazardAlerter:
+    def __init__(self, speech_worker, tracker=None, max_distance=3.0, closing_speed=1.0, approach_distance=6.0,
+                 zones=("center",), deadline=0.5, stale_after=1.5, cooldown=4.0, repeat_closer=1.0):
+        self.speech_worker = speech_worker
+        self.tracker = tracker  # Optional tracker.SceneTracker for closing speeds and stable keys
+        self.max_distance = max_distance  # Anything in the path closer than this is a hazard
+        self.closing_speed = closing_speed  # m/s towards the user that counts as approaching
+        self.approach_distance = approach_distance  # Approaching objects further away than this are ignored
+        self.zones = [ZONES.index(zone) for zone in zones]
+        self.deadline = deadline  # Seconds from frame capture to the start of the warning
+        self.stale_after = stale_after
+        self.cooldown = cooldown  # Seconds before the same object is announced again
+        self.repeat_closer = repeat_closer  # ...unless it got this many meters closer since
+        self.checked = 0
+        self.alerts = 0
+        self.missed = 0
+        self.dropped = 0
+        self.latencies = deque(maxlen=1000)
+        self.missed_log = deque(maxlen=100)  # (time, warning, latency) of the latest misses
+        self._announced = {}  # Hazard key -> (time, distance) of the last warning
+        self._pending = []
+        self._lock = threading.Lock()
+
+    # Hazards in one frame, most urgent (nearest) first
+    def check(self, scene):
+        hazards = {}
+        if self.tracker is not None:
+            for track in self.tracker.confirmed():
+                if track.misses or track.zone not in self.zones:
+                    continue
+                if track.distance < self.max_distance:
+                    hazards[track.id] = Hazard(track.id, track.class_id, track.zone, track.distance, track.speed, "close")
+                elif track.speed <= -self.closing_speed and track.distance < self.approach_distance:
+                    hazards[track.id] = Hazard(track.id, track.class_id, track.zone, track.distance, track.speed,
+                                               "approaching")
+        else:
+            # No tracker: one hazard per class, from the raw scene rows (sorted nearest first)
+            in_path = np.isin(scene["zone"], self.zones)
+            for row in scene[in_path & (scene["distance"] < self.max_distance)]:
+                key = ("class", int(row["class_id"]))
+                if key not in hazards:
+                    hazards[key] = Hazard(key, int(row["class_id"]), int(row["zone"]), float(row["distance"]), 0.0,
+                                          "close")
+        return sorted(hazards.values(), key=lambda hazard: hazard.distance)
+
+    def _due(self, hazard, now):
+        last = self._announced.get(hazard.key)
+        if last is None:
+            return True
+        announced_at, distance = last
+        return now - announced_at >= self.cooldown or distance - hazard.distance >= self.repeat_closer
+
+    # Short, fixed phrasing so the phrase cache can replay it without synthesizing
+    def message(self, hazard, names):
+        name = name_table(names)[hazard.class_id]
+        meters = max(1, int(round(hazard.distance)))
+        if hazard.reason == "approaching":
+            return f"Caution, {name} approaching, {meters} meters."
+        return f"Stop, {name} ahead, {meters} meter{'s' if meters != 1 else ''}."
+
+    # Plug in after detection (SceneMonitor on_snapshot); returns the warning said, if any
+    def on_snapshot(self, snapshot):
+        started = time.perf_counter()
+        now = time.time()
+        self._sweep()
+        with self._lock:
+            self.checked += 1
+            hazards = [hazard for hazard in self.check(snapshot.scene) if self._due(hazard, now)]
+            if not hazards:
+                metrics.observe("hazard_check", time.perf_counter() - started)
+                return None
+            hazard = hazards[0]  # One warning at a time: the nearest
+            for other in hazards:
+                self._announced[other.key] = (now, other.distance)
+            self._announced = {key: value for key, value in self._announced.items()
+                               if now - value[0] < self.cooldown}
+            self.alerts += 1
+
+        text = self.message(hazard, snapshot.names)
+        captured = snapshot.timestamp
+        remaining = self.stale_after - (now - captured)  # The frame may already be old after inference
+        if remaining <= 0:
+            self._record(text, None)
+            metrics.observe("hazard_check", time.perf_counter() - started)
+            return None
+
+        def on_start(utterance):
+            self._record(text, time.time() - captured)
+
+        utterance = self.speech_worker.say(text, priority=HAZARD, topic="hazard", on_start=on_start,
+                                           max_age=remaining)
+        with self._lock:
+            self._pending.append((utterance, text, captured))
+        metrics.observe("hazard_check", time.perf_counter() - started)
+        metrics.count(f"hazard_{hazard.reason}")
+        return text
+
+    # Latency from capture to the start of the warning, or None for a warning that went stale unspoken
+    def _record(self, text, latency):
+        with self._lock:
+            if latency is None:
+                self.dropped += 1
+                missed = True
+            else:
+                self.latencies.append(latency)
+                missed = latency > self.deadline
+            if missed:
+                self.missed += 1
+                self.missed_log.append((time.time(), text, latency))
+        if latency is not None:
+            metrics.observe("hazard_alert", latency, error=missed)
+        if not missed:
+            return
+        metrics.count("hazard_deadline_missed")
+        if latency is None:
+            print(f"Hazard deadline missed: '{text}' went stale before it could be spoken")
+        else:
+            print(f"Hazard deadline missed: '{text}' started {1000 * latency:.0f} ms after capture "
+                  f"(budget {1000 * self.deadline:.0f} ms)")
+
+    # Warnings that expired in the queue, or were replaced by a newer one, count as missed too
+    def _sweep(self):
+        with self._lock:
+            finished = [item for item in self._pending if item[0].done.is_set()]
+            self._pending = [item for item in self._pending if not item[0].done.is_set()]
+        for utterance, text, _ in finished:
+            if utterance.started is None:
+                self._record(text, None)
+
+    def stats(self):
+        self._sweep()
+        with self._lock:
+            latencies = np.asarray(self.latencies) * 1000.0
+            return {
+                "frames_checked": self.checked,
+                "alerts": self.alerts,
+                "deadline_missed": self.missed,
+                "dropped": self.dropped,
+                "miss_rate": self.missed / self.alerts if self.alerts else 0.0,
+                "latency_avg_ms": float(latencies.mean()) if len(latencies) else 0.0,
+                "latency_max_ms": float(latencies.max()) if len(latencies) else 0.0,
+                "deadline_ms": 1000.0 * self.deadline,
+            }
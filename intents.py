@@ -0,0 +1,251 @@
+import re  # Importing re for the intent patterns and vocabulary matching
+import time  # Importing time to measure fast-path latency
+from functools import lru_cache  # Importing lru_cache so each vocabulary is compiled once
+
+import numpy as np  # Importing numpy to filter the scene array
+
+import metrics  # Event counters, off unless enabled
+from scene import ZONES, group_scene, name_table
+from scene_memory import format_age
+
+# Class vocabulary of the COCO-trained YOLOv5 models, indexed by class id
+COCO_NAMES = (
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat", "traffic light",
+    "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat", "dog", "horse", "sheep", "cow",
+    "elephant", "bear", "zebra", "giraffe", "backpack", "umbrella", "handbag", "tie", "suitcase", "frisbee",
+    "skis", "snowboard", "sports ball", "kite", "baseball bat", "baseball glove", "skateboard", "surfboard",
+    "tennis racket", "bottle", "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple",
+    "sandwich", "orange", "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair", "couch",
+    "potted plant", "bed", "dining table", "toilet", "tv", "laptop", "mouse", "remote", "keyboard",
+    "cell phone", "microwave", "oven", "toaster", "sink", "refrigerator", "book", "clock", "vase", "scissors",
+    "teddy bear", "hair drier", "toothbrush",
+)
+
+# Everyday words for the model's class names
+SYNONYMS = {
+    "people": "person", "man": "person", "woman": "person", "someone": "person", "somebody": "person",
+    "bike": "bicycle", "motorbike": "motorcycle", "plane": "airplane", "table": "dining table",
+    "desk": "dining table", "sofa": "couch", "television": "tv", "monitor": "tv", "screen": "tv",
+    "plant": "potted plant", "phone": "cell phone", "mobile": "cell phone", "smartphone": "cell phone",
+    "remote control": "remote", "fridge": "refrigerator", "computer": "laptop", "mug": "cup",
+    "glass": "wine glass", "bag": "handbag", "ball": "sports ball", "hair dryer": "hair drier",
+    "toilet seat": "toilet", "stool": "chair", "seat": "chair",
+}
+
+IRREGULAR_PLURALS = {"person": "people", "knife": "knives", "mouse": "mice", "sheep": "sheep", "skis": "skis",
+                     "scissors": "scissors"}
+
+# How each zone is said to the user, and the words that refer to it
+ZONE_PHRASES = {"left": "on your left", "center": "in front of you", "right": "on your right"}
+ZONE_WORDS = {"left": "left", "right": "right", "front": "center", "ahead": "center", "center": "center",
+              "middle": "center", "straight": "center"}
+ZONE_PATTERN = re.compile(r"\b(" + "|".join(ZONE_WORDS) + r")\b")
+
+DESCRIBE_PATTERN = re.compile(
+    r"\b(describe|recognize objects|everything|surroundings|what do you see|what can you see|"
+    r"what(?:'s| is) around|look around|see)\b")
+COUNT_PATTERN = re.compile(r"\bhow many\b")
+READ_PATTERN = re.compile(r"\b(read|written|text|what does (?:it|this|that|the \w+) say)\b")
+# Only phrasing that asks about the past: "on my left" is a spatial question, not a recall one
+RECALL_PATTERN = re.compile(r"\b(where (?:is|are) my|have you seen|last (?:saw|see|seen)|did i (?:leave|put|drop))\b")
+NEAREST_PATTERN = re.compile(
+    r"\b(where|nearest|closest|find|get to|go to|walk to|reach|locate|is there|are there|any|see)\b")
+ZONE_QUERY_PATTERN = re.compile(r"\b(what|anything|something|is there|are there|objects?|things?)\b")
+
+
+def plural(name):
+    if name in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[name]
+    if name.endswith(("s", "sh", "ch", "x")):
+        return name + "es"
+    return name + "s"
+
+
+def with_article(name):
+    return ("an " if name[0] in "aeiou" else "a ") + name
+
+
+# Phrase -> class name for every class (singular, plural and synonyms), as one regex, longest first
+@lru_cache(maxsize=8)
+def vocabulary(class_names):
+    phrases = {}
+    for name in class_names:
+        phrases[name] = name
+        phrases[plural(name)] = name
+    for word, name in SYNONYMS.items():
+        if name in class_names:
+            phrases.setdefault(word, name)
+            phrases.setdefault(plural(word), name)
+    ordered = sorted(phrases, key=len, reverse=True)
+    pattern = re.compile(r"\b(" + "|".join(re.escape(phrase) for phrase in ordered) + r")\b")
+    return pattern, phrases
+
+
+# What a question asks for: kind is "describe", "read", "nearest", "count", "zone" or "recall"
+class Intent:
+    def __init__(self, kind, objects=(), zone=None):
+        self.kind = kind
+        self.objects = objects  # Class names the question mentions
+        self.zone = zone  # "left", "center", "right" or None
+
+    def __repr__(self):
+        return f"Intent({self.kind!r}, objects={self.objects!r}, zone={self.zone!r})"
+
+
+# Map a question onto an intent the local answerer can handle, or None for open-ended requests
+def parse_intent(question, class_names=COCO_NAMES):
+    text = re.sub(r"[^a-z' ]+", " ", question.lower())
+    pattern, phrases = vocabulary(tuple(class_names))
+    objects = tuple(dict.fromkeys(phrases[match] for match in pattern.findall(text)))
+    zone_match = ZONE_PATTERN.search(text)
+    zone = ZONE_WORDS[zone_match.group(1)] if zone_match else None
+
+    if READ_PATTERN.search(text):
+        return Intent("read", zone=zone)
+    if objects and COUNT_PATTERN.search(text):
+        return Intent("count", objects, zone)
+    recall = RECALL_PATTERN.search(text)
+    if objects and NEAREST_PATTERN.search(text) and not recall:
+        return Intent("nearest", objects, zone)
+    if zone and not objects and ZONE_QUERY_PATTERN.search(text):
+        return Intent("zone", zone=zone)
+    if objects and recall:
+        return Intent("recall", objects, zone)
+    if not objects and DESCRIBE_PATTERN.search(text):
+        return Intent("describe")
+    return None
+
+
+def _matching(scene, names, intent):
+    table = name_table(names)
+    mask = np.isin(table[scene["class_id"]], intent.objects) if len(scene) else np.zeros(0, dtype=bool)
+    if intent.zone is not None:
+        mask &= scene["zone"] == ZONES.index(intent.zone)
+    matching = scene[mask]
+    return matching[np.argsort(matching["distance"], kind="stable")], table
+
+
+def _where(intent):
+    return " " + ZONE_PHRASES[intent.zone] if intent.zone else ""
+
+
+def answer_nearest(intent, scene, names):
+    matching, table = _matching(scene, names, intent)
+    if not len(matching):
+        wanted = " or ".join(plural(name) for name in intent.objects)
+        return f"I can't see any {wanted}{_where(intent)} right now."
+
+    nearest = matching[0]
+    name = table[nearest["class_id"]]
+    where = ZONE_PHRASES[ZONES[nearest["zone"]]]
+    sentence = f"The nearest {name} is {where}, about {nearest['distance']:.1f} meters away."
+    if len(matching) > 1:
+        label = plural(name) if len(intent.objects) == 1 else "of them"
+        sentence = f"I can see {len(matching)} {label}{_where(intent)}. " + sentence
+    return sentence
+
+
+def answer_count(intent, scene, names):
+    matching, _ = _matching(scene, names, intent)
+    wanted = " or ".join(plural(name) for name in intent.objects)
+    if not len(matching):
+        return f"I can't see any {wanted}{_where(intent)} right now."
+    if intent.zone is not None:
+        return f"I can see {len(matching)} {wanted}{_where(intent)}."
+
+    counts = np.bincount(matching["zone"], minlength=len(ZONES))
+    parts = [f"{count} {ZONE_PHRASES[zone]}" for zone, count in zip(ZONES, counts.tolist()) if count]
+    return f"I can see {len(matching)} {wanted}: " + ", ".join(parts) + "."
+
+
+def answer_zone(intent, scene, names):
+    groups = [group for group in group_scene(scene, names) if group["zone"] == intent.zone]
+    if not groups:
+        return f"I don't see anything {ZONE_PHRASES[intent.zone]}."
+
+    groups.sort(key=lambda group: group["nearest"])
+    items = []
+    for group in groups:
+        if group["count"] == 1:
+            items.append(f"{with_article(group['name'])} about {group['nearest']:.1f} meters away")
+        else:
+            items.append(f"{group['count']} {plural(group['name'])}, the nearest about {group['nearest']:.1f} meters away")
+    listed = items[0] if len(items) == 1 else ", ".join(items[:-1]) + " and " + items[-1]
+    return f"{ZONE_PHRASES[intent.zone].capitalize()} there is {listed}."
+
+
+def _last_saw(sighting, table):
+    return (f"I last saw {with_article(table[sighting.class_id])} {ZONE_PHRASES[sighting.zone_name]}, "
+            f"about {sighting.distance:.1f} meters away, {format_age(sighting.age())}.")
+
+
+# "Where is my phone": the nearest one in view, otherwise where the scene memory last saw one.
+# A zone in the question ("on my left") applies to the remembered sighting too.
+def answer_recall(intent, scene, names, memory=None):
+    matching, table = _matching(scene, names, intent)
+    if len(matching) or memory is None:
+        return answer_nearest(intent, scene, names)
+
+    wanted = " or ".join(plural(name) for name in intent.objects)
+    class_ids = np.flatnonzero(np.isin(table, intent.objects))
+    sighting = memory.last_seen(class_ids, zone=intent.zone)
+    if sighting is not None:
+        return "I can't see it right now. " + _last_saw(sighting, table)
+    if intent.zone is not None:
+        # Nothing there, now or before: say where one actually is instead
+        anywhere = Intent(intent.kind, intent.objects)
+        if len(_matching(scene, names, anywhere)[0]):
+            return f"I can't see any {wanted}{_where(intent)}. " + answer_nearest(anywhere, scene, names)
+        sighting = memory.last_seen(class_ids)
+        if sighting is not None:
+            return f"I haven't seen any {wanted}{_where(intent)}. " + _last_saw(sighting, table)
+    return f"I can't see any {wanted}{_where(intent)} right now, and I haven't seen any recently."
+
+
+ANSWERERS = {"nearest": answer_nearest, "count": answer_count, "zone": answer_zone}
+
+
+# Answers spatial questions from the detection data in milliseconds and counts how many
+# questions it covered, so only open-ended requests go to the language model. With a
+# scene_memory.SceneMemory, objects that are out of view are answered from where they were last seen.
+class LocalAnswerer:
+    def __init__(self, class_names=COCO_NAMES, memory=None):
+        self.class_names = tuple(class_names)
+        self.memory = memory
+        self.questions = 0
+        self.fallbacks = 0
+        self.by_intent = {}
+        self.total_seconds = 0.0
+
+    # The intent of a question, or None when it has to go to the language model
+    def route(self, question):
+        self.questions += 1
+        intent = parse_intent(question, self.class_names)
+        if intent is None:
+            self.fallbacks += 1
+            metrics.count("fast_path_fallbacks")
+        else:
+            self.by_intent[intent.kind] = self.by_intent.get(intent.kind, 0) + 1
+            metrics.count("fast_path_answered")
+        return intent
+
+    def answer(self, intent, scene, names):
+        started = time.perf_counter()
+        try:
+            if intent.kind == "recall":
+                return answer_recall(intent, scene, names, self.memory)
+            return ANSWERERS[intent.kind](intent, scene, names)
+        finally:
+            self.total_seconds += time.perf_counter() - started
+
+    def stats(self):
+        answered = self.questions - self.fallbacks
+        timed = answered - self.by_intent.get("describe", 0) - self.by_intent.get("read", 0)
+        return {
+            "questions": self.questions,
+            "answered": answered,
+            "fallbacks": self.fallbacks,
+            "coverage": answered / self.questions if self.questions else 0.0,
+            "avg_ms": 1000 * self.total_seconds / timed if timed else 0.0,
+            "by_intent": dict(self.by_intent),
+        }
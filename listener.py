@@ -0,0 +1,287 @@
+import json  # Importing json to read the offline recognizers' results
+import os  # Importing os for the recognizer selection
+import queue  # Importing queue to hand audio and phrases between threads
+import threading  # Importing threading for the capture and recognition threads
+import time  # Importing time for calibration and latency measurement
+from collections import deque  # Importing deque for the pre-speech audio buffer
+
+import numpy as np  # Importing numpy for the frame energy
+
+import metrics  # Stage timers, off unless enabled
+
+# Speech-to-text backends. "google" needs the network; the others run offline once their
+# package and model are installed (pocketsphinx, vosk or openai-whisper).
+RECOGNIZERS = ("google", "sphinx", "vosk", "whisper")
+DEFAULT_RECOGNIZER = os.environ.get("AI_NAV_RECOGNIZER", "google")
+
+_sr = None
+
+
+# speech_recognition is imported on first use, like the other heavy dependencies
+def speech_recognition():
+    global _sr
+    if _sr is None:
+        import speech_recognition as sr
+        _sr = sr
+    return _sr
+
+
+def recognize(recognizer, audio, backend=DEFAULT_RECOGNIZER):
+    if backend == "google":
+        return recognizer.recognize_google(audio)
+    if backend == "sphinx":
+        return recognizer.recognize_sphinx(audio)
+    if backend == "vosk":
+        result = recognizer.recognize_vosk(audio)
+        text = json.loads(result).get("text", "") if result.lstrip().startswith("{") else result
+        if not text:
+            raise speech_recognition().UnknownValueError()
+        return text
+    if backend == "whisper":
+        return recognizer.recognize_whisper(audio, model="base.en", language="english").strip()
+    raise ValueError(f"Unknown recognizer {backend!r}, expected one of {RECOGNIZERS}")
+
+
+# Root-mean-square energy of a chunk of 16-bit audio
+def frame_energy(data):
+    samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples ** 2))) if len(samples) else 0.0
+
+
+# One recognized utterance
+class Phrase:
+    def __init__(self, text, speech_ended, recognized, duration):
+        self.text = text
+        self.speech_ended = speech_ended  # perf_counter() at the end of the last voiced chunk
+        self.recognized = recognized  # perf_counter() when the text was available
+        self.duration = duration  # Seconds of audio in the phrase
+
+    # End-of-speech to text, including the pause needed to decide the phrase is over
+    @property
+    def latency(self):
+        return self.recognized - self.speech_ended
+
+
+# Keeps the microphone open on a background thread. The noise floor is calibrated once at
+# start-up, follows the room during silence and is re-measured every recalibrate_interval
+# seconds. An energy VAD cuts the audio into phrases, which a second thread recognizes while
+# capture continues; recognized phrases are delivered through a queue. While is_playing()
+# reports that the assistant is talking, and for holdoff_seconds after, a phrase only starts
+# when the audio is barge_in_ratio times louder than usual, so the speaker's own voice
+# picked up by the microphone is not taken for a command.
+class SpeechListener:
+    def __init__(self, backend=DEFAULT_RECOGNIZER, device_index=None, sample_rate=16000, chunk_size=512,
+                 calibration_seconds=1.0, recalibrate_interval=300.0, threshold_ratio=2.5, min_threshold=150.0,
+                 start_seconds=0.1, pause_seconds=0.6, pre_roll_seconds=0.3, min_phrase_seconds=0.25,
+                 max_phrase_seconds=10.0, noise_smoothing=0.02, on_speech_start=None, is_playing=None,
+                 holdoff_seconds=0.5, barge_in_ratio=3.0):
+        if backend not in RECOGNIZERS:
+            raise ValueError(f"Unknown recognizer {backend!r}, expected one of {RECOGNIZERS}")
+        self.backend = backend
+        self.recognizer = speech_recognition().Recognizer()
+        self.device_index = device_index
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.calibration_seconds = calibration_seconds
+        self.recalibrate_interval = recalibrate_interval
+        self.threshold_ratio = threshold_ratio  # Speech is this many times louder than the noise floor
+        self.min_threshold = min_threshold
+        self.start_seconds = start_seconds  # Voiced audio needed before a phrase starts
+        self.pause_seconds = pause_seconds  # Silence that ends a phrase
+        self.pre_roll_seconds = pre_roll_seconds  # Audio kept from before the detected start
+        self.min_phrase_seconds = min_phrase_seconds  # Shorter bursts (clicks, bumps) are ignored
+        self.max_phrase_seconds = max_phrase_seconds
+        self.noise_smoothing = noise_smoothing
+        self.on_speech_start = on_speech_start  # Called from the capture thread, e.g. for barge-in
+        self.is_playing = is_playing  # e.g. lambda: speech_worker.speaking
+        self.holdoff_seconds = holdoff_seconds  # Room echo and the audio buffer outlast playback a little
+        self.barge_in_ratio = barge_in_ratio
+
+        self.noise_floor = None
+        self.calibrations = 0
+        self.phrases_heard = 0
+        self.recognized = 0
+        self.unrecognized = 0
+        self.errors = 0
+        self.echo_chunks = 0
+        self.latencies = []
+        self.phrases = queue.Queue(maxsize=8)
+        self._audio = queue.Queue(maxsize=4)
+        self._calibrated_at = 0.0
+        self._played_at = float("-inf")
+        self._recalibrate = threading.Event()
+        self._running = threading.Event()
+        self._threads = []
+
+    @property
+    def threshold(self):
+        if self.noise_floor is None:
+            return self.min_threshold
+        return max(self.min_threshold, self.noise_floor * self.threshold_ratio)
+
+    def start(self):
+        if not self._threads:
+            self._running.set()
+            self._threads = [
+                threading.Thread(target=self._capture, name="speech-capture", daemon=True),
+                threading.Thread(target=self._recognize, name="speech-recognize", daemon=True),
+            ]
+            for thread in self._threads:
+                thread.start()
+        return self
+
+    def stop(self):
+        self._running.clear()
+        self._audio.put(None)
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Ask for a fresh noise measurement the next time nobody is speaking
+    def recalibrate(self):
+        self._recalibrate.set()
+
+    # Next recognized phrase, or None if nothing was said within timeout seconds
+    def get(self, timeout=None):
+        try:
+            return self.phrases.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    # True while the assistant is talking or its audio may still be echoing
+    def _in_playback(self):
+        now = time.perf_counter()
+        if self.is_playing is not None and self.is_playing():
+            self._played_at = now
+        return now - self._played_at < self.holdoff_seconds
+
+    def _calibrate(self, source):
+        chunks = max(1, int(self.calibration_seconds * source.SAMPLE_RATE / source.CHUNK))
+        with metrics.span("mic_calibration"):
+            energies = [frame_energy(source.stream.read(source.CHUNK)) for _ in range(chunks)]
+        self.noise_floor = float(np.median(energies))
+        self.calibrations += 1
+        self._calibrated_at = time.perf_counter()
+        self._recalibrate.clear()
+
+    def _capture(self):
+        sr = speech_recognition()
+        microphone = sr.Microphone(device_index=self.device_index, sample_rate=self.sample_rate,
+                                   chunk_size=self.chunk_size)  # Opened here, so PyAudio is only needed once started
+        with microphone as source:
+            self._calibrate(source)
+            chunk_seconds = source.CHUNK / source.SAMPLE_RATE
+            pre_roll = deque(maxlen=max(1, int(self.pre_roll_seconds / chunk_seconds)))
+            start_chunks = max(1, int(self.start_seconds / chunk_seconds))
+            pause_chunks = max(1, int(self.pause_seconds / chunk_seconds))
+            max_chunks = int(self.max_phrase_seconds / chunk_seconds)
+
+            frames = []
+            voiced = 0  # Consecutive loud chunks while waiting for speech
+            silent = 0  # Consecutive quiet chunks while in a phrase
+            speech_ended = None
+            while self._running.is_set():
+                if not frames and (self._recalibrate.is_set() or
+                                   time.perf_counter() - self._calibrated_at > self.recalibrate_interval):
+                    self._calibrate(source)
+                    pre_roll.clear()
+
+                data = source.stream.read(source.CHUNK)
+                energy = frame_energy(data)
+                loud = energy > self.threshold
+
+                if not frames:
+                    pre_roll.append(data)
+                    playback = self._in_playback()
+                    if playback and loud:
+                        loud = energy > self.threshold * self.barge_in_ratio
+                        if not loud:
+                            self.echo_chunks += 1
+                    voiced = voiced + 1 if loud else 0
+                    if not loud and not playback:
+                        # Follow slow changes in background noise while nobody is speaking
+                        self.noise_floor += self.noise_smoothing * (energy - self.noise_floor)
+                    if voiced >= start_chunks:
+                        frames = list(pre_roll)
+                        pre_roll.clear()
+                        silent = 0
+                        speech_ended = time.perf_counter()
+                        if self.on_speech_start is not None:
+                            self.on_speech_start()
+                    continue
+
+                frames.append(data)
+                if loud:
+                    silent = 0
+                    speech_ended = time.perf_counter()
+                else:
+                    silent += 1
+                if silent < pause_chunks and len(frames) < max_chunks:
+                    continue
+
+                duration = (len(frames) - silent) * chunk_seconds
+                if duration >= self.min_phrase_seconds:
+                    audio = sr.AudioData(b"".join(frames), source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+                    self._put(self._audio, (audio, speech_ended, duration))
+                frames = []
+                voiced = 0
+
+    # Drop the oldest item rather than block capture when a consumer falls behind
+    def _put(self, target, item):
+        while True:
+            try:
+                target.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    target.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _recognize(self):
+        sr = speech_recognition()
+        while self._running.is_set():
+            item = self._audio.get()
+            if item is None:
+                return
+            audio, speech_ended, duration = item
+            self.phrases_heard += 1
+            try:
+                with metrics.span("stt", backend=self.backend):
+                    text = recognize(self.recognizer, audio, self.backend)
+            except sr.UnknownValueError:
+                self.unrecognized += 1
+                metrics.count("stt_unrecognized")
+                continue
+            except sr.RequestError as e:
+                self.errors += 1
+                metrics.count("stt_errors")
+                print(f"Speech service error: {e}")
+                continue
+
+            phrase = Phrase(text, speech_ended, time.perf_counter(), duration)
+            self.recognized += 1
+            self.latencies.append(phrase.latency)
+            del self.latencies[:-1000]
+            self._put(self.phrases, phrase)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            "backend": self.backend,
+            "phrases": self.phrases_heard,
+            "recognized": self.recognized,
+            "unrecognized": self.unrecognized,
+            "errors": self.errors,
+            "calibrations": self.calibrations,
+            "echo_chunks_ignored": self.echo_chunks,
+            "threshold": self.threshold,
+            "latency_avg_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_max_ms": 1000 * latencies[-1] if latencies else 0.0,
+        }
@@ -0,0 +1,132 @@
+import hashlib  # Importing hashlib to turn canonical keys into compact digests
+import re  # Importing re for question normalization
+import sqlite3  # Importing sqlite3 for the optional on-disk store
+import threading  # Importing threading so the cache can be shared between threads
+import time  # Importing time for TTL bookkeeping
+from collections import OrderedDict  # Importing OrderedDict for the in-memory LRU
+
+import numpy as np  # Importing numpy to read the structured scene array
+
+import metrics  # Event counters, off unless enabled
+
+# Objects whose estimated distance falls in the same bucket are treated as the same scene
+DISTANCE_BUCKET = 2.0
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+_FILLER = re.compile(r"^(?:(?:hey|ok|okay|please|so|can you|could you|would you|tell me)\s+)+")
+
+
+# Sorted (class id, zone, distance bucket) tuples: detection order and small jitter don't matter
+def canonical_scene(scene):
+    if scene is None or not len(scene):
+        return ()
+    buckets = np.floor(scene["distance"] / DISTANCE_BUCKET).astype(np.int32)
+    return tuple(sorted(zip(scene["class_id"].tolist(), scene["zone"].tolist(), buckets.tolist())))
+
+
+# Lowercase, strip punctuation and leading filler so "Where's the chair?" and
+# "please where's the chair" hit the same entry
+def normalize_question(question):
+    question = _PUNCTUATION.sub(" ", question.lower().replace("’", "'").replace("'", ""))
+    question = _WHITESPACE.sub(" ", question).strip()
+    return _FILLER.sub("", question)
+
+
+def cache_key(scene, question, namespace=""):
+    raw = repr((namespace, canonical_scene(scene), normalize_question(question)))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# In-memory LRU with a time-to-live, optionally backed by an SQLite file that survives restarts
+class ResponseCache:
+    def __init__(self, max_entries=256, ttl=600.0, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl  # Seconds an answer stays valid
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (created, value)
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, created REAL, value TEXT)")
+            self._db.commit()
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0], now):
+                del self._entries[key]
+                entry = None
+
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT created, value FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and not self._expired(row[0], now):
+                    entry = row
+                    self.disk_hits += 1
+                    self._store(key, entry)
+
+            if entry is None:
+                self.misses += 1
+                metrics.count("llm_cache_misses")
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.count("llm_cache_hits")
+            return entry[1]
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, key, value):
+        entry = (time.time(), value)
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, entry[0], value))
+                self._db.commit()
+
+    # Return the cached answer for (scene, question) or call generate() and remember its result
+    def get_or_generate(self, scene, question, generate, namespace=""):
+        key = cache_key(scene, question, namespace)
+        value = self.get(key)
+        if value is None:
+            value = generate()
+            if value:
+                self.put(key, value)
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    # Drop expired rows from the disk store
+    def purge(self):
+        if self._db is not None and self.ttl is not None:
+            with self._lock:
+                self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,210 @@
+import bisect  # Importing bisect to find histogram buckets
+import json  # Importing json for the trace file
+import os  # Importing os for the environment configuration
+import threading  # Importing threading for the registry lock and the endpoint thread
+import time  # Importing time for the stage timers
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Off by default: span() then returns a shared no-op object and nothing is recorded
+ENABLED = False
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+# Stage histograms and event counters shared by the whole process
+class Registry:
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.trace = None  # Open JSON-lines trace file, if any
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, error=False, labels=None):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+            if error:
+                histogram.errors += 1
+            if self.trace is not None:
+                record = {"ts": time.time(), "stage": stage, "ms": round(seconds * 1000.0, 3)}
+                if error:
+                    record["error"] = True
+                if labels:
+                    record.update(labels)
+                self.trace.write(json.dumps(record) + "\n")
+
+    def count(self, event, value=1):
+        with self._lock:
+            self.counters[event] = self.counters.get(event, 0) + value
+
+    # Prometheus text exposition format
+    def render(self):
+        lines = ["# HELP ai_nav_stage_seconds Time spent per pipeline stage.",
+                 "# TYPE ai_nav_stage_seconds histogram"]
+        with self._lock:
+            stages = sorted(self.stages.items())
+            counters = sorted(self.counters.items())
+            for stage, histogram in stages:
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'ai_nav_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'ai_nav_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'ai_nav_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            lines += ["# HELP ai_nav_stage_errors_total Stage runs that raised.",
+                      "# TYPE ai_nav_stage_errors_total counter"]
+            lines += [f'ai_nav_stage_errors_total{{stage="{stage}"}} {histogram.errors}' for stage, histogram in stages]
+
+            lines += ["# HELP ai_nav_events_total Counted events (cache hits, retries, preemptions, ...).",
+                      "# TYPE ai_nav_events_total counter"]
+            lines += [f'ai_nav_events_total{{event="{event}"}} {value}' for event, value in counters]
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stages": {
+                    stage: {"count": h.count, "sum_s": h.sum, "errors": h.errors,
+                            "avg_ms": 1000.0 * h.sum / h.count if h.count else 0.0}
+                    for stage, h in self.stages.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+
+registry = Registry()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("stage", "labels", "started")
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        registry.observe(self.stage, time.perf_counter() - self.started, exc_type is not None, self.labels)
+        return False
+
+
+# Time a block: `with metrics.span("detect"):`. Extra labels only go to the trace file.
+def span(stage, **labels):
+    if not ENABLED:
+        return NULL_SPAN
+    return Span(stage, labels)
+
+
+def observe(stage, seconds, error=False):
+    if ENABLED:
+        registry.observe(stage, seconds, error)
+
+
+def count(event, value=1):
+    if ENABLED:
+        registry.count(event, value)
+
+
+# Serves GET /metrics (Prometheus text) and /metrics.json on a background thread
+class MetricsServer:
+    def __init__(self, host="127.0.0.1", port=9464):
+        from http.server import ThreadingHTTPServer  # Only imported when the endpoint is used
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def _handler_class(self):
+        from http.server import BaseHTTPRequestHandler
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body, content_type = registry.render(), "text/plain; version=0.0.4"
+                elif path == "/metrics.json":
+                    body, content_type = json.dumps(registry.snapshot()), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+
+# Turn recording on, optionally with the HTTP endpoint and a JSON-lines trace file
+def enable(port=None, trace_path=None, host="127.0.0.1"):
+    global ENABLED
+    ENABLED = True
+    if trace_path:
+        registry.trace = open(trace_path, "a", buffering=1)  # Line-buffered: one record per stage run
+    if port is not None:
+        server = MetricsServer(host, port).start()
+        print(f"Metrics at {server.url}")
+        return server
+    return None
+
+
+# Enable from AI_NAV_METRICS_PORT and/or AI_NAV_TRACE; does nothing when neither is set
+def enable_from_env():
+    port = os.environ.get("AI_NAV_METRICS_PORT")
+    trace_path = os.environ.get("AI_NAV_TRACE")
+    if port or trace_path:
+        return enable(int(port) if port else None, trace_path)
+    return None
@@ -0,0 +1,139 @@
+import argparse  # Importing argparse for running the stand-in on its own
+import json  # Importing json for request and response bodies
+import re  # Importing re to split answers into token-like chunks
+import threading  # Importing threading to serve in the background
+import time  # Importing time for the simulated latency
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Importing the stdlib HTTP server
+
+DEFAULT_ANSWER = (
+    "There are several chairs around you. The closest one is to your right. "
+    "Walk slowly and reach out with your right hand."
+)
+
+
+# Local stand-in for the watsonx.ai text-generation API (plain and server-sent events) and the IAM
+# token endpoint, with configurable latency, for tests and benchmarks without the cloud service
+class MockWatsonxServer:
+    def __init__(self, host="127.0.0.1", port=0, answer=DEFAULT_ANSWER, first_token_latency=0.3,
+                 token_latency=0.02, answer_fn=None):
+        self.answer = answer
+        self.answer_fn = answer_fn  # Optional callable(prompt) -> answer
+        self.first_token_latency = first_token_latency  # Seconds before the first token
+        self.token_latency = token_latency  # Seconds between streamed tokens
+        self.requests = {"token": 0, "generation": 0, "generation_stream": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def iam_url(self):
+        return self.url + "/identity/token"
+
+    def answer_for(self, prompt):
+        return self.answer_fn(prompt) if self.answer_fn else self.answer
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                path = self.path.split("?", 1)[0]
+
+                if path == "/identity/token":
+                    mock.requests["token"] += 1
+                    self._send_json({"access_token": f"mock-token-{mock.requests['token']}", "expires_in": 3600,
+                                     "expiration": int(time.time()) + 3600, "token_type": "Bearer"})
+                    return
+
+                prompt = json.loads(body or b"{}").get("input", "")
+                answer = mock.answer_for(prompt)
+
+                if path == "/ml/v1/text/generation":
+                    mock.requests["generation"] += 1
+                    time.sleep(mock.first_token_latency + mock.token_latency * len(tokenize(answer)))
+                    self._send_json({"results": [{"generated_text": answer, "stop_reason": "eos_token"}]})
+                elif path == "/ml/v1/text/generation_stream":
+                    mock.requests["generation_stream"] += 1
+                    self._stream(answer)
+                else:
+                    self._send_json({"errors": [{"message": f"unknown path {path}"}]}, status=404)
+
+            def _stream(self, answer):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                time.sleep(mock.first_token_latency)
+                for index, token in enumerate(tokenize(answer)):
+                    if index:
+                        time.sleep(mock.token_latency)
+                    event = {"results": [{"generated_text": token, "stop_reason": "not_finished"}]}
+                    self._write_chunk(f"id: {index + 1}\nevent: message\ndata: {json.dumps(event)}\n\n")
+                self._write_chunk("")  # Terminating zero-length chunk
+
+            def _write_chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="mock-watsonx", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# Split text into word-sized chunks, keeping the whitespace, like a token stream would
+def tokenize(text):
+    return re.findall(r"\S+\s*", text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the watsonx.ai text-generation API")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = MockWatsonxServer(port=args.port, first_token_latency=args.first_token_latency,
+                               token_latency=args.token_latency)
+    print(f"Mock watsonx listening on {server.url} (set WATSONX_URL={server.url} "
+          f"WATSONX_IAM_URL={server.iam_url} WATSONX_APIKEY=mock)")
+    server.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,161 @@
+import argparse  # Importing argparse for the cache preparation command
+import os  # Importing os for cache paths and environment configuration
+import shutil  # Importing shutil to copy the hub checkout and weights into the cache
+import threading  # Importing threading for background model loading
+import time  # Importing time for startup measurements
+
+# Pinned YOLOv5 release used to populate the local cache
+YOLOV5_REPO = "ultralytics/yolov5"
+YOLOV5_TAG = "v7.0"
+
+DEFAULT_MODEL = "yolov5s"
+DEFAULT_CACHE_DIR = os.environ.get(
+    "AI_NAV_MODEL_DIR", os.path.join(os.path.expanduser("~"), ".cache", "ai_navigation")
+)
+
+
+def repo_dir(cache_dir=None):
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, "yolov5")
+
+
+def weights_path(name=DEFAULT_MODEL, cache_dir=None):
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"{name}.pt")
+
+
+def is_cached(name=DEFAULT_MODEL, cache_dir=None):
+    return os.path.isfile(os.path.join(repo_dir(cache_dir), "hubconf.py")) and os.path.isfile(
+        weights_path(name, cache_dir)
+    )
+
+
+# Download the pinned YOLOv5 code and weights once and copy them into the local cache
+def prepare_cache(name=DEFAULT_MODEL, cache_dir=None):
+    import torch
+
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    torch.hub.load(f"{YOLOV5_REPO}:{YOLOV5_TAG}", name, trust_repo=True)  # Fetches code and weights
+
+    hub_checkout = os.path.join(torch.hub.get_dir(), f"{YOLOV5_REPO.replace('/', '_')}_{YOLOV5_TAG}")
+    if not os.path.isdir(repo_dir(cache_dir)):
+        shutil.copytree(hub_checkout, repo_dir(cache_dir))
+
+    # YOLOv5 downloads the weights into the working directory
+    for candidate in (f"{name}.pt", os.path.join(hub_checkout, f"{name}.pt")):
+        if os.path.isfile(candidate):
+            shutil.copy2(candidate, weights_path(name, cache_dir))
+            break
+    else:
+        raise FileNotFoundError(f"Could not find downloaded weights {name}.pt")
+
+    return weights_path(name, cache_dir)
+
+
+# Load the YOLOv5 model from the local cache without touching the network.
+# Falls back to the online hub only when allow_download is set.
+def load_model(name=DEFAULT_MODEL, cache_dir=None, allow_download=False, device=None):
+    import torch
+
+    if is_cached(name, cache_dir):
+        return torch.hub.load(
+            repo_dir(cache_dir), "custom", path=weights_path(name, cache_dir),
+            source="local", device=device, _verbose=False,
+        )
+
+    if not allow_download:
+        raise FileNotFoundError(
+            f"{name} is not in the model cache {cache_dir or DEFAULT_CACHE_DIR}; "
+            f"run `python model_loader.py --prepare {name}` once while online"
+        )
+
+    print(f"Model cache is empty, downloading {name} from {YOLOV5_REPO}...")
+    prepare_cache(name, cache_dir)
+    return load_model(name, cache_dir, allow_download=False, device=device)
+
+
+# Loads the model on a background thread so audio and camera can start in the meantime
+class BackgroundModelLoader:
+    def __init__(self, name=DEFAULT_MODEL, cache_dir=None, allow_download=True, loader=load_model):
+        self.name = name
+        self.cache_dir = cache_dir
+        self.allow_download = allow_download
+        self.loader = loader
+        self.load_seconds = None
+        self._model = None
+        self._error = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-loader", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            self._model = self.loader(self.name, self.cache_dir, allow_download=self.allow_download)
+        except Exception as e:  # Re-raised to whoever asks for the model
+            self._error = e
+            print(f"Error: could not load {self.name}: {e}")
+        self.load_seconds = time.perf_counter() - started
+
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        if self._error is None:
+            for callback in callbacks:
+                callback(self._model)
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self._error is None
+
+    # Run callback(model) once the model is loaded (immediately if it already is)
+    def add_done_callback(self, callback):
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        if self._error is None:
+            callback(self._model)
+
+    # Block until the model is loaded and return it
+    def get(self, timeout=None):
+        self.start()
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"{self.name} did not finish loading within {timeout}s")
+        if self._error is not None:
+            raise self._error
+        return self._model
+
+
+# Records how long each startup milestone took, measured from when the timer was created
+class StartupTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks = {}
+
+    def mark(self, event):
+        if event not in self.marks:
+            self.marks[event] = time.perf_counter() - self.started
+            print(f"[startup] {event}: {self.marks[event]:.2f}s")
+        return self.marks[event]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the local YOLOv5 model cache")
+    parser.add_argument("--prepare", metavar="MODEL", help="download MODEL (e.g. yolov5s) into the cache")
+    parser.add_argument("--cache-dir", default=None, help=f"cache directory (default {DEFAULT_CACHE_DIR})")
+    args = parser.parse_args()
+
+    if args.prepare:
+        print(f"Cached weights at {prepare_cache(args.prepare, args.cache_dir)}")
+    else:
+        for model_name in ("yolov5n", "yolov5s", "yolov5m", "yolov5l", "yolov5x"):
+            status = "cached" if is_cached(model_name, args.cache_dir) else "missing"
+            print(f"{model_name}: {status}")
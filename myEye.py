@@ -1,46 +1,84 @@
-import requests  # Importing requests to handle HTTP requests
-import torch  # Importing torch for deep learning and tensor operations
 from PIL import Image  # Importing Image from PIL for image processing
 import numpy as np  # Importing numpy for numerical operations and array handling
 import pyttsx3  # Importing pyttsx3 for Text-to-Speech (TTS)
-import speech_recognition as sr  # Importing SpeechRecognition for speech-to-text conversion
 import cv2  # Importing OpenCV for camera access
+import os  # Importing os for the scene memory path
+import itertools  # Importing itertools for the shared track id counter
+from scene import analyze_detections, describe_scene  # Vectorized scene description
+from camera import CameraStream  # Persistent camera capture with a latest-frame ring buffer
+from streaming import GatedModel, SceneMonitor  # Continuous background detection, skipped on unchanged frames
+from tracker import SceneTracker, describe_events  # Stable object ids and scene deltas
+from scene_memory import SceneMemory  # Where and when each object was last seen
+from llm_cache import ResponseCache, cache_key  # LRU + TTL cache for text-generation answers
+from prompts import build_prompt  # Compact few-shot prompt with a token budget
+from watsonx_client import WatsonxClient  # Pooled watsonx.ai client
+from intents import LocalAnswerer  # Answers spatial questions without the LLM
+from speech import CHAT, DESCRIPTION, SpeechWorker, iter_sentences, prefetch  # Prioritized sentence-level TTS
+from hazards import HazardAlerter  # Obstacle warnings on every streamed frame, within a deadline
+from text_reader import TextReader, describe_text  # OCR on sign-like regions only, cached per region
+from listener import SpeechListener  # Always-on microphone with VAD and a choice of recognizers
+from orchestrator import run_assistant  # Overlapping listen / respond / speak stages
+from model_loader import DEFAULT_CACHE_DIR, BackgroundModelLoader, StartupTimer  # Offline model cache and background loading
+from cascade import DEFAULT_SMALL_MODEL, load_cascade  # Nano model every frame, a larger one when unsure
+import metrics  # Per-stage timers; set AI_NAV_METRICS_PORT and/or AI_NAV_TRACE to turn them on
 
 print("Hello AI Navigation")
 
-# Initialize the speech recognition engine
-recognizer = sr.Recognizer()
+# Off by default; exposes /metrics and writes a JSON-lines trace when configured
+metrics.enable_from_env()
 
-# Function to convert speech to text
+# Reuse the previous detections while the camera sees the same scene (forced refresh every 2 s);
+# the nano model runs on every frame and AI_NAV_LARGE_MODEL takes a second look when it is unsure
+def load_gated_detector(name, cache_dir=None, allow_download=False):
+    return GatedModel(load_cascade(name, cache_dir, allow_download=allow_download))
+
+# Time every startup milestone, and start loading the model while audio and camera come up
+startup = StartupTimer()
+# Never goes to the network: a cold cache fails with instructions to run `python model_loader.py --prepare`
+model_loader = BackgroundModelLoader(DEFAULT_SMALL_MODEL, allow_download=False, loader=load_gated_detector).start()
+
+# Speak on a dedicated thread that owns the pyttsx3 engine (Text-to-Speech); urgent speech
+# preempts less urgent speech, and a newer reply on the same topic replaces a queued one
+speech_worker = SpeechWorker(pyttsx3.init).start()
+
+# Keep the microphone open and calibrated on a background thread; phrases are cut by voice
+# activity and recognized while capture continues (AI_NAV_RECOGNIZER=vosk etc. for offline use).
+# The assistant's own voice is ignored while it plays unless the user talks over it loudly, and
+# starting to talk cuts the assistant off right away, before the phrase is even recognized.
+listener = SpeechListener(on_speech_start=speech_worker.interrupt, is_playing=lambda: speech_worker.speaking).start()
+
+# Function to convert speech to text: the next recognized phrase, or None after a quiet second
 def recognize_speech():
-    with sr.Microphone() as source:
-        print("Listening for input...")
-        recognizer.adjust_for_ambient_noise(source)
-        audio = recognizer.listen(source)
-
-        try:
-            print("Recognizing speech...")
-            user_input = recognizer.recognize_google(audio)
-            print(f"User said: {user_input}")
-            return user_input
-        except sr.UnknownValueError:
-            print("Sorry, I did not understand that.")
-            return None
-        except sr.RequestError:
-            print("Sorry, the speech service is unavailable.")
-            return None
+    phrase = listener.get(timeout=1.0)
+    if phrase is None:
+        return None
+    print(f"User said: {phrase.text} ({phrase.latency:.2f}s after speech ended)")
+    return phrase.text
+
+# A new command cuts off whatever the assistant is still saying (barge-in)
+def listen():
+    user_input = recognize_speech()
+    if user_input:
+        speech_worker.interrupt()
+    return user_input
+
+# Keep the camera open on a background thread so every command gets an already-exposed frame
+camera = CameraStream(0)
+try:
+    camera.start()
+except IOError as e:
+    print(f"Error: {e}")  # Retried on the first command
 
 # Capture an image from the camera
 def capture_image_from_camera():
-    cap = cv2.VideoCapture(0)  # Open the default camera
-    if not cap.isOpened():
-        print("Error: Could not open camera.")
+    try:
+        camera.start()  # No-op once the device is open
+    except IOError as e:
+        print(f"Error: {e}")
         return None
 
-    ret, frame = cap.read()  # Capture a single frame
-    cap.release()  # Release the camera
-
-    if not ret:
+    seq, frame = camera.read_latest()  # Newest frame from the ring buffer
+    if frame is None:
         print("Error: Could not read frame.")
         return None
 
@@ -48,218 +86,242 @@ def capture_image_from_camera():
     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     return Image.fromarray(frame_rgb)
 
-# Load the YOLOv5 model from ultralytics
-model = torch.hub.load('ultralytics/yolov5', 'yolov5s')  # Small version of YOLOv5
-
-# Function to determine where the object is located (left, center, or right) and estimate distance
-def get_navigation_info(row, img_width):
-    object_name = row['name']  # Get the name of the detected object
-    xmin, xmax = row['xmin'], row['xmax']
-    center_x = (xmin + xmax) / 2  # Calculate the center position of the object
-
-    # Determine if the object is on the left, right, or center
-    if center_x < img_width / 3:
-        direction = "left"
-    elif center_x > 2 * img_width / 3:
-        direction = "right"
-    else:
-        direction = "center"
-
-    # Estimate the distance of the object based on its vertical position in the image
-    ymin = row['ymin']
-    distance_estimation = 20 - (ymin / img_height) * 20  # A simple estimation of distance in meters
-
-    return f"A {object_name} is on the {direction},."
-
-# Initialize the pyttsx3 engine for TTS (Text-to-Speech)
-engine = pyttsx3.init()
-
-# Main loop to wait for user command
-while True:
-    # Speech-to-text for user input (real-time command processing)
-    user_input = recognize_speech()
-
-    if user_input:
-        if "recognize objects" in user_input.lower() or "describe" in user_input.lower() or "see" in user_input.lower():
-            # Capture an image from the camera for object detection
-            img = capture_image_from_camera()
-            if img is None:
-                raise Exception("Failed to capture image from camera.")
-
-            # Perform object detection on the image
-            results = model(img)
-
-            # Extract detection data (bounding box coordinates and object names)
-            detection_data = results.pandas().xyxy[0]
-
-            # Get image dimensions for calculating object positions
-            img_width, img_height = img.size
-
-            # List to store navigation descriptions for each detected object
-            navigation_info = []
-            for _, row in detection_data.iterrows():
-                info = get_navigation_info(row, img_width)  # Get the navigation info for each detected object
-                navigation_info.append(info)
-
-            # Combine all the navigation info into one description
-            surroundings_description = " ".join(navigation_info)
-
-            # Print the description of the surroundings
-            print(surroundings_description)
-
-            # Use TTS to speak out the surroundings description
-            engine.say(surroundings_description)
-            engine.runAndWait()
-
+# Run detection continuously in the background so answers use an already-current scene
+STREAMING_MODE = True
+monitor = None
+
+# Track objects across frames so repeated commands only mention what changed
+# Both trackers feed the same scene memory, so they draw their track ids from one counter
+track_ids = itertools.count(1)
+scene_tracker = SceneTracker(ids=track_ids)  # Fed by the streaming monitor on every analyzed frame
+on_demand_tracker = SceneTracker(min_hits=1, max_missed=0, ids=track_ids)  # Fed once per command when not streaming
+
+# Remember objects after they leave the frame (an hour at most), kept across restarts next to the models
+scene_memory = SceneMemory(max_age=3600.0, snapshot_path=os.path.join(DEFAULT_CACHE_DIR, "scene_memory.npy"))
+scene_memory.load(scene_memory.snapshot_path)
+
+# Warn about obstacles in the walking path straight from each streamed frame (set up with the speech worker)
+hazard_alerter = None
+
+def alert_hazards(snapshot):
+    if hazard_alerter is not None:
+        hazard_alerter.on_snapshot(snapshot)
+
+# Start streaming as soon as the background model load finishes
+def start_monitor(model):
+    global monitor
+    startup.mark("model loaded")
+    model.preload()  # The large model loads in the background; until then questions use the small one
+    if STREAMING_MODE and camera.frame_count:
+        monitor = SceneMonitor(model, camera, tracker=scene_tracker, memory=scene_memory,
+                               on_snapshot=alert_hazards).start()
+
+model_loader.add_done_callback(start_monitor)
+
+# Objects in front closer than 3 m, or closing in fast, get a short warning that preempts any other
+# speech; warnings that start more than 0.5 s after their frame was captured are logged as missed
+hazard_alerter = HazardAlerter(speech_worker, scene_tracker, max_distance=3.0, deadline=0.5)
+startup.mark("audio and camera ready")
+
+# The watsonx client is created on first use, so the assistant still starts without credentials
+watsonx = None
+
+def get_watsonx():
+    global watsonx
+    if watsonx is None:
+        watsonx = WatsonxClient()  # Reads WATSONX_APIKEY and refreshes the IAM token as needed
+    return watsonx
+
+# Stream the answer and start speaking its first sentence while the rest is being generated
+STREAMING_GENERATION = True
+
+# Send the scene and user input to an external API for text generation
+# (returns an iterator of text chunks when STREAMING_GENERATION is on)
+def generate_response(scene, names, user_input):
+    # Few-shot prefix plus the live scene in compact form, kept within the token budget
+    prompt, prompt_report = build_prompt(scene, names, user_input, max_tokens=1024)
+    print(f"Prompt size: {prompt_report}")
+
+    # Make the API request through the pooled client (timeouts, retries and token refresh included)
+    if STREAMING_GENERATION:
+        return get_watsonx().generate_stream(prompt, parameters={"repetition_penalty": 1})
+    return get_watsonx().generate_text(prompt, parameters={"repetition_penalty": 1})
+
+# Cache of LLM answers keyed by the normalized scene and question
+response_cache = ResponseCache(max_entries=256, ttl=600.0)
+
+# Remember the streamed answer once it has been fully spoken
+def cache_sentences(key, sentences):
+    spoken = []
+    for sentence in sentences:
+        spoken.append(sentence)
+        yield sentence
+    response_cache.put(key, " ".join(spoken))
+
+# Answer spatial questions ("where is the nearest chair", "what's on my left") from the detections,
+# and "where is my phone" from the scene memory once they are out of view
+local_answerer = LocalAnswerer(memory=scene_memory)
+
+# Read signs and labels: OCR runs only on sign-like detections and text-like regions, and a sign
+# that stays in view is read once (AI_NAV_OCR=tesseract to use Tesseract instead of EasyOCR)
+text_reader = TextReader()
+
+# The EasyOCR models take seconds to load, so that happens in the background at startup
+text_reader.preload()
+
+# Sentences for the text in view, optionally only in one zone ("left", "center", "right").
+# scene and names must come from img; without img the frame of the latest streamed scene is read,
+# so the sign boxes always line up with the text
+def read_text(img=None, scene=None, names=None, zone=None):
+    if not text_reader.available:
+        return []
+    if img is None:
+        snapshot = monitor.latest(max_age=5.0) if monitor else None
+        if snapshot is not None and snapshot.frame is not None:
+            img = cv2.cvtColor(snapshot.frame, cv2.COLOR_BGR2RGB)
+            scene, names = snapshot.scene, snapshot.names
+        else:
+            img = capture_image_from_camera()  # Text-like regions only, no detections for this frame
+            scene = names = None
+    if img is None:
+        return []
+    frame = np.asarray(img)
+    img_height, img_width = frame.shape[:2]
+    results = text_reader.read(frame, scene, names)
+    return describe_text(results, img_width, img_height, zone=zone)
+
+# The tracker, scene, class names and RGB frame to answer from: the latest streamed scene if there
+# is one, otherwise capture and detect on demand
+def observe():
+    snapshot = monitor.latest(max_age=5.0) if monitor else None
+    if snapshot is not None:
+        frame = None if snapshot.frame is None else cv2.cvtColor(snapshot.frame, cv2.COLOR_BGR2RGB)
+        return scene_tracker, snapshot.scene, snapshot.names, frame
+
+    # Capture an image from the camera for object detection
+    with metrics.span("capture"):
+        img = capture_image_from_camera()
+    if img is None:
+        raise Exception("Failed to capture image from camera.")
+
+    # Perform object detection on the image (waits for the model if it is still loading)
+    model = model_loader.get()
+    with metrics.span("detect"):
+        results = model(img)
+
+    # Get image dimensions for calculating object positions
+    img_width, img_height = img.size
+
+    # Bin, distance-estimate and sort all detections straight from the raw results tensor
+    with metrics.span("postprocess"):
+        scene = analyze_detections(results.xyxy[0], img_width, img_height)
+    on_demand_tracker.update(scene)
+    scene_memory.record(on_demand_tracker.confirmed())
+    return on_demand_tracker, scene, results.names, img
+
+# Scene and class names for a question about specific objects: detect on the newest frame and let
+# the cascade escalate to the large model if the small one hasn't seen them with confidence (never
+# waiting for the large model to load: until it is ready the small model's answer is used)
+def observe_targets(objects):
+    with metrics.span("capture"):
+        img = capture_image_from_camera()
+    if img is None:
+        return observe()[1:3]
+
+    model = model_loader.get()
+    with metrics.span("detect"):
+        results = model.detect(img, targets=objects)  # Bypasses the scene gate
+    img_width, img_height = img.size
+    with metrics.span("postprocess"):
+        scene = analyze_detections(results.xyxy[0], img_width, img_height)
+    return scene, results.names
+
+# Work out the reply to one command as (reply, priority), where the reply is a string or an
+# iterator of sentences while an answer streams in
+def respond(user_input):
+    intent = local_answerer.route(user_input)
+    if intent is not None and intent.kind == "describe":
+        active_tracker, scene, names, img = observe()
+        if "everything" in user_input.lower():
+            # Full description on request; it also becomes the baseline for the next changes
+            active_tracker.report()
+            navigation_info = describe_scene(active_tracker.current_scene()[1], names, with_distance=False)
         else:
-            # Ensure surroundings_description is defined
-            surroundings_description = "No objects recognized yet."
-
-            # Code to send the surroundings description and user input to an external API for text generation
-            url = "https://us-south.ml.cloud.ibm.com/ml/v1/text/generation?version=2023-05-29"
-
-            body = {
-                "input": f"""Navigate the person about the surroundings.
-
-                Input: Hello, can you help me with directions?
-                Output: \"Hello! I'\''d be happy to help. What do you need directions to?\"
-
-                Input: A laptop is on the left, approximately 17.6 meters away.
-                A chair is in the center, approximately 18.5 meters away.
-                A book is on the right, approximately 9.4 meters away.
-                A bottle is on the right, approximately 17.6 meters away.
-                A chair is on the right, approximately 19.2 meters away.
-                A chair is on the left, approximately 20.0 meters away.
-                A chair is on the right, approximately 19.7 meters away.
-                A chair is on the right, approximately 19.8 meters away.
-                A chair is on the right, approximately 17.4 meters away.
-                A laptop is on the right, approximately 8.4 meters away.
-                A book is on the right, approximately 8.5 meters away.
-                Where is the nearest book?\"
-                Output: \"There are books on both sides. One book is on your right side, relatively close, and another book is a bit further away on the same side.\"
-
-                Input: \"A laptop is on the left, approximately 17.6 meters away.
-                A chair is in the center, approximately 18.5 meters away.
-                A book is on the right, approximately 9.4 meters away.
-                A bottle is on the right, approximately 17.6 meters away.
-                A chair is on the right, approximately 19.2 meters away.
-                A chair is on the left, approximately 20.0 meters away.
-                A chair is on the right, approximately 19.7 meters away.
-                A chair is on the right, approximately 19.8 meters away.
-                A chair is on the right, approximately 17.4 meters away.
-                A laptop is on the right, approximately 8.4 meters away.
-                A book is on the right, approximately 8.5 meters away.
-                Where is the nearest restroom?\"
-                Output: I don’t have information about a restroom in the current surroundings. You might need to ask someone nearby or move to a different area.
-
-                Input: \"A laptop is on the left, approximately 17.6 meters away.
-                A chair is in the center, approximately 18.5 meters away.
-                A book is on the right, approximately 9.4 meters away.
-                A bottle is on the right, approximately 17.6 meters away.
-                A chair is on the right, approximately 19.2 meters away.
-                A chair is on the left, approximately 20.0 meters away.
-                A chair is on the right, approximately 19.7 meters away.
-                A chair is on the right, approximately 19.8 meters away.
-                A chair is on the right, approximately 17.4 meters away.
-                A laptop is on the right, approximately 8.4 meters away.
-                A book is on the right, approximately 8.5 meters away.
-                Can you describe the items around me?\"
-                Output: \"To your right, you have a book and a bottle, with several chairs positioned at varying distances. To your left, there are a couple of chairs and a laptop. In the center, there is a chair.\"
-
-                Input:  A laptop is on the left, approximately 17.6 meters away.
-                A chair is in the center, approximately 18.5 meters away.
-                A book is on the right, approximately 9.4 meters away.
-                A bottle is on the right, approximately 17.6 meters away.
-                A chair is on the right, approximately 19.2 meters away.
-                A chair is on the left, approximately 20.0 meters away.
-                A chair is on the right, approximately 19.7 meters away.
-                A chair is on the right, approximately 19.8 meters away.
-                A chair is on the right, approximately 17.4 meters away.
-                A laptop is on the right, approximately 8.4 meters away.
-                A book is on the right, approximately 8.5 meters away.
-                What’s the arrangement of the objects around me?
-                Output: You have several items to your right, including books and chairs. On the left, there are some chairs and a laptop. The arrangement is spread out, with objects positioned at different relative distances.\"
-
-                Input: A TV is in the center, approximately 11.9 meters away.
-                A couch is on the left, approximately 8.9 meters away.
-                A bed is on the right, approximately 6.7 meters away.
-                A bed is on the right, approximately 4.6 meters away.
-                A couch is on the right, approximately 4.3 meters away.
-                How do I get to the nearest chair?
-                Output: \"I'\''m sorry, there is no chair in the current surroundings, but there is a couch to your right, which is the closest seating option.\"
-
-                Input: A TV is in the center, approximately 11.9 meters away.
-                A couch is on the left, approximately 8.9 meters away.
-                A bed is on the right, approximately 6.7 meters away.
-                A bed is on the right, approximately 4.6 meters away.
-                A couch is on the right, approximately 4.3 meters away.
-                How do I get to the nearest tv?
-                Output: The TV is in the center. You can simply walk towards it to view it.
-
-                Input: A elephant is on the center, approximately 13.3 meters away.
-                A bird is on the center, approximately 15.9 meters away.
-                A zebra is on the center, approximately 6.8 meters away.
-                A sheep is on the center, approximately 8.4 meters away.
-                A sheep is on the left, approximately 5.2 meters away.
-                A giraffe is on the center, approximately 13.1 meters away.
-                A sheep is on the center, approximately 7.0 meters away.
-                A zebra is on the right, approximately 8.5 meters away.
-                How do I get to the  bed?
-                Output: I don’t have information about a bed in the current surroundings. You might need to ask someone nearby or move to a different area.
-
-                Input: {surroundings_description}
-                What do you want to know about? {user_input}
-                Output:""",
-                "parameters": {
-                    "decoding_method": "greedy",
-                    "max_new_tokens": 300,
-                    "stop_sequences": ["\n\n"],
-                    "repetition_penalty": 1
-                },
-                "model_id": "ibm/granite-13b-chat-v2",
-                "project_id": "8e0a89d4-f10e-49c9-9f1c-e11c4580adee",
-                "moderations": {
-                    "hap": {
-                        "input": {
-                            "enabled": True,
-                            "threshold": 0.5,
-                            "mask": {
-                                "remove_entity_value": True
-                            }
-                        },
-                        "output": {
-                            "enabled": True,
-                            "threshold": 0.5,
-                            "mask": {
-                                "remove_entity_value": True
-                            }
-                        }
-                    }
-                }
-            }
-
-            # Access token (replace with a valid token)
-            accesstoken = "eyJraWQiOiIyMDI0MDkwMjA4NDIiLCJhbGciOiJSUzI1NiJ9.eyJpYW1faWQiOiJJQk1pZC02OTIwMDBJWEZRIiwiaWQiOiJJQk1pZC02OTIwMDBJWEZRIiwicmVhbG1pZCI6IklCTWlkIiwianRpIjoiMGE4ZTg3ODQtOTk2Mi00MGE3LTg5ZTktNTBlMTJlYWMyMTRjIiwiaWRlbnRpZmllciI6IjY5MjAwMElYRlEiLCJnaXZlbl9uYW1lIjoiRGhydXYiLCJmYW1pbHlfbmFtZSI6IkFnYXJ3YWwiLCJuYW1lIjoiRGhydXYgQWdhcndhbCIsImVtYWlsIjoiYS5kaHJ1dkBpaXRnLmFjLmluIiwic3ViIjoiYS5kaHJ1dkBpaXRnLmFjLmluIiwiYXV0aG4iOnsic3ViIjoiYS5kaHJ1dkBpaXRnLmFjLmluIiwiaWFtX2lkIjoiSUJNaWQtNjkyMDAwSVhGUSIsIm5hbWUiOiJEaHJ1diBBZ2Fyd2FsIiwiZ2l2ZW5fbmFtZSI6IkRocnV2IiwiZmFtaWx5X25hbWUiOiJBZ2Fyd2FsIiwiZW1haWwiOiJhLmRocnV2QGlpdGcuYWMuaW4ifSwiYWNjb3VudCI6eyJ2YWxpZCI6dHJ1ZSwiYnNzIjoiOGY4MDZmNmVjYTgzNGQ4ZGEwODRlMzZhYmY5ZmYyZGQiLCJpbXNfdXNlcl9pZCI6IjEyNjg5ODgzIiwiZnJvemVuIjp0cnVlLCJpbXMiOiIyNzUwMzYwIn0sImlhdCI6MTcyNzAxODYxNywiZXhwIjoxNzI3MDIyMjE3LCJpc3MiOiJodHRwczovL2lhbS5jbG91ZC5pYm0uY29tL2lkZW50aXR5IiwiZ3JhbnRfdHlwZSI6InVybjppYm06cGFyYW1zOm9hdXRoOmdyYW50LXR5cGU6YXBpa2V5Iiwic2NvcGUiOiJpYm0gb3BlbmlkIiwiY2xpZW50X2lkIjoiZGVmYXVsdCIsImFjciI6MSwiYW1yIjpbInB3ZCJdfQ.dW0wdcgsfn5HyI1b1Eqtk6fTji4FJtkqMGYOwYEpxI-ZiVtSKFOa0-CtnMcZ26quupOebLDjMBE6If3vLzhkOxn9ViYMTcs7DjsgSdFJ4RwzWPd7hj06QQ9-U7hYUAXzKNOMBF-hG6E87IqflIP24Twlrpw1sohcTNRaU1Cq_ghcXxp2zy4rBl3D9rNhAJM5frGm4j46ofWFGBf5qFUMZoDVskiyfWYMT1O7avQuzuIYKYLXHl5_s-LCuLMTTetzt3h_TQZ7MynP4skpvdH0urcLyuJrX_MGcVoZazNwfeakemuiS2h0S1xHLLk9kX-41G7Z9wj_QoKCS_oW4E2dXA"
-
-            # Prepare headers for the API request
-            headers = {
-                "Accept": "application/json",
-                "Content-Type": "application/json",
-                "Authorization": "Bearer" + " " + accesstoken
-            }
-
-            # Make the API request
-            response = requests.post(url, headers=headers, json=body)
-
-            # Check for a successful response
-            if response.status_code != 200:
-                raise Exception("Non-200 response: " + str(response.text))
-
-            # Parse and print the response
-            data = response.json()
-            print(data)
-
-            # Use TTS to speak out the AI response
-            ai_response = data['results'][0]['generated_text']
-            engine.say(ai_response)
-            engine.runAndWait()
+            # Only what changed since the last description (everything, the first time)
+            navigation_info = describe_events(active_tracker.report(), names) or ["Nothing has changed."]
+
+        # Readable text goes alongside the objects
+        navigation_info += read_text(img, scene, names)
+
+        # Combine all the navigation info into one description
+        return " ".join(navigation_info), DESCRIPTION
+
+    if intent is not None and intent.kind == "read":
+        sentences = read_text(zone=intent.zone)
+        print(f"Text reading {text_reader.stats()}")
+        return " ".join(sentences) or "I can't find any text to read.", DESCRIPTION
+
+    if intent is not None:
+        # Nearest-object, count and what-is-where questions are answered locally in milliseconds
+        scene, names = observe_targets(intent.objects) if intent.objects else observe()[1:3]
+        reply = local_answerer.answer(intent, scene, names)
+        print(f"Local answer, fast path {local_answerer.stats()}")
+        return reply, DESCRIPTION
+
+    # Use the latest streamed scene, if any, so the answer reflects the current surroundings
+    snapshot = monitor.latest(max_age=5.0) if monitor else None
+    scene = snapshot.scene if snapshot is not None else None
+    names = snapshot.names if snapshot is not None else {}
+
+    # Answer from the cache when the same question was asked about the same scene
+    key = cache_key(scene, user_input)
+    ai_response = response_cache.get(key)
+    if ai_response is not None:
+        print(f"AI response (cached), cache {response_cache.stats()}")
+        return ai_response, CHAT
+
+    if STREAMING_GENERATION:
+        # The request goes out right away on a prefetch thread, before the reply reaches the speech
+        # queue; sentences are spoken as they complete
+        return cache_sentences(key, prefetch(iter_sentences(generate_response(scene, names, user_input)))), CHAT
+
+    ai_response = generate_response(scene, names, user_input)
+    response_cache.put(key, ai_response)
+    return ai_response, CHAT
+
+# Report how long a reply waited for the speaker
+def on_speech_start(utterance):
+    print(f"Queued for speech: {utterance.queue_latency:.2f}s")
+    startup.mark("first response")
+
+# Hand a reply from respond() to the speech worker without waiting for it to be spoken;
+# each sentence is printed as it starts playing
+def speak(response):
+    reply, priority = response
+    topic = "scene" if priority == DESCRIPTION else "answer"
+    return speech_worker.say(reply, priority=priority, topic=topic, on_start=on_speech_start, on_sentence=print)
+
+# Listen, think and talk as overlapping stages, so the assistant can hear the next command while
+# it is still speaking; set to False for the original one-step-at-a-time loop
+ORCHESTRATED = True
+
+if ORCHESTRATED:
+    run_assistant(listen, respond, speak)
+    print(f"Speech: {speech_worker.stats()}")
+    print(f"Fast path: {local_answerer.stats()}")
+    print(f"Scene memory: {scene_memory.stats()}")
+    print(f"Hazards: {hazard_alerter.stats()}")
+    print(f"Text reading: {text_reader.stats()}")
+    scene_memory.save(scene_memory.snapshot_path)
+    print(f"Listener: {listener.stats()}")
+    if model_loader.ready:
+        print(f"Scene gate: {model_loader.get().gate.stats()}")
+        print(f"Cascade: {model_loader.get().stats()}")
+else:
+    # Main loop to wait for user command
+    while True:
+        # Speech-to-text for user input (real-time command processing)
+        user_input = listen()
+
+        if user_input:
+            speak(respond(user_input)).done.wait()
@@ -0,0 +1,183 @@
+import asyncio  # Importing asyncio for the event loop that connects the stages
+import time  # Importing time for queue wait and stage timings
+from concurrent.futures import ThreadPoolExecutor  # Importing executors for the blocking stages
+
+import metrics  # Stage timers, off unless enabled
+
+
+# Bounded queue between two stages. When it is full the oldest item is dropped, and items that
+# waited longer than max_age are discarded on get, so stages always work on the freshest input.
+class StageQueue:
+    def __init__(self, name, maxsize=1, max_age=None):
+        self.name = name
+        self.max_age = max_age
+        self.dropped = 0  # Items pushed out by newer ones
+        self.stale = 0  # Items that expired while waiting
+        self.max_depth = 0
+        self.waits = []
+        self._queue = asyncio.Queue(maxsize=maxsize)
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    def put(self, item):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+            metrics.count(f"queue_{self.name}_dropped")
+        self._queue.put_nowait((time.perf_counter(), item))
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    async def get(self):
+        while True:
+            queued_at, item = await self._queue.get()
+            wait = time.perf_counter() - queued_at
+            if self.max_age is not None and wait > self.max_age:
+                self.stale += 1
+                continue
+            self.waits.append(wait)
+            del self.waits[:-1000]  # Keep a bounded window for the statistics
+            return item
+
+    def stats(self):
+        waits = sorted(self.waits)
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "dropped": self.dropped,
+            "stale": self.stale,
+            "wait_avg_ms": 1000 * sum(waits) / len(waits) if waits else 0.0,
+            "wait_max_ms": 1000 * waits[-1] if waits else 0.0,
+        }
+
+
+# A set of stages running concurrently on one event loop. Blocking stage functions run on a
+# dedicated single-thread executor each, so libraries that are not thread-safe (TTS, audio)
+# always see the same thread while stages still overlap with each other.
+class Pipeline:
+    def __init__(self):
+        self.stages = []
+        self.queues = []
+        self.timings = {}
+        self.errors = {}
+        self._executors = {}
+        self._tasks = []
+
+    def queue(self, name, maxsize=1, max_age=None):
+        stage_queue = StageQueue(name, maxsize, max_age)
+        self.queues.append(stage_queue)
+        return stage_queue
+
+    def _executor(self, name):
+        if name not in self._executors:
+            self._executors[name] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        return self._executors[name]
+
+    async def _call(self, name, fn, *args):
+        started = time.perf_counter()
+        failed = False
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                return await fn(*args)
+            return await asyncio.get_running_loop().run_in_executor(self._executor(name), fn, *args)
+        except Exception as e:  # A failing item must not kill the stage
+            failed = True
+            self.errors[name] = self.errors.get(name, 0) + 1
+            print(f"Error in stage {name}: {e}")
+            return None
+        finally:
+            timing = self.timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            elapsed = time.perf_counter() - started
+            timing["count"] += 1
+            timing["total"] += elapsed
+            timing["max"] = max(timing["max"], elapsed)
+            metrics.observe("pipeline_" + name, elapsed, failed)
+
+    # A stage with no input, called in a loop (e.g. the microphone); None results are skipped
+    def add_source(self, name, fn, outbox):
+        async def run():
+            while True:
+                result = await self._call(name, fn)
+                if result is not None:
+                    outbox.put(result)
+
+        self.stages.append((name, run))
+
+    # A stage that turns each item from inbox into zero or one items for outbox
+    def add_stage(self, name, fn, inbox, outbox=None):
+        async def run():
+            while True:
+                item = await inbox.get()
+                result = await self._call(name, fn, item)
+                if result is not None and outbox is not None:
+                    outbox.put(result)
+
+        self.stages.append((name, run))
+
+    def stats(self):
+        return {
+            "queues": {stage_queue.name: stage_queue.stats() for stage_queue in self.queues},
+            "stages": {
+                name: {
+                    "count": timing["count"],
+                    "avg_ms": 1000 * timing["total"] / timing["count"] if timing["count"] else 0.0,
+                    "max_ms": 1000 * timing["max"],
+                    "errors": self.errors.get(name, 0),
+                }
+                for name, timing in self.timings.items()
+            },
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        for name, queue_stats in stats["queues"].items():
+            print(f"[queue {name}] " + ", ".join(f"{key}={value:.1f}" if isinstance(value, float) else
+                                                 f"{key}={value}" for key, value in queue_stats.items()))
+        for name, stage_stats in stats["stages"].items():
+            print(f"[stage {name}] " + ", ".join(f"{key}={value:.1f}" if isinstance(value, float) else
+                                                 f"{key}={value}" for key, value in stage_stats.items()))
+
+    async def run(self, report_interval=None):
+        self._tasks = [asyncio.create_task(run(), name=name) for name, run in self.stages]
+        if report_interval:
+            async def report():
+                while True:
+                    await asyncio.sleep(report_interval)
+                    self.print_stats()
+            self._tasks.append(asyncio.create_task(report(), name="report"))
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            for executor in self._executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+
+
+# The assistant as three overlapping stages: listen -> respond -> speak.
+# listen() returns the recognized text or None, respond(text) returns what to say,
+# and speak(reply) plays it. Commands older than max_command_age are discarded.
+def build_assistant_pipeline(listen, respond, speak, max_command_age=10.0, max_reply_age=30.0):
+    pipeline = Pipeline()
+    commands = pipeline.queue("commands", maxsize=1, max_age=max_command_age)
+    replies = pipeline.queue("replies", maxsize=1, max_age=max_reply_age)
+    pipeline.add_source("listen", listen, commands)
+    pipeline.add_stage("respond", respond, commands, replies)
+    pipeline.add_stage("speak", speak, replies)
+    return pipeline
+
+
+def run_assistant(listen, respond, speak, report_interval=60.0, **kwargs):
+    pipeline = build_assistant_pipeline(listen, respond, speak, **kwargs)
+    try:
+        asyncio.run(pipeline.run(report_interval=report_interval))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.print_stats()
+    return pipeline
@@ -0,0 +1,162 @@
+import math  # Importing math for the token estimate
+from functools import lru_cache  # Importing lru_cache so the few-shot prefix is rendered once
+
+import numpy as np  # Importing numpy for ranking objects against the budget
+
+from scene import MAX_DISTANCE, SCENE_DTYPE, ZONES, group_scene
+
+INSTRUCTION = (
+    "Navigate the person about the surroundings. Each scene lists the objects per zone "
+    "(left, center, right) with how many there are and the distance of the nearest one in meters."
+)
+
+# Scenes used by the few-shot examples, as (object, zone, meters) tuples. Each is rendered
+# once and followed by all of its questions, instead of repeating the scene per example.
+EXAMPLE_SCENES = {
+    "office": [
+        ("laptop", "left", 17.6), ("chair", "center", 18.5), ("book", "right", 9.4),
+        ("bottle", "right", 17.6), ("chair", "right", 19.2), ("chair", "left", 20.0),
+        ("chair", "right", 19.7), ("chair", "right", 19.8), ("chair", "right", 17.4),
+        ("laptop", "right", 8.4), ("book", "right", 8.5),
+    ],
+    "dining": [("dining table", "center", 10.0), ("chair", "right", 5.0)],
+    "tv room": [("tv", "center", 15.0), ("couch", "left", 10.0)],
+    "bedroom": [
+        ("tv", "center", 11.9), ("couch", "left", 8.9), ("bed", "right", 6.7),
+        ("bed", "right", 4.6), ("couch", "right", 4.3),
+    ],
+    "outdoors": [
+        ("elephant", "center", 13.3), ("bird", "center", 15.9), ("zebra", "center", 6.8),
+        ("sheep", "center", 8.4), ("sheep", "left", 5.2), ("giraffe", "center", 13.1),
+        ("sheep", "center", 7.0), ("zebra", "right", 8.5),
+    ],
+}
+
+# (scene name or None, question, answer)
+EXAMPLES = [
+    (None, "Hello, can you help me with directions?",
+     "Hello! I'd be happy to help. What do you need directions to?"),
+    ("office", "How do I get to the nearest chair?",
+     "There are several chairs around you. To your right, you can find a chair in the center and others further away. There is also a chair on your left side."),
+    ("office", "Where is the nearest book?",
+     "There are books on both sides. One book is on your right side, relatively close, and another book is a bit further away on the same side."),
+    ("office", "Where is the nearest exit?",
+     "I don't have information about the exit in this area. You might need to ask someone nearby or explore cautiously."),
+    ("office", "Where is the nearest restroom?",
+     "I don't have information about a restroom in the current surroundings. You might need to ask someone nearby or move to a different area."),
+    ("office", "Can you describe the items around me?",
+     "To your right, you have a book and a bottle, with several chairs positioned at varying distances. To your left, there are a couple of chairs and a laptop. In the center, there is a chair."),
+    ("office", "What's the arrangement of the objects around me?",
+     "You have several items to your right, including books and chairs. On the left, there are some chairs and a laptop. The arrangement is spread out, with objects positioned at different relative distances."),
+    ("dining", "How do I sit down at the table?",
+     "Walk towards the table in the center, and you will find a chair on your right side that you can sit on."),
+    ("tv room", "Where is the remote control?",
+     "I don't have information about a remote control. You may want to check the area around the couch or ask someone nearby."),
+    ("bedroom", "How do I get to the nearest chair?",
+     "I'm sorry, there is no chair in the current surroundings, but there is a couch to your right, which is the closest seating option."),
+    ("bedroom", "How do I get to the nearest tv?",
+     "The TV is in the center. You can simply walk towards it to view it."),
+    ("outdoors", "How do I get to the bed?",
+     "I don't have information about a bed in the current surroundings. You might need to ask someone nearby or move to a different area."),
+]
+
+
+# Rough size of the prompt in model tokens (about 4 characters per token for English text)
+def estimate_tokens(text):
+    return math.ceil(len(text) / 4)
+
+
+# Build a scene array from (object, zone, meters) tuples, for the example scenes
+def scene_from_objects(objects):
+    names = sorted({name for name, _, _ in objects})
+    scene = np.zeros(len(objects), dtype=SCENE_DTYPE)
+    for index, (name, zone, distance) in enumerate(objects):
+        scene[index]["class_id"] = names.index(name)
+        scene[index]["zone"] = ZONES.index(zone)
+        scene[index]["distance"] = distance
+        scene[index]["confidence"] = 1.0
+    return scene, names
+
+
+# Compact one-line scene: "left: laptop 17.6m, chair 20.0m | center: chair 18.5m | right: chair x4 17.4m"
+def encode_scene(scene, names):
+    if scene is None or not len(scene):
+        return "nothing detected"
+
+    zones = {}
+    for group in group_scene(scene, names):
+        count = f" x{group['count']}" if group["count"] > 1 else ""
+        zones.setdefault(group["zone"], []).append((group["nearest"], f"{group['name']}{count} {group['nearest']:.1f}m"))
+
+    parts = []
+    for zone in ZONES:
+        if zone in zones:
+            items = ", ".join(text for _, text in sorted(zones[zone]))
+            parts.append(f"{zone}: {items}")
+    return " | ".join(parts)
+
+
+# The instruction plus the first `example_count` few-shot examples, grouped by scene
+@lru_cache(maxsize=None)
+def few_shot_prefix(example_count=len(EXAMPLES)):
+    blocks = [INSTRUCTION]
+    current_scene = object()
+    for scene_name, question, answer in EXAMPLES[:example_count]:
+        if scene_name != current_scene:
+            current_scene = scene_name
+            if scene_name is None:
+                blocks.append("")
+            else:
+                blocks.append("\nScene: " + encode_scene(*scene_from_objects(EXAMPLE_SCENES[scene_name])))
+        blocks.append(f"Question: {question}\nAnswer: \"{answer}\"")
+    return "\n".join(blocks) + "\n"
+
+
+# Keep the most useful objects first: close and confidently detected
+def rank_objects(scene):
+    closeness = 1.0 - np.clip(scene["distance"], 0, MAX_DISTANCE) / MAX_DISTANCE
+    return np.argsort(-(scene["confidence"] * (0.5 + closeness)), kind="stable")
+
+
+def render(prefix, scene, names, question):
+    return f"{prefix}\nScene: {encode_scene(scene, names)}\nQuestion: {question}\nAnswer:"
+
+
+# Build the prompt for the live scene within max_tokens. Trailing few-shot examples are dropped
+# first (down to min_examples), then the farthest / least confident objects, and only then the
+# remaining examples. Returns the prompt and a report of its size.
+def build_prompt(scene, names, question, max_tokens=1024, min_examples=4, count_tokens=estimate_tokens):
+    if scene is None:
+        scene = np.zeros(0, dtype=SCENE_DTYPE)
+    ranked = scene[rank_objects(scene)] if len(scene) else scene
+
+    example_count = len(EXAMPLES)
+    while True:
+        prefix = few_shot_prefix(example_count)
+
+        # Largest number of objects that fits, by binary search on the ranked scene
+        low, high = 0, len(ranked)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens(render(prefix, ranked[:middle], names, question)) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        kept = low
+
+        prompt = render(prefix, ranked[:kept], names, question)
+        tokens = count_tokens(prompt)
+        if example_count == 0 or (tokens <= max_tokens and (kept == len(ranked) or example_count <= min_examples)):
+            break
+        example_count -= 1
+
+    report = {
+        "tokens": tokens,
+        "chars": len(prompt),
+        "prefix_tokens": count_tokens(prefix),
+        "objects_kept": kept,
+        "objects_dropped": len(ranked) - kept,
+        "examples": example_count,
+        "over_budget": tokens > max_tokens,
+    }
+    return prompt, report
@@ -0,0 +1,129 @@
+import numpy as np  # Importing numpy for batched array operations on detections
+
+# Zone labels, indexed by the zone code stored in the scene array (0 = left, 1 = center, 2 = right)
+ZONES = ("left", "center", "right")
+
+# Distance (in meters) assigned to an object whose box starts at the very top of the image
+MAX_DISTANCE = 20.0
+
+# One record per detected object: bounding box, confidence, class id and the derived zone/distance
+SCENE_DTYPE = np.dtype([
+    ("xmin", np.float32),
+    ("ymin", np.float32),
+    ("xmax", np.float32),
+    ("ymax", np.float32),
+    ("confidence", np.float32),
+    ("class_id", np.int16),
+    ("zone", np.int8),
+    ("distance", np.float32),
+])
+
+
+# Convert raw YOLOv5 output (results.xyxy[i] tensor or any (n, 6) array) to a float32 NumPy array
+def to_numpy(detections):
+    if hasattr(detections, "detach"):
+        detections = detections.detach().cpu().numpy()
+    return np.asarray(detections, dtype=np.float32).reshape(-1, 6)
+
+
+# Pairwise IoU between two sets of boxes given as (n, 4+) arrays of xmin, ymin, xmax, ymax
+def box_iou(a, b):
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:4] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:4] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+# The (n, 4) box array of a scene
+def scene_boxes(scene):
+    return np.stack([scene["xmin"], scene["ymin"], scene["xmax"], scene["ymax"]], axis=1)
+
+
+# Bin every detection into left/center/right, estimate its distance and sort the scene nearest first
+def analyze_detections(detections, img_width, img_height):
+    det = to_numpy(detections)
+
+    scene = np.empty(len(det), dtype=SCENE_DTYPE)
+    scene["xmin"] = det[:, 0]
+    scene["ymin"] = det[:, 1]
+    scene["xmax"] = det[:, 2]
+    scene["ymax"] = det[:, 3]
+    scene["confidence"] = det[:, 4]
+    scene["class_id"] = det[:, 5]
+
+    # Same thresholds as the old per-row code: left below 1/3 of the width, right above 2/3
+    center_x = (det[:, 0] + det[:, 2]) / 2
+    scene["zone"] = (center_x >= img_width / 3).astype(np.int8) + (center_x > 2 * img_width / 3)
+
+    # Estimate the distance of the object based on its vertical position in the image
+    scene["distance"] = MAX_DISTANCE - (det[:, 1] / img_height) * MAX_DISTANCE
+
+    return scene[np.argsort(scene["distance"], kind="stable")]
+
+
+# Build a lookup table so class ids can be mapped to names with a single fancy-index
+def name_table(names):
+    if isinstance(names, dict):
+        table = np.empty(max(names) + 1 if names else 0, dtype=object)
+        for class_id, name in names.items():
+            table[class_id] = name
+        return table
+    return np.asarray(list(names), dtype=object)
+
+
+# Produce one navigation sentence per object in the scene
+def describe_scene(scene, names, with_distance=True):
+    object_names = name_table(names)[scene["class_id"]].tolist()
+    zones = np.asarray(ZONES, dtype=object)[scene["zone"]].tolist()
+
+    if not with_distance:
+        return [f"A {name} is on the {zone}." for name, zone in zip(object_names, zones)]
+
+    distances = scene["distance"].tolist()
+    return [
+        f"A {name} is on the {zone}, approximately {distance:.1f} meters away."
+        for name, zone, distance in zip(object_names, zones, distances)
+    ]
+
+
+# Group the scene by (zone, class) with the object count, nearest distance and best confidence
+def group_scene(scene, names):
+    if len(scene) == 0:
+        return []
+
+    order = np.lexsort((scene["distance"], scene["class_id"], scene["zone"]))
+    ordered = scene[order]
+    keys = ordered["zone"].astype(np.int32) * 65536 + ordered["class_id"]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+    counts = np.diff(np.r_[starts, len(ordered)])
+    nearest = ordered["distance"][starts]  # Sorted by distance within each group
+    best_confidence = np.maximum.reduceat(ordered["confidence"], starts)
+    object_names = name_table(names)[ordered["class_id"][starts]].tolist()
+
+    return [
+        {
+            "zone": ZONES[zone],
+            "class_id": int(class_id),
+            "name": name,
+            "count": int(count),
+            "nearest": float(distance),
+            "confidence": float(confidence),
+        }
+        for zone, class_id, name, count, distance, confidence in zip(
+            ordered["zone"][starts].tolist(),
+            ordered["class_id"][starts].tolist(),
+            object_names,
+            counts.tolist(),
+            nearest.tolist(),
+            best_confidence.tolist(),
+        )
+    ]
+
+
+# Convenience wrapper: run the whole postprocessing for one image of a YOLOv5 results object
+def describe_results(results, img_width, img_height, index=0, with_distance=True):
+    scene = analyze_detections(results.xyxy[index], img_width, img_height)
+    return scene, describe_scene(scene, results.names, with_distance=with_distance)
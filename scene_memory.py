@@ -0,0 +1,204 @@
+import os  # Importing os for the atomic snapshot replace
+import threading  # Importing threading so the monitor thread and the main loop can share the store
+import time  # Importing time for sighting ages
+from collections import OrderedDict  # Importing OrderedDict for oldest-first eviction
+
+import numpy as np  # Importing numpy for the snapshot format
+
+from scene import ZONES
+
+# One row per remembered object in the on-disk snapshot (39 bytes each)
+MEMORY_DTYPE = np.dtype([
+    ("track_id", np.int64),
+    ("first_seen", np.float64),
+    ("last_seen", np.float64),
+    ("distance", np.float32),
+    ("confidence", np.float32),
+    ("hits", np.int32),
+    ("class_id", np.int16),
+    ("zone", np.int8),
+])
+
+
+# Where and when one tracked object was last seen
+class Sighting:
+    __slots__ = ("track_id", "class_id", "zone", "distance", "confidence", "first_seen", "last_seen", "hits")
+
+    def __init__(self, track_id, class_id, zone, distance, confidence, first_seen, last_seen, hits=1):
+        self.track_id = track_id
+        self.class_id = class_id
+        self.zone = zone
+        self.distance = distance
+        self.confidence = confidence
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+        self.hits = hits
+
+    @property
+    def zone_name(self):
+        return ZONES[self.zone]
+
+    def age(self, now=None):
+        return (time.time() if now is None else now) - self.last_seen
+
+    def __repr__(self):
+        return f"Sighting(id={self.track_id}, class={self.class_id}, zone={self.zone_name}, last_seen={self.last_seen:.1f})"
+
+
+# Remembers tracked objects after they leave the frame, so "where is my phone" can be answered
+# from what was seen a while ago. Sightings are indexed by class id, newest last, which makes
+# "last seen" an O(1) lookup. Entries older than max_age, beyond max_entries overall or beyond
+# max_per_class for one class are evicted oldest first, so memory stays flat over long sessions.
+class SceneMemory:
+    def __init__(self, max_age=3600.0, max_entries=1000, max_per_class=32, snapshot_path=None,
+                 snapshot_interval=60.0):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.max_per_class = max_per_class  # So a crowd of people can't push everything else out
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.recorded = 0
+        self.evicted = 0
+        self.lookups = 0
+        self.hits = 0
+        self._entries = OrderedDict()  # track id -> Sighting, least recently seen first
+        self._by_class = {}  # class id -> OrderedDict of track id -> Sighting, least recently seen first
+        self._last_snapshot = time.time()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Plug in after detection: record the tracker's confirmed tracks for this frame
+    def record(self, tracks, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            for track in tracks:
+                if track.misses:
+                    continue  # Not detected in this frame; keep where it was actually seen
+                sighting = self._entries.get(track.id)
+                if sighting is None:
+                    sighting = Sighting(track.id, track.class_id, track.zone, track.distance, track.confidence,
+                                        track.first_seen, track.last_seen, track.hits)
+                    self._entries[track.id] = sighting
+                    self._by_class.setdefault(track.class_id, OrderedDict())[track.id] = sighting
+                else:
+                    if sighting.class_id != track.class_id:
+                        # Re-indexed under its new class, or last_seen() would look in the wrong place
+                        self._remove_from_class(track.id, sighting.class_id)
+                        sighting.class_id = track.class_id
+                        self._by_class.setdefault(track.class_id, OrderedDict())[track.id] = sighting
+                    sighting.zone = track.zone
+                    sighting.distance = track.distance
+                    sighting.confidence = track.confidence
+                    sighting.last_seen = track.last_seen
+                    sighting.hits = track.hits
+                    self._entries.move_to_end(track.id)
+                    self._by_class[sighting.class_id].move_to_end(track.id)
+                self.recorded += 1
+
+                by_class = self._by_class[sighting.class_id]
+                while len(by_class) > self.max_per_class:
+                    self._remove(next(iter(by_class)))
+            self._evict(timestamp)
+
+        if self.snapshot_path and timestamp - self._last_snapshot >= self.snapshot_interval:
+            self.save(self.snapshot_path)
+
+    def _remove(self, track_id):
+        sighting = self._entries.pop(track_id)
+        self._remove_from_class(track_id, sighting.class_id)
+        self.evicted += 1
+
+    def _remove_from_class(self, track_id, class_id):
+        by_class = self._by_class[class_id]
+        del by_class[track_id]
+        if not by_class:
+            del self._by_class[class_id]
+
+    def _evict(self, now):
+        while self._entries:
+            track_id, oldest = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - oldest.last_seen <= self.max_age:
+                break
+            self._remove(track_id)
+
+    # Most recent sighting of any of the class ids, optionally only in one zone ("left" etc.), or None
+    def last_seen(self, class_ids, now=None, zone=None):
+        now = time.time() if now is None else now
+        zone = None if zone is None else ZONES.index(zone)
+        best = None
+        with self._lock:
+            self.lookups += 1
+            for class_id in class_ids:
+                for sighting in reversed(self._by_class.get(int(class_id), {}).values()):
+                    if zone is not None and sighting.zone != zone:
+                        continue
+                    if now - sighting.last_seen <= self.max_age and (best is None or sighting.last_seen > best.last_seen):
+                        best = sighting
+                    break  # Newest first: older sightings of this class can't be more recent
+            if best is not None:
+                self.hits += 1
+        return best
+
+    # Every remembered sighting of one class, newest first
+    def sightings(self, class_id):
+        with self._lock:
+            return list(reversed(self._by_class.get(int(class_id), {}).values()))
+
+    def save(self, path):
+        with self._lock:
+            rows = np.empty(len(self._entries), dtype=MEMORY_DTYPE)
+            for index, s in enumerate(self._entries.values()):
+                rows[index] = (s.track_id, s.first_seen, s.last_seen, s.distance, s.confidence, s.hits,
+                               s.class_id, s.zone)
+            self._last_snapshot = time.time()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, rows, allow_pickle=False)
+        os.replace(tmp_path, path)  # Never leaves a half-written snapshot behind
+        return len(rows)
+
+    # Restore a snapshot written by save() before recording starts; entries that have aged out are dropped
+    def load(self, path):
+        if not os.path.isfile(path):
+            return 0
+        rows = np.load(path, allow_pickle=False)
+        with self._lock:
+            for row in rows[np.argsort(rows["last_seen"], kind="stable")]:
+                sighting = Sighting(int(row["track_id"]), int(row["class_id"]), int(row["zone"]),
+                                    float(row["distance"]), float(row["confidence"]), float(row["first_seen"]),
+                                    float(row["last_seen"]), int(row["hits"]))
+                # Track ids restart with every run, so restored sightings get negative keys
+                key = -len(self._entries) - 1
+                while key in self._entries:
+                    key -= 1
+                sighting.track_id = key
+                self._entries[key] = sighting
+                self._by_class.setdefault(sighting.class_id, OrderedDict())[key] = sighting
+            self._evict(time.time())
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "classes": len(self._by_class),
+                "recorded": self.recorded,
+                "evicted": self.evicted,
+                "lookups": self.lookups,
+                "hits": self.hits,
+            }
+
+
+# "just now", "40 seconds ago", "3 minutes ago", ...
+def format_age(seconds):
+    if seconds < 5:
+        return "just now"
+    for unit, size in (("hour", 3600), ("minute", 60), ("second", 1)):
+        if seconds >= size:
+            count = int(seconds // size)
+            return f"{count} {unit}{'s' if count != 1 else ''} ago"
+    return "just now"
@@ -0,0 +1,352 @@
+import argparse  # Importing argparse for the standalone runner
+import multiprocessing as mp  # Importing multiprocessing for the capture and inference processes
+import queue  # Importing queue for the result hand-off
+import threading  # Importing threading for the result reader in the main process
+import time  # Importing time for pacing and throughput
+from multiprocessing import shared_memory  # Importing shared_memory for the frame ring
+
+import numpy as np  # Importing numpy for views onto the shared buffer
+
+# Header fields (int64) in front of the frame slots
+LATEST, READER, WRITTEN, COPIES, BYTES_COPIED, HEIGHT, WIDTH, CHANNELS, SLOTS = range(9)
+HEADER_FIELDS = 9
+DATA_OFFSET = 4096  # Frames start page-aligned after the header and the per-slot sequence numbers
+
+
+# Ring of frame slots in shared memory, written by one capture process and read by one inference
+# process. The reader gets NumPy views onto the slots, so frames are never pickled or copied
+# between processes; the writer never reuses the slot the reader currently holds.
+class SharedFrameRing:
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        slots = int(np.ndarray((HEADER_FIELDS,), np.int64, buffer=shm.buf)[SLOTS])
+        self.header = np.ndarray((HEADER_FIELDS + slots,), np.int64, buffer=shm.buf)
+        self.seqs = self.header[HEADER_FIELDS:]  # Sequence number per slot, -1 while being written
+        self.shape = tuple(int(v) for v in self.header[[HEIGHT, WIDTH, CHANNELS]])
+        self.frame_bytes = int(np.prod(self.shape))
+        self.frames = [
+            np.ndarray(self.shape, np.uint8, buffer=shm.buf, offset=DATA_OFFSET + slot * self.frame_bytes)
+            for slot in range(slots)
+        ]
+        self._reading = (0, None)  # Slot and seq last returned by read_latest()
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @classmethod
+    def create(cls, shape, slots=4):
+        height, width, channels = shape
+        if slots < 3:
+            raise ValueError("need at least 3 slots: one being written, the latest and the one being read")
+        size = DATA_OFFSET + slots * height * width * channels
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        header = np.ndarray((HEADER_FIELDS + slots,), np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[[LATEST, READER, HEIGHT, WIDTH, CHANNELS, SLOTS]] = [-1, -1, height, width, channels, slots]
+        header[HEADER_FIELDS:] = 0
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        # Only the creating process unlinks the segment. Processes started from it share its
+        # resource tracker, so attaching before Python 3.13 just re-registers the same name.
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, owner=False)
+
+    # Writer: a free slot to decode the next frame into (never the latest or the reader's slot).
+    # The slot is invalidated first and the reservation checked again afterwards, so a reader that
+    # reserved it in between either sees the invalid seq and retries, or the writer moves on.
+    def begin_write(self):
+        latest = int(self.header[LATEST])
+        slot = latest
+        while True:
+            slot = (slot + 1) % len(self.frames)
+            if slot == latest or slot == int(self.header[READER]):
+                continue
+            previous = int(self.seqs[slot])
+            self.seqs[slot] = -1
+            if int(self.header[READER]) != slot:
+                return slot, self.frames[slot]
+            self.seqs[slot] = previous  # The reader got there first; leave its frame alone
+
+    def commit(self, slot):
+        seq = int(self.header[WRITTEN]) + 1
+        self.seqs[slot] = seq
+        self.header[LATEST] = slot
+        self.header[WRITTEN] = seq
+        return seq
+
+    # Writer: copy a frame in when it could not be decoded straight into the slot
+    def write(self, frame):
+        slot, view = self.begin_write()
+        view[...] = frame
+        self.count_copy(frame.nbytes)
+        return self.commit(slot)
+
+    def count_copy(self, nbytes):
+        self.header[COPIES] += 1
+        self.header[BYTES_COPIED] += nbytes
+
+    # Reader: newest frame after `after_seq` as (seq, view), or (None, None) if there is none.
+    # The slot stays reserved for the reader until its next call; unchanged() confirms afterwards
+    # that the writer never touched it while it was in use.
+    def read_latest(self, after_seq=0):
+        while True:
+            slot = int(self.header[LATEST])
+            if slot < 0:
+                return None, None
+            seq = int(self.seqs[slot])
+            if seq <= after_seq:
+                return None, None
+            self.header[READER] = slot
+            if int(self.seqs[slot]) == seq:  # Not reclaimed by the writer before the reservation
+                self._reading = (slot, seq)
+                return seq, self.frames[slot]
+
+    # Seqlock check after using the last frame from read_latest(): False means it may be torn
+    def unchanged(self):
+        slot, seq = self._reading
+        return int(self.seqs[slot]) == seq
+
+    def wait_for_frame(self, after_seq=0, timeout=1.0, poll=0.002):
+        deadline = time.perf_counter() + timeout
+        while True:
+            seq, frame = self.read_latest(after_seq)
+            if frame is not None or time.perf_counter() >= deadline:
+                return seq, frame
+            time.sleep(poll)
+
+    def release(self):
+        self.header[READER] = -1
+
+    def stats(self, elapsed=None):
+        written = int(self.header[WRITTEN])
+        copied = int(self.header[BYTES_COPIED])
+        stats = {
+            "frames_written": written,
+            "bytes_per_frame": self.frame_bytes,
+            "capture_copies_per_frame": int(self.header[COPIES]) / written if written else 0.0,
+        }
+        if elapsed:
+            stats["capture_fps"] = written / elapsed
+            stats["ring_write_mb_s"] = written * self.frame_bytes / elapsed / 2 ** 20  # Decoder writes
+            stats["extra_copy_mb_s"] = copied / elapsed / 2 ** 20
+        return stats
+
+    def close(self):
+        self.header = self.seqs = self.frames = None  # Drop the views before closing the mapping
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# Capture process: decode frames straight into the ring's slots
+def capture_frames(source, ready, stop_event, slots=4, loop=True):
+    import cv2
+
+    cap = cv2.VideoCapture(source)
+    ret, first = cap.read()
+    if not ret:
+        ready.put(None)
+        return
+    ring = SharedFrameRing.create(first.shape, slots)
+    ring.write(first)
+    ready.put(ring.name)
+
+    # Recordings are replayed at their own frame rate; cameras block in read() anyway
+    fps = cap.get(cv2.CAP_PROP_FPS) if isinstance(source, str) else 0
+    interval = 1.0 / fps if fps and fps > 0 else 0.0
+    next_frame = time.perf_counter()
+    try:
+        while not stop_event.is_set():
+            if interval:
+                next_frame += interval
+                time.sleep(max(0.0, next_frame - time.perf_counter()))
+            slot, dst = ring.begin_write()
+            ret, frame = cap.read(dst)
+            if not ret:
+                if loop and isinstance(source, str):
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)  # Replay recordings
+                    continue
+                break
+            if frame is not dst:  # The decoder allocated its own buffer
+                dst[...] = frame
+                ring.count_copy(frame.nbytes)
+            ring.commit(slot)
+    finally:
+        cap.release()
+        stop_event.wait()  # Keep the segment alive until the readers are done with it
+        ring.close()
+
+
+# Inference process: run the detector on ring views and send back only the small scene arrays
+def detect_frames(ring_name, results, stop_event, model_name="yolov5s", backend=None, img_size=640):
+    from backends import inference_context, load_detector
+    from scene import analyze_detections
+
+    ring = SharedFrameRing.attach(ring_name)
+    model = load_detector(model_name, allow_download=True, backend=backend, img_size=img_size)
+    names = model.names
+    results.put(("names", names))
+
+    last_seq = 0
+    with inference_context(backend):
+        while not stop_event.is_set():
+            seq, frame = ring.wait_for_frame(last_seq, timeout=1.0)
+            if frame is None:
+                continue
+            dropped = max(0, seq - last_seq - 1)
+            last_seq = seq
+            timestamp = time.time()
+            started = time.perf_counter()
+
+            # Channel-reversed view of the BGR slot: the model reads it without an RGB copy
+            img_height, img_width = frame.shape[:2]
+            detections = model(frame[..., ::-1], size=img_size)
+            if not ring.unchanged():
+                results.put(("torn", seq))  # Overwritten during inference: drop the result
+                continue
+            scene = analyze_detections(detections.xyxy[0], img_width, img_height)
+            latency = time.perf_counter() - started
+            results.put(("scene", (seq, timestamp, scene, img_width, img_height, latency, dropped)))
+    ring.release()
+    ring.close()
+
+
+# Drop-in alternative to streaming.SceneMonitor that runs capture and detection in their own
+# processes, so neither competes with audio and speech for the GIL of the main process
+class ProcessSceneMonitor:
+    def __init__(self, source=0, model_name="yolov5s", backend=None, img_size=640, slots=4, tracker=None,
+                 memory=None, on_snapshot=None):
+        self.source = source
+        self.model_name = model_name
+        self.backend = backend
+        self.img_size = img_size
+        self.slots = slots
+        self.tracker = tracker
+        self.memory = memory
+        self.on_snapshot = on_snapshot
+        self.frames_analyzed = 0
+        self.frames_dropped = 0
+        self.frames_torn = 0
+        self.names = None
+        self.ring = None
+        self._latest = None
+        self._started = None
+        self._context = mp.get_context("spawn")  # Same behaviour on every platform
+        self._stop = self._context.Event()
+        self._results = self._context.Queue(maxsize=4)
+        self._processes = []
+        self._thread = None
+
+    def start(self, timeout=30.0):
+        if self._processes:
+            return self
+        ready = self._context.Queue()
+        capture = self._context.Process(target=capture_frames, name="frame-capture", daemon=True,
+                                        args=(self.source, ready, self._stop, self.slots))
+        capture.start()
+        ring_name = ready.get(timeout=timeout)
+        if ring_name is None:
+            self._stop.set()
+            raise IOError(f"Could not read from video source {self.source!r}")
+
+        self.ring = SharedFrameRing.attach(ring_name)
+        detect = self._context.Process(target=detect_frames, name="frame-detect", daemon=True,
+                                       args=(ring_name, self._results, self._stop, self.model_name,
+                                             self.backend, self.img_size))
+        detect.start()
+        self._processes = [capture, detect]
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="scene-results", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        from streaming import SceneSnapshot
+
+        while not self._stop.is_set():
+            try:
+                kind, payload = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if kind == "names":
+                self.names = payload
+                continue
+            if kind == "torn":
+                self.frames_torn += 1
+                continue
+            seq, timestamp, scene, img_width, img_height, latency, dropped = payload
+            snapshot = SceneSnapshot(seq, timestamp, scene, self.names, img_width, img_height, latency, dropped)
+            self.frames_analyzed += 1
+            self.frames_dropped += dropped
+            if self.tracker is not None:
+                snapshot.events = self.tracker.update(scene, timestamp)
+                if self.memory is not None:
+                    self.memory.record(self.tracker.confirmed(), timestamp)
+            self._latest = snapshot
+            if self.on_snapshot is not None:
+                self.on_snapshot(snapshot)
+
+    def latest(self, max_age=None):
+        snapshot = self._latest
+        if snapshot is not None and max_age is not None and snapshot.age > max_age:
+            return None
+        return snapshot
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started if self._started else None
+        stats = self.ring.stats(elapsed) if self.ring is not None else {}
+        stats.update({
+            "frames_analyzed": self.frames_analyzed,
+            "frames_dropped": self.frames_dropped,
+            "frames_torn": self.frames_torn,
+            "inference_fps": self.frames_analyzed / elapsed if elapsed else 0.0,
+        })
+        return stats
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        for process in self._processes:
+            process.join(timeout=5.0)
+        self._processes = []
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+def main():
+    from backends import BACKENDS, DEFAULT_BACKEND
+
+    parser = argparse.ArgumentParser(description="Capture and detection in separate processes over shared memory")
+    parser.add_argument("source", nargs="?", default="0", help="camera index or video file")
+    parser.add_argument("--model", default="yolov5s")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=BACKENDS)
+    parser.add_argument("--img-size", type=int, default=640)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    monitor = ProcessSceneMonitor(source, args.model, args.backend, args.img_size, args.slots).start()
+    try:
+        deadline = time.perf_counter() + args.seconds
+        while time.perf_counter() < deadline:
+            time.sleep(2.0)
+            snapshot = monitor.latest()
+            if snapshot is not None:
+                print(" ".join(snapshot.describe(with_distance=False)) or "Nothing detected.")
+            print(monitor.stats())
+    finally:
+        monitor.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+import hashlib  # Importing hashlib to name cached phrase renderings
+import heapq  # Importing heapq for the speech priority queue
+import itertools  # Importing itertools for queue ordering
+import os  # Importing os for the phrase cache directory
+import queue  # Importing queue to hand sentences from the generation thread to the speaker
+import re  # Importing re for sentence boundary detection
+import threading  # Importing threading to read the stream while speaking
+import time  # Importing time to measure time-to-first-sentence
+import wave  # Importing wave to read rendered phrases
+from collections import OrderedDict  # Importing OrderedDict for the in-memory phrase LRU
+
+import numpy as np  # Importing numpy to hold rendered audio samples
+
+import metrics  # Stage timers, off unless enabled
+
+# End of a sentence: terminal punctuation, optional closing quotes/brackets, then whitespace
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+# Pause inside a sentence, where engine playback can be split up
+CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+
+def clean_sentence(sentence):
+    return sentence.strip().strip("\"").strip()
+
+
+# Split a stream of text chunks into complete sentences as soon as each one ends.
+# Sentences shorter than min_chars are merged with the next so TTS isn't fed fragments.
+def iter_sentences(chunks, min_chars=12):
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        start = 0
+        for match in SENTENCE_END.finditer(buffer):
+            if match.end() - start < min_chars:
+                continue
+            sentence = clean_sentence(buffer[start:match.end()])
+            start = match.end()
+            if sentence:
+                yield sentence
+        buffer = buffer[start:]
+
+    sentence = clean_sentence(buffer)
+    if sentence:
+        yield sentence
+
+
+# Iterate `items` on a background thread so the producer keeps running while the consumer is busy.
+# The thread starts right away, not on the first next(), so e.g. a request is already in flight.
+# Once the returned iterator is closed (or garbage-collected), even before its first item, the
+# producer stops and closes `items`, which releases e.g. a streamed HTTP response.
+def prefetch(items, maxsize=16):
+    buffered = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+
+    def put(entry):
+        while not stopped.is_set():
+            try:
+                buffered.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    # Only refers to the queue and the event, so the consumer can be collected while it runs
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((_Prefetched.done, None))
+        except Exception as e:  # Re-raised in the consumer
+            put((None, e))
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    threading.Thread(target=produce, name="prefetch", daemon=True).start()
+    return _Prefetched(buffered, stopped)
+
+
+# Consumer side of prefetch()
+class _Prefetched:
+    done = object()
+
+    def __init__(self, buffered, stopped):
+        self._buffered = buffered
+        self._stopped = stopped
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._stopped.is_set():
+            raise StopIteration
+        item, error = self._buffered.get()
+        if error is not None or item is self.done:
+            self.close()
+            if error is not None:
+                raise error
+            raise StopIteration
+        return item
+
+    def close(self):
+        self._stopped.set()
+
+    def __del__(self):
+        self._stopped.set()
+
+
+# Speak sentences one at a time as they become available.
+# Returns the full text and the seconds until the first sentence started playing.
+def speak_sentences(engine, sentences, on_sentence=None):
+    started = time.perf_counter()
+    first_sentence = None
+    spoken = []
+    for sentence in sentences:
+        if first_sentence is None:
+            first_sentence = time.perf_counter() - started
+        if on_sentence is not None:
+            on_sentence(sentence)
+        spoken.append(sentence)
+        engine.say(sentence)
+        engine.runAndWait()
+    return " ".join(spoken), first_sentence
+
+
+# Speak a streamed answer sentence by sentence while the rest is still being generated
+def speak_stream(engine, chunks, on_sentence=None):
+    return speak_sentences(engine, prefetch(iter_sentences(chunks)), on_sentence)
+
+
+# Speech priorities: lower numbers are more urgent and preempt less urgent speech
+HAZARD = 0
+DESCRIPTION = 1
+CHAT = 2
+
+
+# One queued reply: a string or an iterator of sentences, spoken in order
+class Utterance:
+    def __init__(self, content, priority, topic, seq, on_start=None, max_age=None, on_sentence=None):
+        self.sentences = [content] if isinstance(content, str) else content
+        self.priority = priority
+        self.topic = topic  # A newer utterance with the same topic replaces this one while queued
+        self.seq = seq
+        self.on_start = on_start
+        self.on_sentence = on_sentence  # Called with each sentence just before it is spoken, e.g. print
+        self.max_age = max_age  # Overrides the worker's max_age, e.g. for warnings that go stale quickly
+        self.created = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.cancelled = False
+        self.done = threading.Event()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    @property
+    def queue_latency(self):
+        return None if self.started is None else self.started - self.created
+
+
+# Renders short phrases ("A chair is on the left.") to audio once with the TTS engine and
+# replays the samples afterwards; they are also kept on disk across restarts. Longer sentences
+# are rarely repeated, so rendering them first would only delay speech.
+class PhraseCache:
+    def __init__(self, engine, directory=None, max_entries=256, max_chars=80):
+        import tempfile
+
+        self.engine = engine
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "ai_navigation_phrases")
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.hits = 0
+        self.misses = 0
+        self._audio = OrderedDict()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def accepts(self, text):
+        return len(text) <= self.max_chars
+
+    def get(self, text):
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        if key in self._audio:
+            self._audio.move_to_end(key)
+            self.hits += 1
+            return self._audio[key]
+
+        path = os.path.join(self.directory, key + ".wav")
+        if os.path.isfile(path):
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+
+        audio = read_wav(path)
+        self._audio[key] = audio
+        while len(self._audio) > self.max_entries:
+            self._audio.popitem(last=False)
+        return audio
+
+
+# Decode a WAV file into (int16 samples, sample rate)
+def read_wav(path):
+    with wave.open(path, "rb") as wav:
+        frames = wav.readframes(wav.getnframes())
+        samples = np.frombuffer(frames, dtype=np.int16).reshape(-1, wav.getnchannels())
+        return samples, wav.getframerate()
+
+
+# Dedicated speech thread with a priority queue. Hazard warnings preempt descriptions, which
+# preempt chit-chat; queued replies on the same topic are merged and old ones dropped; and
+# interrupt() stops playback at once when the user starts talking.
+class SpeechWorker:
+    def __init__(self, engine_factory, use_phrase_cache=True, max_age=15.0):
+        self.engine_factory = engine_factory  # Called on the worker thread, which owns the engine
+        self.use_phrase_cache = use_phrase_cache
+        self.max_age = max_age  # Queued utterances older than this are dropped
+        self.spoken = 0
+        self.preempted = 0
+        self.interrupted = 0
+        self.merged = 0
+        self.expired = 0
+        self.queue_latencies = []
+        self.phrases = None
+        self._queue = []
+        self._seq = itertools.count()
+        self._current = None
+        self._stop_playback = threading.Event()
+        self._ready = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="speech-worker", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._ready:
+            self._running = False
+            self._ready.notify_all()
+        self._stop_playback.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    # True while an utterance is being played, e.g. for the listener to ignore its own echo
+    @property
+    def speaking(self):
+        return self._current is not None
+
+    # Queue something to say; returns the Utterance, whose .done event is set once it finished
+    def say(self, content, priority=CHAT, topic=None, on_start=None, max_age=None, on_sentence=None):
+        utterance = Utterance(content, priority, topic, next(self._seq), on_start, max_age, on_sentence)
+        with self._ready:
+            if topic is not None:
+                kept = [queued for queued in self._queue if queued.topic != topic]
+                for queued in self._queue:
+                    if queued.topic == topic:
+                        self._cancel(queued)
+                        self.merged += 1
+                self._queue = kept
+                heapq.heapify(self._queue)
+
+            current = self._current
+            if current is not None and not current.cancelled and (
+                    priority < current.priority or (topic is not None and topic == current.topic)):
+                current.cancelled = True
+                self._stop_playback.set()
+                self.preempted += 1
+                metrics.count("speech_preempted")
+
+            heapq.heappush(self._queue, utterance)
+            self._ready.notify()
+        return utterance
+
+    # Barge-in: stop talking immediately and forget queued speech (hazard warnings are kept)
+    def interrupt(self, keep_hazards=True):
+        with self._ready:
+            kept = []
+            for queued in self._queue:
+                if keep_hazards and queued.priority == HAZARD:
+                    kept.append(queued)
+                else:
+                    self._cancel(queued)
+            self._queue = kept
+            heapq.heapify(self._queue)
+
+            current = self._current
+            if current is not None and not current.cancelled and not (keep_hazards and current.priority == HAZARD):
+                current.cancelled = True
+                self._stop_playback.set()
+                self.interrupted += 1
+                metrics.count("speech_interrupted")
+
+    def _cancel(self, utterance):
+        utterance.cancelled = True
+        self._close(utterance)
+        utterance.done.set()
+
+    # Stop a streamed reply that will not be spoken to the end (e.g. its prefetch thread)
+    def _close(self, utterance):
+        close = getattr(utterance.sentences, "close", None)
+        if close is not None:
+            close()
+
+    def _next(self):
+        with self._ready:
+            while self._running:
+                while self._queue:
+                    utterance = heapq.heappop(self._queue)
+                    max_age = self.max_age if utterance.max_age is None else utterance.max_age
+                    if time.perf_counter() - utterance.created > max_age:
+                        self.expired += 1
+                        self._cancel(utterance)
+                        continue
+                    self._current = utterance
+                    self._stop_playback.clear()
+                    return utterance
+                self._ready.wait()
+        return None
+
+    def _run(self):
+        engine = self.engine_factory()
+        play = None
+        if self.use_phrase_cache:
+            try:
+                import sounddevice  # Optional: lets playback be stopped mid-sentence
+                play = sounddevice
+                self.phrases = PhraseCache(engine)
+            except (ImportError, OSError):
+                play = None
+
+        while True:
+            utterance = self._next()
+            if utterance is None:
+                return
+            try:
+                for sentence in utterance.sentences:
+                    if utterance.cancelled:
+                        break
+                    if utterance.started is None:
+                        utterance.started = time.perf_counter()
+                        self.queue_latencies.append(utterance.queue_latency)
+                        metrics.observe("speech_queue", utterance.queue_latency)
+                        del self.queue_latencies[:-1000]
+                        if utterance.on_start is not None:
+                            utterance.on_start(utterance)
+                    if utterance.on_sentence is not None:
+                        utterance.on_sentence(sentence)
+                    with metrics.span("tts"):
+                        self._speak(engine, play, sentence)
+                    self.spoken += 1
+            except Exception as e:  # Keep the worker alive if one reply fails
+                print(f"Speech error: {e}")
+            finally:
+                self._close(utterance)
+                utterance.finished = time.perf_counter()
+                utterance.done.set()
+                with self._ready:
+                    self._current = None
+
+    # Cached phrases play through sounddevice and stop within 20 ms of an interrupt. Anything
+    # else goes through the engine, whose runAndWait() cannot be stopped from another thread, so
+    # it is spoken a clause at a time and an interrupt takes effect at the next clause.
+    def _speak(self, engine, play, sentence):
+        if play is not None and self.phrases.accepts(sentence):
+            try:
+                samples, samplerate = self.phrases.get(sentence)
+            except (OSError, wave.Error, EOFError):
+                samples = None  # e.g. a platform whose engine does not write WAV files
+            if samples is not None:
+                play.play(samples, samplerate)
+                while play.get_stream().active:
+                    if self._stop_playback.wait(0.02):
+                        play.stop()
+                        break
+                return
+
+        for clause in CLAUSE_END.split(sentence):
+            if self._stop_playback.is_set():
+                return
+            engine.say(clause)
+            engine.runAndWait()
+
+    def stats(self):
+        latencies = sorted(self.queue_latencies)
+        return {
+            "spoken": self.spoken,
+            "queued": len(self._queue),
+            "preempted": self.preempted,
+            "interrupted": self.interrupted,
+            "merged": self.merged,
+            "expired": self.expired,
+            "queue_latency_avg_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "queue_latency_max_ms": 1000 * latencies[-1] if latencies else 0.0,
+            "phrase_cache_hits": self.phrases.hits if self.phrases else 0,
+            "phrase_cache_misses": self.phrases.misses if self.phrases else 0,
+        }
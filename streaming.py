@@ -0,0 +1,243 @@
+import os  # Importing os to read the system load average
+import threading  # Importing threading for the background scene monitor
+import time  # Importing time for latency measurement and pacing
+
+import cv2  # Importing OpenCV to downscale frames for the change gate
+import numpy as np  # Importing numpy to compare frame signatures
+
+import metrics  # Stage timers, off unless enabled
+from scene import analyze_detections, describe_scene  # Vectorized scene description
+
+
+# Detection result for a single streamed frame
+class SceneSnapshot:
+    def __init__(self, seq, timestamp, scene, names, img_width, img_height, latency, dropped, frame=None):
+        self.seq = seq  # Camera sequence number of the analyzed frame
+        self.timestamp = timestamp  # time.time() when the frame was picked up
+        self.scene = scene  # Structured scene array (see scene.SCENE_DTYPE)
+        self.names = names  # Class id -> name mapping of the model
+        self.img_width = img_width
+        self.img_height = img_height
+        self.latency = latency  # Seconds spent in the forward pass and postprocessing
+        self.dropped = dropped  # Stale frames skipped since the previous snapshot
+        self.frame = frame  # The analyzed BGR frame (a copy), e.g. for OCR matching the scene boxes
+        self.events = []  # Scene changes reported by the monitor's tracker, if it has one
+
+    @property
+    def age(self):
+        return time.time() - self.timestamp
+
+    def describe(self, with_distance=True):
+        return describe_scene(self.scene, self.names, with_distance=with_distance)
+
+
+# Fraction of the machine currently busy (0.0 - 1.0+), or None if it can't be measured
+def cpu_load():
+    try:
+        import psutil  # Optional dependency, gives an instantaneous reading
+        return psutil.cpu_percent(interval=None) / 100.0
+    except ImportError:
+        pass
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+# Chooses the pause between inferences from the measured latency and CPU load
+class AdaptiveRate:
+    def __init__(self, min_fps=1.0, max_fps=15.0, duty_cycle=0.6, target_cpu=0.8, smoothing=0.3):
+        self.min_interval = 1.0 / min_fps
+        self.max_interval = 1.0 / max_fps
+        self.duty_cycle = duty_cycle  # Share of wall time the detector may use when the CPU is idle
+        self.target_cpu = target_cpu  # Back off once the whole machine is busier than this
+        self.smoothing = smoothing
+        self.latency = None  # Exponential moving average of per-frame latency
+        self.interval = self.max_interval
+
+    def update(self, latency):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+
+        duty = self.duty_cycle
+        load = cpu_load()
+        if load is not None and load > self.target_cpu:
+            duty *= self.target_cpu / load
+
+        interval = self.latency / duty
+        self.interval = min(self.min_interval, max(self.max_interval, interval))
+        return self.interval
+
+    @property
+    def fps(self):
+        return 1.0 / self.interval
+
+
+# Cheap pre-inference check: a frame is only worth analyzing if its downscaled grayscale version
+# differs enough from the last analyzed frame, or if the last analysis is older than refresh_interval
+class SceneGate:
+    def __init__(self, threshold=6.0, refresh_interval=2.0, size=(32, 24)):
+        self.threshold = threshold  # Mean absolute gray-level difference (0-255) that counts as a change
+        self.refresh_interval = refresh_interval  # Seconds after which inference runs regardless
+        self.size = size
+        self.checked = 0
+        self.skipped = 0
+        self.gate_seconds = 0.0  # Time spent computing signatures
+        self.inference_cpu = None  # Moving average of the CPU seconds one inference costs
+        self.last_difference = None
+        self._signature = None
+        self._analyzed_at = 0.0
+
+    def signature(self, img):
+        frame = np.asarray(img)
+        step = max(1, min(frame.shape[0] // (4 * self.size[1]), frame.shape[1] // (4 * self.size[0])))
+        # Subsample before the area resize so even a full-resolution frame costs microseconds
+        small = np.ascontiguousarray(frame[::step, ::step])
+        small = cv2.resize(small, self.size, interpolation=cv2.INTER_AREA).astype(np.float32)
+        return small.mean(axis=2) if small.ndim == 3 else small
+
+    # True if the model should run on this frame; the frame becomes the new reference if so
+    def should_run(self, img):
+        started = time.perf_counter()
+        signature = self.signature(img)
+        self.checked += 1
+
+        now = time.perf_counter()
+        run = self._signature is None or now - self._analyzed_at >= self.refresh_interval
+        if not run:
+            self.last_difference = float(np.abs(signature - self._signature).mean())
+            run = self.last_difference > self.threshold
+        if run:
+            self._signature = signature
+            self._analyzed_at = now
+        else:
+            self.skipped += 1
+            metrics.count("gate_skipped")
+        self.gate_seconds += time.perf_counter() - started
+        return run
+
+    def record_inference(self, cpu_seconds):
+        if self.inference_cpu is None:
+            self.inference_cpu = cpu_seconds
+        else:
+            self.inference_cpu += 0.2 * (cpu_seconds - self.inference_cpu)
+
+    def stats(self):
+        saved = self.skipped * (self.inference_cpu or 0.0)
+        return {
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skip_ratio": self.skipped / self.checked if self.checked else 0.0,
+            "cpu_saved_s": saved,
+            "gate_cost_ms": 1000 * self.gate_seconds / self.checked if self.checked else 0.0,
+        }
+
+
+# Puts a SceneGate in front of model(img): unchanged frames get the previous results back.
+# Batched calls (lists of images) always go to the model.
+class GatedModel:
+    def __init__(self, model, gate=None):
+        self.model = model
+        self.gate = gate or SceneGate()
+        self._results = None
+
+    def __call__(self, img, *args, **kwargs):
+        if isinstance(img, (list, tuple)):
+            return self.model(img, *args, **kwargs)
+        if not self.gate.should_run(img) and self._results is not None:
+            return self._results
+
+        cpu_started = time.process_time()  # Whole process, so intra-op inference threads are included
+        results = self.model(img, *args, **kwargs)
+        self.gate.record_inference(time.process_time() - cpu_started)
+        self._results = results
+        return results
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+# Run the model continuously over a CameraStream and yield a SceneSnapshot per analyzed frame.
+# Only the newest frame is ever analyzed; frames that arrive during inference are dropped.
+def stream_detections(model, camera, rate=None, stop_event=None):
+    rate = rate or AdaptiveRate()
+    stop_event = stop_event or threading.Event()
+    camera.start()
+
+    last_seq = 0
+    while not stop_event.is_set():
+        started = time.perf_counter()
+
+        # A copy: the ring slot is overwritten a few frames later, while inference may still be running
+        seq, frame = camera.wait_for_frame(after_seq=last_seq, timeout=1.0)
+        if frame is None or (seq == last_seq and not camera.is_image):
+            if camera.stopped:
+                return  # No new frame will ever arrive
+            continue
+        dropped = max(0, seq - last_seq - 1)
+        last_seq = seq
+        timestamp = time.time()
+
+        # The model expects RGB; reverse the channels of the BGR frame as a view
+        img_height, img_width = frame.shape[:2]
+        with metrics.span("detect"):
+            results = model(frame[..., ::-1])
+        with metrics.span("postprocess"):
+            scene = analyze_detections(results.xyxy[0], img_width, img_height)
+        latency = time.perf_counter() - started
+
+        yield SceneSnapshot(seq, timestamp, scene, results.names, img_width, img_height, latency, dropped, frame)
+
+        pause = rate.update(latency) - (time.perf_counter() - started)
+        if pause > 0:
+            stop_event.wait(pause)
+
+
+# Keeps the most recent SceneSnapshot up to date on a background thread
+class SceneMonitor:
+    def __init__(self, model, camera, rate=None, tracker=None, memory=None, on_snapshot=None):
+        self.model = model
+        self.camera = camera
+        self.rate = rate or AdaptiveRate()
+        self.tracker = tracker  # Optional tracker.SceneTracker fed with every snapshot
+        self.memory = memory  # Optional scene_memory.SceneMemory fed with the tracker's confirmed tracks
+        self.on_snapshot = on_snapshot  # Optional callback(snapshot) on every analyzed frame, e.g. hazard alerts
+        self.frames_analyzed = 0
+        self.frames_dropped = 0
+        self._latest = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="scene-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        for snapshot in stream_detections(self.model, self.camera, self.rate, self._stop):
+            self.frames_analyzed += 1
+            self.frames_dropped += snapshot.dropped
+            if self.tracker is not None:
+                snapshot.events = self.tracker.update(snapshot.scene, snapshot.timestamp)
+                if self.memory is not None:
+                    self.memory.record(self.tracker.confirmed(), snapshot.timestamp)
+            self._latest = snapshot
+            if self.on_snapshot is not None:
+                self.on_snapshot(snapshot)
+
+    # Newest snapshot, or None if nothing has been analyzed yet (never waits on inference)
+    def latest(self, max_age=None):
+        snapshot = self._latest
+        if snapshot is not None and max_age is not None and snapshot.age > max_age:
+            return None
+        return snapshot
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+import pytest
+
+from intents import COCO_NAMES, LocalAnswerer, parse_intent
+from scene import SCENE_DTYPE, ZONES
+from scene_memory import SceneMemory
+
+
+class Track:
+    def __init__(self, track_id, name, zone, distance, seen_at):
+        self.id = track_id
+        self.class_id = COCO_NAMES.index(name)
+        self.zone = ZONES.index(zone)
+        self.distance = distance
+        self.confidence = 0.9
+        self.first_seen = seen_at
+        self.last_seen = seen_at
+        self.hits = 3
+        self.misses = 0
+
+
+def make_scene(*objects):
+    scene = np.zeros(len(objects), dtype=SCENE_DTYPE)
+    for index, (name, zone, distance) in enumerate(objects):
+        scene[index]["class_id"] = COCO_NAMES.index(name)
+        scene[index]["zone"] = ZONES.index(zone)
+        scene[index]["distance"] = distance
+        scene[index]["confidence"] = 0.9
+    return scene
+
+
+@pytest.mark.parametrize("question, kind, zone", [
+    ("is there a chair on my left", "nearest", "left"),
+    ("where is the nearest chair on my right", "nearest", "right"),
+    ("what is on my left", "zone", "left"),
+    ("where is my phone", "recall", None),
+    ("where are my cups", "recall", None),
+    ("have you seen my bottle", "recall", None),
+    ("where did I last see the laptop", "recall", None),
+    ("did I leave my backpack on the left", "recall", "left"),
+])
+def test_parse_intent(question, kind, zone):
+    intent = parse_intent(question)
+    assert intent.kind == kind
+    assert intent.zone == zone
+
+
+def test_spatial_question_is_answered_from_the_scene():
+    memory = SceneMemory()
+    memory.record([Track(1, "chair", "right", 15.8, time.time())])
+    answerer = LocalAnswerer(memory=memory)
+    scene = make_scene(("chair", "right", 15.8))
+
+    answer = answerer.answer(answerer.route("is there a chair on my left"), scene, COCO_NAMES)
+    assert answer == "I can't see any chairs on your left right now."
+
+
+def test_recall_uses_the_zone_of_the_question():
+    memory = SceneMemory()
+    memory.record([Track(1, "cell phone", "right", 2.0, time.time())])
+    answerer = LocalAnswerer(memory=memory)
+    empty = make_scene()
+
+    answer = answerer.answer(parse_intent("where is my phone"), empty, COCO_NAMES)
+    assert answer.startswith("I can't see it right now. I last saw a cell phone on your right")
+
+    answer = answerer.answer(parse_intent("did I leave my phone on the left"), empty, COCO_NAMES)
+    assert answer.startswith("I haven't seen any cell phones on your left. I last saw a cell phone on your right")
+
+
+def test_recall_points_at_one_in_view_in_another_zone():
+    answerer = LocalAnswerer(memory=SceneMemory())
+    scene = make_scene(("cup", "center", 1.2))
+
+    answer = answerer.answer(parse_intent("did I leave my cup on the right"), scene, COCO_NAMES)
+    assert answer == "I can't see any cups on your right. The nearest cup is in front of you, about 1.2 meters away."
@@ -0,0 +1,56 @@
+import itertools
+import time
+
+import numpy as np
+
+from intents import COCO_NAMES
+from scene import SCENE_DTYPE, ZONES
+from scene_memory import SceneMemory
+from tracker import SceneTracker
+
+
+def make_scene(name, zone, box):
+    scene = np.zeros(1, dtype=SCENE_DTYPE)
+    scene[0]["class_id"] = COCO_NAMES.index(name)
+    scene[0]["zone"] = ZONES.index(zone)
+    scene[0]["distance"] = 5.0
+    scene[0]["confidence"] = 0.9
+    scene[0]["xmin"], scene[0]["ymin"], scene[0]["xmax"], scene[0]["ymax"] = box
+    return scene
+
+
+def test_trackers_sharing_a_memory_do_not_overwrite_each_other():
+    memory = SceneMemory()
+    ids = itertools.count(1)
+    streamed = SceneTracker(min_hits=1, ids=ids)
+    on_demand = SceneTracker(min_hits=1, max_missed=0, ids=ids)
+
+    streamed.update(make_scene("person", "center", (300, 100, 340, 400)))
+    memory.record(streamed.confirmed())
+    on_demand.update(make_scene("chair", "left", (10, 200, 80, 300)))
+    memory.record(on_demand.confirmed())
+
+    assert memory.last_seen([COCO_NAMES.index("person")]).zone_name == "center"
+    assert memory.last_seen([COCO_NAMES.index("chair")]).zone_name == "left"
+
+
+class Track:
+    def __init__(self, track_id, name):
+        self.id = track_id
+        self.class_id = COCO_NAMES.index(name)
+        self.zone = 0
+        self.distance = 2.0
+        self.confidence = 0.9
+        self.first_seen = self.last_seen = time.time()
+        self.hits = 1
+        self.misses = 0
+
+
+def test_entry_is_reindexed_when_its_class_changes():
+    memory = SceneMemory()
+    memory.record([Track(1, "person")])
+    memory.record([Track(1, "chair")])
+
+    assert memory.last_seen([COCO_NAMES.index("person")]) is None
+    assert memory.last_seen([COCO_NAMES.index("chair")]).track_id == 1
+    assert len(memory) == 1
@@ -0,0 +1,288 @@
+import itertools  # Importing itertools for region ids
+import os  # Importing os for the OCR engine selection
+import threading  # Importing threading so the reader can be shared between threads
+import time  # Importing time for cache ages and OCR throughput
+
+import cv2  # Importing OpenCV for the text region proposals
+import numpy as np  # Importing numpy for box arithmetic
+
+import metrics  # Stage timers, off unless enabled
+from scene import MAX_DISTANCE, box_iou, name_table, scene_boxes
+
+OCR_ENGINES = ("easyocr", "tesseract")
+DEFAULT_OCR_ENGINE = os.environ.get("AI_NAV_OCR", "easyocr")
+
+# Detected classes that usually carry readable text; their boxes are always OCR candidates
+SIGN_CLASSES = ("stop sign", "parking meter", "book", "tv", "laptop", "cell phone", "bus", "truck", "train")
+
+
+# "left", "center" or "right" third of the image for a bbox given as four corner points
+def text_zone(bbox, img_width):
+    center_x = (bbox[0][0] + bbox[2][0]) / 2
+    if center_x < img_width / 3:
+        return "left"
+    if center_x > 2 * img_width / 3:
+        return "right"
+    return "center"
+
+
+# Navigation sentence for one OCR result (bbox as four corner points, text, confidence)
+def get_text_navigation_info(result, img_width, img_height):
+    bbox, text, confidence = result
+    ymin = bbox[0][1]
+    direction = text_zone(bbox, img_width)
+
+    # Estimating distance (using top of the bounding box), like the object distances
+    distance_estimation = MAX_DISTANCE - (ymin / img_height) * MAX_DISTANCE
+
+    return f"Text '{text}' is on the {direction}, approximately {distance_estimation:.1f} meters away."
+
+
+# Sentences for OCR results, optionally only those in one zone
+def describe_text(results, img_width, img_height, zone=None):
+    return [get_text_navigation_info(result, img_width, img_height) for result in results
+            if zone is None or text_zone(result[0], img_width) == zone]
+
+
+def corners(box):
+    x0, y0, x1, y1 = (float(v) for v in box[:4])
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+
+# Cheap text-like region proposals: dense, wide blobs of strong local contrast (a few ms per frame)
+def propose_text_regions(gray, max_regions=8, min_width=20, min_height=8, min_fill=0.45):
+    img_height, img_width = gray.shape[:2]
+    scale = min(1.0, 640 / img_width)
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+
+    gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    joined = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+    contours, _ = cv2.findContours(joined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w < min_width * scale or h < min_height * scale or w < 1.5 * h or h > 0.3 * small.shape[0]:
+            continue
+        if cv2.countNonZero(joined[y:y + h, x:x + w]) < min_fill * w * h:
+            continue
+        boxes.append((x / scale, y / scale, (x + w) / scale, (y + h) / scale))
+    boxes.sort(key=lambda box: (box[2] - box[0]) * (box[3] - box[1]), reverse=True)
+    return np.asarray(boxes[:max_regions], dtype=np.float32).reshape(-1, 4)
+
+
+# OCR engines take the frame and a list of boxes and return (text, confidence) per box
+def easyocr_engine(languages=("en",)):
+    import easyocr  # Optional dependency, loaded on first use
+
+    reader = easyocr.Reader(list(languages), gpu=False, verbose=False)
+
+    def recognize(frame, boxes):
+        # One batched recognition pass over just these regions of the frame
+        horizontal = [[int(x0), int(x1), int(y0), int(y1)] for x0, y0, x1, y1 in boxes]
+        found = {}
+        for bbox, text, confidence in reader.recognize(frame, horizontal_list=horizontal, free_list=[],
+                                                       batch_size=len(boxes)):
+            found[(int(bbox[0][0]), int(bbox[0][1]))] = (text, float(confidence))
+        return [found.get((int(x0), int(y0)), ("", 0.0)) for x0, y0, _, _ in boxes]
+
+    return recognize
+
+
+def tesseract_engine():
+    import pytesseract  # Optional dependency, loaded on first use
+
+    def recognize(frame, boxes):
+        results = []
+        for x0, y0, x1, y1 in boxes:
+            crop = frame[int(y0):int(y1), int(x0):int(x1)]
+            data = pytesseract.image_to_data(crop, config="--psm 6", output_type=pytesseract.Output.DICT)
+            words = [(word, float(conf)) for word, conf in zip(data["text"], data["conf"])
+                     if word.strip() and float(conf) >= 0]
+            text = " ".join(word for word, _ in words)
+            confidence = sum(conf for _, conf in words) / len(words) / 100.0 if words else 0.0
+            results.append((text, confidence))
+        return results
+
+    return recognize
+
+
+def load_ocr_engine(name=DEFAULT_OCR_ENGINE):
+    if name == "easyocr":
+        return easyocr_engine()
+    if name == "tesseract":
+        return tesseract_engine()
+    raise ValueError(f"Unknown OCR engine {name!r}, expected one of {OCR_ENGINES}")
+
+
+# A region whose text has been read, followed across frames like a tracked object
+class TextRegion:
+    def __init__(self, region_id, box, signature, text, confidence, timestamp):
+        self.id = region_id
+        self.box = box
+        self.signature = signature  # Small grayscale thumbnail; a changed one means new text
+        self.text = text
+        self.confidence = confidence
+        self.read_at = timestamp
+        self.last_seen = timestamp
+        self.hits = 0
+
+
+# Reads text in a frame by running OCR only on candidate regions: boxes of sign-like detected
+# classes plus cheap text-like proposals. The candidates that still need reading are recognized
+# in one batch, and every region's text is cached, so a static sign is read once and then
+# answered from the cache while it stays in view. OCR throughput is tracked separately from
+# object detection.
+class TextReader:
+    def __init__(self, engine=None, engine_name=DEFAULT_OCR_ENGINE, sign_classes=SIGN_CLASSES, max_regions=8,
+                 min_confidence=0.4, iou_threshold=0.5, signature_threshold=12.0, ttl=60.0, max_entries=128):
+        self.engine_name = engine_name
+        self.sign_classes = tuple(sign_classes)
+        self.max_regions = max_regions
+        self.min_confidence = min_confidence
+        self.iou_threshold = iou_threshold  # Overlap with a cached region that counts as the same region
+        self.signature_threshold = signature_threshold  # Mean gray-level difference that counts as changed
+        self.ttl = ttl  # Cached regions not seen for this long are forgotten
+        self.max_entries = max_entries
+        self.available = True  # False once the OCR engine turned out to be missing
+        self.frames = 0
+        self.proposed = 0
+        self.recognized = 0
+        self.cache_hits = 0
+        self.batches = 0
+        self.propose_seconds = 0.0
+        self.ocr_seconds = 0.0
+        self._engine = engine
+        self._regions = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._engine_lock = threading.Lock()
+
+    def _get_engine(self):
+        with self._engine_lock:
+            if self._engine is None and self.available:
+                try:
+                    with metrics.span("ocr_load"):
+                        self._engine = load_ocr_engine(self.engine_name)
+                except ImportError as e:
+                    print(f"Text reading disabled: {e}")
+                    self.available = False
+        return self._engine
+
+    # Load the OCR engine on a background thread (EasyOCR takes seconds), so the first read is fast
+    def preload(self):
+        threading.Thread(target=self._get_engine, name="ocr-preload", daemon=True).start()
+        return self
+
+    # Candidate boxes: sign-like detections first, then proposals not already inside one
+    def candidates(self, frame, scene=None, names=None):
+        boxes = np.zeros((0, 4), dtype=np.float32)
+        if scene is not None and names is not None and len(scene):
+            signs = np.isin(name_table(names)[scene["class_id"]], self.sign_classes)
+            boxes = scene_boxes(scene[signs]).astype(np.float32)
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY) if frame.ndim == 3 else frame
+        proposals = propose_text_regions(gray, self.max_regions)
+        if len(boxes) and len(proposals):
+            centers = (proposals[:, :2] + proposals[:, 2:]) / 2
+            inside = ((centers[:, None, 0] >= boxes[None, :, 0]) & (centers[:, None, 0] <= boxes[None, :, 2]) &
+                      (centers[:, None, 1] >= boxes[None, :, 1]) & (centers[:, None, 1] <= boxes[None, :, 3]))
+            proposals = proposals[~inside.any(axis=1)]
+        return np.concatenate([boxes, proposals])[:self.max_regions]
+
+    def _signature(self, gray, box):
+        x0, y0, x1, y1 = (int(v) for v in box)
+        crop = gray[max(0, y0):max(y0 + 1, y1), max(0, x0):max(x0 + 1, x1)]
+        return cv2.resize(crop, (16, 8), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    # Cached region showing the same content at about the same place, or None
+    def _match(self, box, signature, used):
+        regions = [region for region in self._regions.values() if region.id not in used]
+        if not regions:
+            return None
+        iou = box_iou(box[None, :], np.stack([region.box for region in regions]))[0]
+        for index in np.argsort(iou)[::-1]:
+            if iou[index] < self.iou_threshold:
+                break
+            region = regions[index]
+            if np.abs(region.signature - signature).mean() < self.signature_threshold:
+                return region
+        return None
+
+    # OCR results for one RGB frame (array or PIL image) as (bbox corners, text, confidence),
+    # optionally using the frame's scene array and class names for sign-like detections
+    def read(self, frame, scene=None, names=None, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        frame = frame if isinstance(frame, np.ndarray) else np.asarray(frame.convert("RGB"))
+        started = time.perf_counter()
+        with metrics.span("ocr_propose"):
+            boxes = self.candidates(frame, scene, names)
+            gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY) if frame.ndim == 3 else frame
+            signatures = [self._signature(gray, box) for box in boxes]
+
+        with self._lock:
+            self.frames += 1
+            self.proposed += len(boxes)
+            self.propose_seconds += time.perf_counter() - started
+            matched, missing, used = {}, [], set()
+            for index, (box, signature) in enumerate(zip(boxes, signatures)):
+                region = self._match(box, signature, used)
+                if region is None:
+                    missing.append(index)
+                else:
+                    used.add(region.id)
+                    matched[index] = region
+
+        # Only the regions that are new or changed go through OCR, all in one batch
+        engine = self._get_engine() if missing else None
+        if engine is not None:
+            started = time.perf_counter()
+            with metrics.span("ocr_recognize", regions=len(missing)):
+                texts = engine(frame, [boxes[index] for index in missing])
+            seconds = time.perf_counter() - started
+            with self._lock:
+                self.batches += 1
+                self.recognized += len(missing)
+                self.ocr_seconds += seconds
+                for index, (text, confidence) in zip(missing, texts):
+                    region = TextRegion(next(self._ids), boxes[index], signatures[index], text.strip(),
+                                        confidence, timestamp)
+                    self._regions[region.id] = region
+                    matched[index] = region
+
+        results = []
+        with self._lock:
+            for index, region in sorted(matched.items()):
+                if region.read_at != timestamp:
+                    region.hits += 1
+                    self.cache_hits += 1
+                region.box = boxes[index]  # Follow the region as the camera moves
+                region.last_seen = timestamp
+                if region.confidence >= self.min_confidence and len(region.text) >= 2:
+                    results.append((corners(region.box), region.text, region.confidence))
+            self._evict(timestamp)
+        return results
+
+    def _evict(self, now):
+        for region_id in [region.id for region in self._regions.values() if now - region.last_seen > self.ttl]:
+            del self._regions[region_id]
+        if len(self._regions) > self.max_entries:
+            oldest = sorted(self._regions.values(), key=lambda region: region.last_seen)
+            for region in oldest[:len(self._regions) - self.max_entries]:
+                del self._regions[region.id]
+
+    def stats(self):
+        with self._lock:
+            looked_up = self.cache_hits + self.recognized
+            return {
+                "frames": self.frames,
+                "regions_proposed": self.proposed,
+                "regions_recognized": self.recognized,
+                "cache_hit_rate": self.cache_hits / looked_up if looked_up else 0.0,
+                "avg_batch": self.recognized / self.batches if self.batches else 0.0,
+                "propose_ms": 1000.0 * self.propose_seconds / self.frames if self.frames else 0.0,
+                "ocr_ms_per_region": 1000.0 * self.ocr_seconds / self.recognized if self.recognized else 0.0,
+                "ocr_regions_per_s": self.recognized / self.ocr_seconds if self.ocr_seconds else 0.0,
+                "cached_regions": len(self._regions),
+            }
@@ -0,0 +1,187 @@
+import itertools  # Importing itertools for track id generation
+import threading  # Importing threading so a streaming thread and the main loop can share a tracker
+import time  # Importing time for track timestamps
+
+import numpy as np  # Importing numpy for the IoU / centroid association
+
+from scene import SCENE_DTYPE, ZONES, box_iou, name_table, scene_boxes
+
+
+# One object followed across frames
+class Track:
+    def __init__(self, track_id, row, timestamp):
+        self.id = track_id
+        self.class_id = int(row["class_id"])
+        self.box = np.array([row["xmin"], row["ymin"], row["xmax"], row["ymax"]], dtype=np.float32)
+        self.confidence = float(row["confidence"])
+        self.zone = int(row["zone"])
+        self.distance = float(row["distance"])  # Smoothed distance estimate
+        self.speed = 0.0  # Smoothed change of distance in meters/second (negative = approaching)
+        self.hits = 1
+        self.misses = 0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+
+    @property
+    def zone_name(self):
+        return ZONES[self.zone]
+
+    def update(self, row, timestamp, smoothing):
+        elapsed = timestamp - self.last_seen
+        distance = self.distance + smoothing * (float(row["distance"]) - self.distance)
+        if elapsed > 0:
+            self.speed += smoothing * ((distance - self.distance) / elapsed - self.speed)
+
+        self.box = np.array([row["xmin"], row["ymin"], row["xmax"], row["ymax"]], dtype=np.float32)
+        self.confidence = float(row["confidence"])
+        self.zone = int(row["zone"])
+        self.distance = distance
+        self.hits += 1
+        self.misses = 0
+        self.last_seen = timestamp
+
+
+# A change in the scene: kind is "new", "left" or "approaching"
+class SceneEvent:
+    def __init__(self, kind, track):
+        self.kind = kind
+        self.track = track
+
+    def __repr__(self):
+        return f"SceneEvent({self.kind!r}, id={self.track.id}, class={self.track.class_id})"
+
+
+# Gives detections stable ids across frames and reports what changed.
+# Detections are matched to tracks of the same class by IoU first, then by nearest centroid.
+class SceneTracker:
+    def __init__(self, iou_threshold=0.3, centroid_threshold=0.5, max_missed=5, min_hits=2,
+                 smoothing=0.4, approach_speed=0.5, approach_margin=1.0, ids=None):
+        self.iou_threshold = iou_threshold
+        self.centroid_threshold = centroid_threshold  # Max centroid shift, relative to the box diagonal
+        self.max_missed = max_missed  # Frames a track may go undetected before it is dropped
+        self.min_hits = min_hits  # Detections needed before a track is reported
+        self.smoothing = smoothing  # Weight of the newest distance measurement
+        self.approach_speed = approach_speed  # m/s of closing speed that counts as approaching
+        self.approach_margin = approach_margin  # Meters closer than last report that counts as approaching
+        self.tracks = {}
+        self._ids = ids or itertools.count(1)  # Share one counter between trackers feeding the same SceneMemory
+        self._approaching = set()
+        self._reported = {}
+        self._lock = threading.Lock()
+
+    def confirmed(self):
+        return [track for track in self.tracks.values() if track.hits >= self.min_hits]
+
+    def _associate(self, scene):
+        track_list = list(self.tracks.values())
+        if not track_list or not len(scene):
+            return [], track_list, list(range(len(scene)))
+
+        track_boxes = np.stack([track.box for track in track_list])
+        track_classes = np.array([track.class_id for track in track_list])
+        det_boxes = scene_boxes(scene)
+        same_class = track_classes[:, None] == scene["class_id"][None, :]
+
+        # IoU, falling back to a centroid score for fast-moving objects that no longer overlap
+        iou = box_iou(track_boxes, det_boxes)
+        track_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+        det_centers = (det_boxes[:, :2] + det_boxes[:, 2:]) / 2
+        shift = np.linalg.norm(track_centers[:, None] - det_centers[None, :], axis=2)
+        diagonal = np.linalg.norm(track_boxes[:, 2:] - track_boxes[:, :2], axis=1)[:, None] + 1e-9
+        centroid = 1.0 - shift / (diagonal * self.centroid_threshold)
+
+        score = np.where(iou >= self.iou_threshold, 1.0 + iou, np.where(centroid > 0, centroid, 0.0))
+        score[~same_class] = 0.0
+
+        matches = []
+        unmatched_tracks = set(range(len(track_list)))
+        unmatched_detections = set(range(len(scene)))
+        for flat in np.argsort(score, axis=None)[::-1]:
+            t, d = divmod(int(flat), len(scene))
+            if score[t, d] <= 0:
+                break
+            if t in unmatched_tracks and d in unmatched_detections:
+                matches.append((track_list[t], d))
+                unmatched_tracks.discard(t)
+                unmatched_detections.discard(d)
+
+        return matches, [track_list[t] for t in unmatched_tracks], sorted(unmatched_detections)
+
+    # Feed one frame's scene array; returns the events this frame produced
+    def update(self, scene, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        events = []
+        with self._lock:
+            matches, missed, new_detections = self._associate(scene)
+
+            for track, index in matches:
+                track.update(scene[index], timestamp, self.smoothing)
+                if track.hits == self.min_hits:
+                    events.append(SceneEvent("new", track))
+                elif track.hits > self.min_hits:
+                    if track.speed <= -self.approach_speed and track.id not in self._approaching:
+                        self._approaching.add(track.id)
+                        events.append(SceneEvent("approaching", track))
+                    elif track.speed > -self.approach_speed / 2:
+                        self._approaching.discard(track.id)
+
+            for track in missed:
+                track.misses += 1
+                if track.misses > self.max_missed:
+                    del self.tracks[track.id]
+                    self._approaching.discard(track.id)
+                    if track.hits >= self.min_hits:
+                        events.append(SceneEvent("left", track))
+
+            for index in new_detections:
+                track = Track(next(self._ids), scene[index], timestamp)
+                self.tracks[track.id] = track
+                if self.min_hits <= 1:
+                    events.append(SceneEvent("new", track))
+
+        return events
+
+    # Changes since the previous call to report(), collapsed so an object that came and
+    # went in between is not mentioned at all
+    def report(self):
+        with self._lock:
+            current = {track.id: track for track in self.confirmed()}
+            events = []
+            for track_id, track in current.items():
+                if track_id not in self._reported:
+                    events.append(SceneEvent("new", track))
+                elif self._reported[track_id][1] - track.distance >= self.approach_margin:
+                    events.append(SceneEvent("approaching", track))
+            for track_id, (track, _) in self._reported.items():
+                if track_id not in current:
+                    events.append(SceneEvent("left", track))
+
+            # Remember each reported track with the distance it was reported at
+            self._reported = {track_id: (track, track.distance) for track_id, track in current.items()}
+        return events
+
+    # The confirmed tracks as a scene array (with smoothed distances), nearest first
+    def current_scene(self):
+        with self._lock:
+            tracks = sorted(self.confirmed(), key=lambda track: track.distance)
+        scene = np.empty(len(tracks), dtype=SCENE_DTYPE)
+        for index, track in enumerate(tracks):
+            scene[index] = (*track.box, track.confidence, track.class_id, track.zone, track.distance)
+        return [track.id for track in tracks], scene
+
+
+# Turn scene events into short sentences for TTS or the LLM prompt
+def describe_events(events, names):
+    table = name_table(names)
+    sentences = []
+    for event in events:
+        track = event.track
+        name = table[track.class_id]
+        if event.kind == "new":
+            sentences.append(f"A {name} is on the {track.zone_name}.")
+        elif event.kind == "left":
+            sentences.append(f"The {name} on the {track.zone_name} is gone.")
+        elif event.kind == "approaching":
+            sentences.append(f"The {name} on the {track.zone_name} is getting closer, "
+                             f"approximately {track.distance:.1f} meters away.")
+    return sentences
@@ -0,0 +1,229 @@
+import json  # Importing json to decode streamed events
+import os  # Importing os for credentials and endpoint configuration
+import random  # Importing random for jittered backoff
+import threading  # Importing threading to guard the token refresh
+import time  # Importing time for token expiry and backoff
+
+import requests  # Importing requests to handle HTTP requests
+from requests.adapters import HTTPAdapter  # Importing HTTPAdapter for the connection pool
+
+import metrics  # Stage timers, off unless enabled
+
+WATSONX_URL = os.environ.get("WATSONX_URL", "https://us-south.ml.cloud.ibm.com")
+IAM_URL = os.environ.get("WATSONX_IAM_URL", "https://iam.cloud.ibm.com/identity/token")
+API_VERSION = "2023-05-29"
+
+DEFAULT_MODEL_ID = "ibm/granite-13b-chat-v2"
+DEFAULT_PROJECT_ID = os.environ.get("WATSONX_PROJECT_ID", "8e0a89d4-f10e-49c9-9f1c-e11c4580adee")
+
+DEFAULT_PARAMETERS = {
+    "decoding_method": "greedy",
+    "max_new_tokens": 300,
+    "stop_sequences": ["\n\n"],
+    "repetition_penalty": 1.2,
+}
+
+DEFAULT_MODERATIONS = {
+    "hap": {
+        "input": {"enabled": True, "threshold": 0.5, "mask": {"remove_entity_value": True}},
+        "output": {"enabled": True, "threshold": 0.5, "mask": {"remove_entity_value": True}},
+    }
+}
+
+
+# Group the lines of a text/event-stream body into {"event": ..., "data": ...} dicts
+def iter_sse_events(lines):
+    event = {}
+    for line in lines:
+        if line is None:
+            continue
+        if line == "":
+            if event:
+                yield event
+            event = {}
+            continue
+        if line.startswith(":"):
+            continue  # Comment / keep-alive
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "data" and "data" in event:
+            event["data"] += "\n" + value
+        else:
+            event[field] = value
+    if event:
+        yield event
+
+
+# Responses worth retrying: rate limiting and transient gateway/server failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class WatsonxError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Exchanges an IBM Cloud API key for a bearer token and refreshes it shortly before it expires
+class IAMTokenManager:
+    def __init__(self, api_key, session, url=IAM_URL, refresh_margin=300.0, timeout=(3.05, 10.0)):
+        self.api_key = api_key
+        self.session = session
+        self.url = url
+        self.refresh_margin = refresh_margin  # Refresh this many seconds before expiry
+        self.timeout = timeout
+        self.refreshes = 0
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_token(self, force_refresh=False):
+        with self._lock:
+            if force_refresh or self._token is None or time.time() >= self._expires_at - self.refresh_margin:
+                self._refresh()
+            return self._token
+
+    def _refresh(self):
+        response = self.session.post(
+            self.url,
+            data={"grant_type": "urn:ibm:params:oauth:grant-type:apikey", "apikey": self.api_key},
+            headers={"Accept": "application/json", "Content-Type": "application/x-www-form-urlencoded"},
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise WatsonxError("IAM token request failed: " + str(response.text), response.status_code)
+
+        data = response.json()
+        self._token = data["access_token"]
+        self._expires_at = float(data.get("expiration") or time.time() + float(data.get("expires_in", 3600)))
+        self.refreshes += 1
+        metrics.count("iam_token_refreshes")
+
+
+# Client for the watsonx.ai text-generation API with a pooled keep-alive session,
+# connect/read timeouts, jittered retries and automatic IAM token refresh
+class WatsonxClient:
+    def __init__(self, api_key=None, token=None, url=None, project_id=None, model_id=DEFAULT_MODEL_ID,
+                 iam_url=IAM_URL, connect_timeout=3.05, read_timeout=30.0, max_retries=3, backoff=0.5,
+                 max_backoff=8.0, pool_size=4):
+        self.url = (url or WATSONX_URL).rstrip("/")
+        self.project_id = project_id or DEFAULT_PROJECT_ID
+        self.model_id = model_id
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = 0
+        self.requests_sent = 0
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        api_key = api_key or os.environ.get("WATSONX_APIKEY")
+        self._static_token = token or os.environ.get("WATSONX_TOKEN")
+        self.tokens = IAMTokenManager(api_key, self.session, iam_url) if api_key else None
+        if self.tokens is None and not self._static_token:
+            raise WatsonxError("Set WATSONX_APIKEY (or WATSONX_TOKEN) to use the watsonx.ai API")
+
+    def _headers(self, force_refresh=False, accept="application/json"):
+        token = self.tokens.get_token(force_refresh) if self.tokens else self._static_token
+        return {
+            "Accept": accept,
+            "Content-Type": "application/json",
+            "Authorization": "Bearer" + " " + token,
+        }
+
+    # Full jitter: a random pause up to the exponential backoff for this attempt
+    def _sleep_before_retry(self, attempt, response=None):
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(self.max_backoff, float(retry_after)))
+        self.retries += 1
+        metrics.count("http_retries")
+        time.sleep(delay)
+
+    def post(self, path, body, stream=False, accept="application/json"):
+        url = f"{self.url}{path}?version={API_VERSION}"
+        refreshed = False
+        attempt = 0
+        while True:
+            try:
+                self.requests_sent += 1
+                with metrics.span("http_request", path=path):
+                    response = self.session.post(
+                        url, headers=self._headers(accept=accept), json=body, timeout=self.timeout, stream=stream
+                    )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise WatsonxError(f"Request to {url} failed after {attempt + 1} attempts: {e}") from e
+                self._sleep_before_retry(attempt)
+                attempt += 1
+                continue
+
+            # A response that is not returned is closed, so a streamed one hands its pooled
+            # connection back before the next attempt
+            if response.status_code == 401 and self.tokens and not refreshed:
+                # The token was revoked or expired early; get a fresh one and try again once
+                response.close()
+                self.tokens.get_token(force_refresh=True)
+                refreshed = True
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                response.close()
+                self._sleep_before_retry(attempt, response)
+                attempt += 1
+                continue
+
+            if response.status_code != 200:
+                message = "Non-200 response: " + str(response.text)
+                response.close()
+                raise WatsonxError(message, response.status_code)
+            return response
+
+    def build_body(self, prompt, parameters=None, moderations=None):
+        return {
+            "input": prompt,
+            "parameters": {**DEFAULT_PARAMETERS, **(parameters or {})},
+            "model_id": self.model_id,
+            "project_id": self.project_id,
+            "moderations": DEFAULT_MODERATIONS if moderations is None else moderations,
+        }
+
+    # Full JSON response of the text-generation endpoint
+    def generate(self, prompt, parameters=None, moderations=None):
+        body = self.build_body(prompt, parameters, moderations)
+        return self.post("/ml/v1/text/generation", body).json()
+
+    def generate_text(self, prompt, parameters=None, moderations=None):
+        data = self.generate(prompt, parameters, moderations)
+        return data["results"][0]["generated_text"]
+
+    # Yield generated text chunks as the server-sent-events endpoint produces them
+    def generate_stream(self, prompt, parameters=None, moderations=None):
+        body = self.build_body(prompt, parameters, moderations)
+        response = self.post("/ml/v1/text/generation_stream", body, stream=True, accept="text/event-stream")
+        try:
+            for event in iter_sse_events(response.iter_lines(decode_unicode=True)):
+                if event.get("event", "message") == "error":
+                    raise WatsonxError("Streaming generation failed: " + event.get("data", ""))
+                data = event.get("data")
+                if not data:
+                    continue
+                for result in json.loads(data).get("results", []):
+                    if result.get("generated_text"):
+                        yield result["generated_text"]
+        finally:
+            response.close()
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()